@@ -0,0 +1,25 @@
+"""Benchmarks for backend hot paths.
+
+Purpose: Reproducible, machine-readable performance measurements so regressions
+are visible between versions. Run modules with `python -m backend.bench.<name>`.
+
+"""
+
+import statistics
+from typing import Dict, List
+
+
+def percentiles(samples_us: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_us)
+
+    def pct(p: float) -> float:
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return round(ordered[idx], 2)
+
+    return {
+        "p50_us": pct(50),
+        "p90_us": pct(90),
+        "p99_us": pct(99),
+        "max_us": round(ordered[-1], 2),
+        "mean_us": round(statistics.fmean(ordered), 2),
+    }
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+"""Wire codec benchmark on realistic frames.
+
+Purpose: Compare the encode/decode cost and frame size of every available wire
+codec (JSON always; MessagePack and CBOR when installed) on the frames that
+dominate traffic: full telemetry, telemetry deltas, and container inventory
+snapshots.
+
+How: Payloads are generated deterministically with the same shapes the mod
+sends. Each codec encodes and decodes each payload `--iterations` times;
+latencies are reported as percentiles along with the encoded size, and a JSON
+report is written.
+
+Usage: python -m backend.bench.codec [--iterations 2000] [--inventory-slots 36]
+       [--container-slots 54] [--out data/bench/codec.json] [--baseline old.json]
+
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .. import __version__
+from ..codec import CODECS, Codec
+from . import percentiles
+
+
+ITEMS = (
+    "minecraft:oak_log", "minecraft:oak_planks", "minecraft:stick", "minecraft:cobblestone",
+    "minecraft:iron_ore", "minecraft:raw_iron", "minecraft:iron_ingot", "minecraft:coal",
+    "minecraft:dirt", "minecraft:torch", "minecraft:stone_pickaxe", "minecraft:bread",
+)
+
+
+def _slots(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    return [{"slot": i, "id": rng.choice(ITEMS), "count": rng.randint(1, 64)} for i in range(n)]
+
+
+def telemetry_update(rng: random.Random, slots: int) -> Dict[str, Any]:
+    return {
+        "type": "telemetry_update",
+        "player_uuid": "3f1c2a4e-7b9d-4e21-9a0c-5d6e7f8a9b0c",
+        "ts": "2026-01-01T00:00:00.000Z",
+        "seq": 1042,
+        "state": {
+            "uuid": "3f1c2a4e-7b9d-4e21-9a0c-5d6e7f8a9b0c",
+            "username": "alice",
+            "pos": [rng.uniform(-3000, 3000), rng.uniform(-60, 120), rng.uniform(-3000, 3000)],
+            "dim": "minecraft:overworld",
+            "yaw": rng.uniform(-180, 180),
+            "pitch": rng.uniform(-90, 90),
+            "health": 20,
+            "hunger": 18,
+            "saturation": 4.2,
+            "air": 300,
+            "xp_level": 7,
+            "time": 13450,
+            "inventory": _slots(rng, slots),
+        },
+    }
+
+
+def telemetry_delta(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "type": "telemetry_delta",
+        "player_uuid": "3f1c2a4e-7b9d-4e21-9a0c-5d6e7f8a9b0c",
+        "ts": "2026-01-01T00:00:00.500Z",
+        "seq": 1043,
+        "base_seq": 1042,
+        "changed": {
+            "pos": [rng.uniform(-3000, 3000), rng.uniform(-60, 120), rng.uniform(-3000, 3000)],
+            "yaw": rng.uniform(-180, 180),
+        },
+        "inventory": [{"slot": 3, "id": "minecraft:cobblestone", "count": 17}],
+    }
+
+
+def inventory_snapshot(rng: random.Random, slots: int) -> Dict[str, Any]:
+    return {
+        "type": "inventory_snapshot",
+        "player_uuid": "3f1c2a4e-7b9d-4e21-9a0c-5d6e7f8a9b0c",
+        "container": {
+            "dim": "minecraft:overworld",
+            "pos": [rng.randint(-3000, 3000), rng.randint(-60, 120), rng.randint(-3000, 3000)],
+            "container_type": "minecraft:chest",
+            "version": 12,
+            "hash": "9b2f6c0e1d4a7f3b",
+            "ts_iso": "2026-01-01T00:00:00.000Z",
+            "slots": _slots(rng, slots),
+        },
+    }
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> List[float]:
+    samples: List[float] = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def run_case(codec: Codec, payload: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    frame = codec.encode(payload)
+    size = len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+    # Warm up both directions outside the measurement
+    for _ in range(min(iterations, 50)):
+        codec.decode(codec.encode(payload))
+    return {
+        "bytes": size,
+        "encode": percentiles(_time(lambda: codec.encode(payload), iterations)),
+        "decode": percentiles(_time(lambda: codec.decode(frame), iterations)),
+    }
+
+
+def _compare(report: Dict[str, Any], base: Dict[str, Any], baseline_path: Path) -> None:
+    old = {(c["payload"], c["codec"]): c for c in base.get("cases", [])}
+    print(f"vs {baseline_path} (version {base.get('version')}):")
+    for c in report["cases"]:
+        prev = old.get((c["payload"], c["codec"]))
+        if not prev:
+            continue
+        re = c["encode"]["p50_us"] / prev["encode"]["p50_us"] if prev["encode"]["p50_us"] else float("nan")
+        rd = c["decode"]["p50_us"] / prev["decode"]["p50_us"] if prev["decode"]["p50_us"] else float("nan")
+        print(f"  {c['payload']:<20} {c['codec']:<8} encode x{re:.2f}  decode x{rd:.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark wire codecs on telemetry and inventory frames")
+    ap.add_argument("--iterations", type=int, default=2000)
+    ap.add_argument("--inventory-slots", type=int, default=36, help="occupied player inventory slots in telemetry")
+    ap.add_argument("--container-slots", type=int, default=54, help="occupied slots in the container snapshot")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="data/bench/codec.json")
+    ap.add_argument("--baseline", default=None, help="previous report to compare encode/decode p50 against")
+    args = ap.parse_args(argv)
+
+    out_path = Path(args.out).resolve()
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    # Read the baseline up front; --out may point at the same file
+    base_report: Optional[Dict[str, Any]] = None
+    if baseline is not None:
+        try:
+            base_report = json.loads(baseline.read_text(encoding="utf-8"))
+        except Exception as exc:
+            print(f"baseline unreadable: {exc}")
+
+    rng = random.Random(args.seed)
+    payloads = {
+        "telemetry_update": telemetry_update(rng, args.inventory_slots),
+        "telemetry_delta": telemetry_delta(rng),
+        "inventory_snapshot": inventory_snapshot(rng, args.container_slots),
+    }
+    report: Dict[str, Any] = {
+        "benchmark": "codec",
+        "version": __version__,
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "codecs": list(CODECS),
+        "iterations": args.iterations,
+        "cases": [],
+    }
+    missing = [name for name in ("msgpack", "cbor") if name not in CODECS]
+    if missing:
+        print(f"not installed (skipped): {', '.join(missing)}")
+
+    for pname, payload in payloads.items():
+        json_bytes: Optional[int] = None
+        for name, codec in CODECS.items():
+            case = {"payload": pname, "codec": name, **run_case(codec, payload, args.iterations)}
+            if name == "json":
+                json_bytes = case["bytes"]
+            if json_bytes:
+                case["size_vs_json"] = round(case["bytes"] / json_bytes, 3)
+            report["cases"].append(case)
+            print(
+                f"{pname:<20} {name:<8} bytes={case['bytes']:<6} "
+                f"enc p50={case['encode']['p50_us']:>8.2f}us p99={case['encode']['p99_us']:>8.2f}us "
+                f"dec p50={case['decode']['p50_us']:>8.2f}us p99={case['decode']['p99_us']:>8.2f}us"
+            )
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {out_path}")
+    if baseline is not None and base_report is not None:
+        _compare(report, base_report, baseline)
+
+
+if __name__ == "__main__":
+    main()
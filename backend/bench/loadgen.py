@@ -0,0 +1,666 @@
+from __future__ import annotations
+
+"""Protocol-level load generator: many simulated mod clients against a live backend.
+
+Purpose: Find the backend's capacity without running real Minecraft clients.
+The tool ramps through agent counts and reports, for each stage:
+
+- message throughput in both directions;
+- tail latency from a `!get` command to its `plan` and to its first
+  `action_request`;
+- backend CPU and memory. Workers are included when the backend is sharded.
+
+How: Each simulated agent opens a WebSocket session and performs the real
+handshake (password, `capabilities` with codecs, `telemetry_delta` and
+`batch`). It then switches to the negotiated codec the way the mod does. While
+connected it:
+
+- sends telemetry at `--telemetry-hz`: full updates, or deltas when
+  negotiated;
+- sends a container snapshot every `--snapshot-interval-s`, and inventory
+  diffs at `--diff-hz` in between;
+- issues the `--get` command every `--command-interval-s`, with jitter.
+
+Before each command the agent's inventory is reset to filler blocks, so the
+plan is never empty. Every `action_request` is answered with a synthetic `ok`
+`progress_update` after `--action-ms`, and its effect is applied to the
+simulated player. `#mine` grants the step's items after `--mine-ms`.
+`#goto x y z` moves the player there. Crafts and smelts add their output.
+Whatever changed is sent as telemetry, so acquisitions, routing and ack-mode
+pipelining run their real paths.
+
+Stages add agents at `--connect-rate` per second, settle for
+`--warmup-seconds`, then measure for `--stage-seconds`. Backend CPU and RSS
+are sampled for `--backend-pid` and its child processes. The tool uses psutil
+when it is installed and reads /proc otherwise; without either, the resource
+fields are null. The generator reports its own CPU use as well. A value near
+100% means the client side, not the backend, is the limit.
+
+Scheduler limits apply as in production. `global_chat_sends_per_sec` caps chat
+actions across all agents, so command-to-action latency grows with the agent
+count unless it is raised (or set to 0) in the backend's config for the run.
+
+Usage: python -m backend.bench.loadgen [--url ws://127.0.0.1:8765] [--password asdf]
+       [--agents 10,50,100,200] [--stage-seconds 30] [--warmup-seconds 5]
+       [--telemetry-hz 2] [--snapshot-interval-s 30] [--diff-hz 0.2]
+       [--command-interval-s 20] [--get "minecraft:stone_pickaxe 1"]
+       [--codecs msgpack,json] [--no-delta] [--no-batch] [--backend-pid PID]
+       [--out data/bench/loadgen.json] [--baseline old.json]
+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+from .. import __version__
+from ..codec import CODECS, JSON, Codec, decode_frame
+from . import percentiles
+
+try:
+    import psutil  # type: ignore
+except ImportError:
+    psutil = None  # type: ignore
+
+
+# Never ingredients of the default goal, so the reset inventory does not shorten plans
+FILLER = ("minecraft:dirt", "minecraft:gravel", "minecraft:sand", "minecraft:andesite", "minecraft:granite", "minecraft:diorite")
+CONTAINER_ITEMS = ("minecraft:oak_log", "minecraft:cobblestone", "minecraft:iron_ore", "minecraft:coal", "minecraft:torch", "minecraft:bread")
+INVENTORY_SIZE = 36
+
+
+@dataclass
+class StageStats:
+    sent: Dict[str, int] = field(default_factory=dict)
+    received: Dict[str, int] = field(default_factory=dict)
+    command_to_plan_us: List[float] = field(default_factory=list)
+    command_to_action_us: List[float] = field(default_factory=list)
+    commands: int = 0
+    empty_plans: int = 0
+    command_timeouts: int = 0
+    acks: int = 0
+    resyncs: int = 0
+    disconnects: int = 0
+
+    def count(self, table: Dict[str, int], mtype: Any) -> None:
+        key = str(mtype)
+        table[key] = table.get(key, 0) + 1
+
+
+def _ts() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + "Z"
+
+
+class SimAgent:
+    """One simulated mod client."""
+
+    def __init__(self, index: int, args: argparse.Namespace, rng: random.Random) -> None:
+        self.index = index
+        self.args = args
+        self.rng = rng
+        self.player_id = f"00000000-0000-4000-8000-{index:012d}"
+        self.username = f"lg{index:04d}"
+        self.stats = StageStats()
+        self.codec: Codec = JSON
+        self.delta = False
+        self.seq = 0
+        self.pos = [rng.uniform(-500, 500), 64.0, rng.uniform(-500, 500)]
+        self.yaw = 0.0
+        self.slots: Dict[int, Dict[str, Any]] = {}
+        self._dirty_slots: set = set()
+        self._pos_dirty = False
+        self.container_pos = [int(self.pos[0]) + 2, 64, int(self.pos[2]) + 2]
+        self.container_version = 0
+        self.container: Dict[int, Dict[str, Any]] = {}
+        # request_id -> command send time, until its first action_request (one outstanding at a time)
+        self._pending: Optional[Tuple[str, float]] = None
+        self._ws: Any = None
+        self._tasks: List[asyncio.Task] = []
+        self.connected = False
+
+    # --- simulated player ----------------------------------------------------
+
+    def _reset_inventory(self) -> None:
+        self._dirty_slots.update(self.slots)
+        self.slots = {}
+        for i in range(min(self.args.inventory_slots, INVENTORY_SIZE)):
+            self.slots[i] = {"slot": i, "id": FILLER[i % len(FILLER)], "count": 64}
+            self._dirty_slots.add(i)
+
+    def _grant(self, item: str, count: int) -> None:
+        if not item or count <= 0:
+            return
+        target = next((i for i, s in self.slots.items() if s["id"] == item), None)
+        if target is None:
+            target = next((i for i in range(INVENTORY_SIZE) if i not in self.slots), None)
+        if target is None:
+            # Full: overwrite the last filler stack, as a player would drop it
+            target = INVENTORY_SIZE - 1
+            self.slots.pop(target, None)
+        slot = self.slots.setdefault(target, {"slot": target, "id": item, "count": 0})
+        slot["count"] = int(slot["count"]) + count
+        self._dirty_slots.add(target)
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "uuid": self.player_id,
+            "username": self.username,
+            "pos": [round(v, 2) for v in self.pos],
+            "dim": "minecraft:overworld",
+            "yaw": round(self.yaw, 1),
+            "pitch": 0.0,
+            "health": 20,
+            "hunger": 20,
+            "saturation": 5.0,
+            "air": 300,
+            "xp_level": 0,
+            "time": 6000,
+            "inventory": [self.slots[i] for i in sorted(self.slots)],
+        }
+
+    # --- wire ----------------------------------------------------------------
+
+    async def _send(self, msg: Dict[str, Any]) -> None:
+        if self._ws is None:
+            return
+        await self._ws.send(self.codec.encode(msg))
+        self.stats.count(self.stats.sent, msg.get("type"))
+
+    async def _send_telemetry(self, full: bool = False) -> None:
+        self.seq += 1
+        if full or not self.delta:
+            self._dirty_slots.clear()
+            self._pos_dirty = False
+            await self._send({"type": "telemetry_update", "player_uuid": self.player_id, "ts": _ts(), "seq": self.seq, "state": self._state()})
+            return
+        changed: Dict[str, Any] = {"pos": [round(v, 2) for v in self.pos], "yaw": round(self.yaw, 1)}
+        msg: Dict[str, Any] = {
+            "type": "telemetry_delta", "player_uuid": self.player_id, "ts": _ts(),
+            "seq": self.seq, "base_seq": self.seq - 1, "changed": changed,
+        }
+        if self._dirty_slots:
+            msg["inventory"] = [self.slots.get(i, {"slot": i, "count": 0}) for i in sorted(self._dirty_slots)]
+            self._dirty_slots.clear()
+        self._pos_dirty = False
+        await self._send(msg)
+
+    def _container_snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "inventory_snapshot",
+            "player_uuid": self.player_id,
+            "container": {
+                "dim": "minecraft:overworld",
+                "pos": self.container_pos,
+                "container_type": "net.minecraft.screen.GenericContainerScreenHandler",
+                "version": self.container_version,
+                "hash": f"{self.container_version:016x}",
+                "ts_iso": _ts(),
+                "slots": [{"slot": i, **s} for i, s in sorted(self.container.items())],
+            },
+        }
+
+    def _container_diff(self) -> Dict[str, Any]:
+        slot = self.rng.randrange(self.args.container_slots)
+        item = self.rng.choice(CONTAINER_ITEMS)
+        n = self.rng.randint(1, 16)
+        adds: List[Dict[str, Any]] = []
+        removes: List[Dict[str, Any]] = []
+        cur = self.container.get(slot)
+        if cur is not None and self.rng.random() < 0.5:
+            take = min(n, cur["count"])
+            removes.append({"slot": slot, "id": cur["id"], "count": take})
+            cur["count"] -= take
+            if cur["count"] <= 0:
+                self.container.pop(slot, None)
+        else:
+            if cur is not None:
+                item = cur["id"]
+            self.container.setdefault(slot, {"id": item, "count": 0})["count"] += n
+            adds.append({"slot": slot, "id": item, "count": n})
+        from_version, self.container_version = self.container_version, self.container_version + 1
+        return {
+            "type": "inventory_diff",
+            "player_uuid": self.player_id,
+            "container_key": {"dim": "minecraft:overworld", "pos": self.container_pos},
+            "from_version": from_version,
+            "to_version": self.container_version,
+            "adds": adds,
+            "removes": removes,
+        }
+
+    # --- lifecycle -----------------------------------------------------------
+
+    async def connect(self) -> float:
+        """Connect and handshake; returns the handshake latency in microseconds."""
+        t0 = time.perf_counter()
+        self._ws = await websockets.connect(self.args.url, max_size=None, open_timeout=self.args.command_timeout_s)
+        caps = {
+            "codecs": [c for c in self.args.codecs.split(",") if c],
+            "telemetry_delta": not self.args.no_delta,
+            "batch": not self.args.no_batch,
+        }
+        await self._ws.send(JSON.encode({
+            "type": "handshake", "player_uuid": self.player_id, "password": self.args.password,
+            "player_name": self.username, "capabilities": caps,
+        }))
+        # The settings_update is always the first frame and always JSON
+        while True:
+            frame = decode_frame(await asyncio.wait_for(self._ws.recv(), self.args.command_timeout_s), JSON)
+            if isinstance(frame, dict) and frame.get("type") == "settings_update":
+                break
+        elapsed = (time.perf_counter() - t0) * 1e6
+        settings = frame.get("settings") or {}
+        self.codec = CODECS.get(str(settings.get("codec", "json")), JSON)
+        self.delta = settings.get("telemetry_delta") is True
+        self.connected = True
+        self._reset_inventory()
+        for i in range(min(self.args.container_slots, 54)):
+            self.container[i] = {"id": self.rng.choice(CONTAINER_ITEMS), "count": self.rng.randint(1, 64)}
+        await self._send_telemetry(full=True)
+        await self._send(self._container_snapshot())
+        self._tasks = [
+            asyncio.create_task(self._reader()),
+            asyncio.create_task(self._telemetry_loop()),
+            asyncio.create_task(self._storage_loop()),
+            asyncio.create_task(self._command_loop()),
+        ]
+        return elapsed
+
+    async def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._ws is not None:
+            try:
+                await self._ws.close()
+            except Exception:
+                pass
+        self.connected = False
+
+    async def _every(self, hz: float) -> None:
+        # Jittered so hundreds of agents do not send in lockstep
+        await asyncio.sleep((1.0 / hz) * self.rng.uniform(0.8, 1.2))
+
+    async def _telemetry_loop(self) -> None:
+        if self.args.telemetry_hz <= 0:
+            return
+        while True:
+            await self._every(self.args.telemetry_hz)
+            self.pos[0] += self.rng.uniform(-1, 1)
+            self.pos[2] += self.rng.uniform(-1, 1)
+            self.yaw = self.rng.uniform(-180, 180)
+            await self._send_telemetry()
+
+    async def _storage_loop(self) -> None:
+        last_snapshot = time.monotonic()
+        hz = self.args.diff_hz if self.args.diff_hz > 0 else 1.0 / max(self.args.snapshot_interval_s, 1.0)
+        while True:
+            await self._every(hz)
+            if self.args.snapshot_interval_s > 0 and time.monotonic() - last_snapshot >= self.args.snapshot_interval_s:
+                last_snapshot = time.monotonic()
+                await self._send(self._container_snapshot())
+            elif self.args.diff_hz > 0:
+                await self._send(self._container_diff())
+
+    async def _command_loop(self) -> None:
+        if self.args.command_interval_s <= 0:
+            return
+        # Spread first commands over one interval
+        await asyncio.sleep(self.rng.uniform(0, self.args.command_interval_s))
+        while True:
+            if self._pending is not None and time.perf_counter() - self._pending[1] > self.args.command_timeout_s:
+                self.stats.command_timeouts += 1
+                self._pending = None
+            if self._pending is None:
+                self._reset_inventory()
+                await self._send_telemetry()
+                request_id = str(uuid.uuid4())
+                self._pending = (request_id, time.perf_counter())
+                self.stats.commands += 1
+                await self._send({
+                    "type": "command", "request_id": request_id, "player_uuid": self.player_id,
+                    "text": f"{self.args.prefix}get {self.args.get}",
+                })
+            await asyncio.sleep(self.args.command_interval_s * self.rng.uniform(0.8, 1.2))
+
+    async def _reader(self) -> None:
+        try:
+            async for raw in self._ws:
+                try:
+                    frame = decode_frame(raw, self.codec)
+                except Exception:
+                    continue
+                if isinstance(frame, dict) and frame.get("type") == "batch" and isinstance(frame.get("messages"), list):
+                    msgs = frame["messages"]
+                else:
+                    msgs = [frame]
+                for msg in msgs:
+                    if isinstance(msg, dict):
+                        self._on_message(msg)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.connected:
+                self.stats.disconnects += 1
+            self.connected = False
+
+    def _on_message(self, msg: Dict[str, Any]) -> None:
+        mtype = msg.get("type")
+        self.stats.count(self.stats.received, mtype)
+        if mtype == "plan" and self._pending is not None and msg.get("request_id") == self._pending[0]:
+            self.stats.command_to_plan_us.append((time.perf_counter() - self._pending[1]) * 1e6)
+            if not msg.get("steps"):
+                self.stats.empty_plans += 1
+                self._pending = None
+        elif mtype == "action_request":
+            if self._pending is not None:
+                self.stats.command_to_action_us.append((time.perf_counter() - self._pending[1]) * 1e6)
+                self._pending = None
+            self._tasks.append(asyncio.create_task(self._perform(msg)))
+        elif mtype == "telemetry_resync":
+            self.stats.resyncs += 1
+            self._tasks.append(asyncio.create_task(self._send_telemetry(full=True)))
+        if len(self._tasks) > 64:
+            self._tasks = [t for t in self._tasks if not t.done()]
+
+    async def _perform(self, msg: Dict[str, Any]) -> None:
+        """Act out one action_request and acknowledge it."""
+        try:
+            await asyncio.sleep(self.args.action_ms / 1000.0)
+            op = msg.get("op")
+            text = str(msg.get("chat_text", ""))
+            changed = False
+            if op in {"craft", "smelt"}:
+                self._grant(str(msg.get("recipe", "")), int(msg.get("count", 1) or 1))
+                changed = True
+            elif text.startswith("#goto "):
+                parts = text.split()[1:]
+                if len(parts) == 3:
+                    try:
+                        self.pos = [float(p) for p in parts]
+                        changed = True
+                    except ValueError:
+                        pass
+            await self._send({"type": "progress_update", "action_id": msg.get("action_id"), "status": "ok"})
+            self.stats.acks += 1
+            if changed:
+                await self._send_telemetry()
+            if text.startswith("#mine ") and msg.get("item"):
+                # The dispatcher acks #mine first, then waits for the items to show up in telemetry
+                await asyncio.sleep(self.args.mine_ms / 1000.0)
+                self._grant(str(msg["item"]), int(msg.get("count", 1) or 1))
+                await self._send_telemetry()
+        except (websockets.ConnectionClosed, asyncio.CancelledError):
+            pass
+
+
+class ResourceSampler:
+    """CPU seconds and RSS of a process and its descendants (sharded workers)."""
+
+    def __init__(self, pid: Optional[int]) -> None:
+        self.pid = pid
+        self._tick = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    @property
+    def available(self) -> bool:
+        return self.pid is not None and (psutil is not None or Path(f"/proc/{self.pid}/stat").exists())
+
+    def sample(self) -> Optional[Tuple[float, int, int]]:
+        """(cpu_seconds, rss_bytes, processes) summed over the tree; None when unavailable."""
+        if not self.available:
+            return None
+        try:
+            if psutil is not None:
+                root = psutil.Process(self.pid)
+                procs = [root] + root.children(recursive=True)
+                cpu = rss = 0
+                for p in procs:
+                    try:
+                        t = p.cpu_times()
+                        cpu += t.user + t.system
+                        rss += p.memory_info().rss
+                    except psutil.Error:
+                        continue
+                return float(cpu), int(rss), len(procs)
+            return self._sample_proc()
+        except Exception:
+            return None
+
+    def _sample_proc(self) -> Tuple[float, int, int]:
+        parents: Dict[int, int] = {}
+        stats: Dict[int, List[str]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                raw = Path(f"/proc/{entry}/stat").read_text()
+            except OSError:
+                continue
+            # comm may contain spaces; the fields after it are fixed
+            fields = raw[raw.rfind(")") + 2:].split()
+            stats[int(entry)] = fields
+            parents[int(entry)] = int(fields[1])
+        tree = {self.pid}
+        grew = True
+        while grew:
+            grew = False
+            for child, parent in parents.items():
+                if parent in tree and child not in tree:
+                    tree.add(child)
+                    grew = True
+        cpu = 0.0
+        rss = 0
+        for pid in tree:
+            fields = stats.get(pid)
+            if fields is None:
+                continue
+            # utime, stime are fields 14 and 15 of stat; rss (pages) is field 24
+            cpu += (int(fields[11]) + int(fields[12])) / self._tick
+            rss += int(fields[21]) * self._page
+        return cpu, rss, len(tree)
+
+
+def _merge(agents: List[SimAgent]) -> StageStats:
+    total = StageStats()
+    for a in agents:
+        s = a.stats
+        for src, dst in ((s.sent, total.sent), (s.received, total.received)):
+            for k, v in src.items():
+                dst[k] = dst.get(k, 0) + v
+        total.command_to_plan_us.extend(s.command_to_plan_us)
+        total.command_to_action_us.extend(s.command_to_action_us)
+        total.commands += s.commands
+        total.empty_plans += s.empty_plans
+        total.command_timeouts += s.command_timeouts
+        total.acks += s.acks
+        total.resyncs += s.resyncs
+        total.disconnects += s.disconnects
+    return total
+
+
+async def _connect_all(agents: List[SimAgent], rate: float) -> Tuple[List[float], int]:
+    """Connect agents at `rate` per second; returns handshake latencies and the failure count."""
+    latencies: List[float] = []
+    failures = 0
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    async def one(agent: SimAgent) -> None:
+        nonlocal failures
+        try:
+            latencies.append(await agent.connect())
+        except Exception:
+            failures += 1
+
+    pending = []
+    for agent in agents:
+        pending.append(asyncio.create_task(one(agent)))
+        if interval:
+            await asyncio.sleep(interval)
+    await asyncio.gather(*pending)
+    return latencies, failures
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    sampler = ResourceSampler(args.backend_pid)
+    if args.backend_pid is not None and not sampler.available:
+        print(f"backend pid {args.backend_pid}: no psutil and no /proc; resource usage not reported")
+    agents: List[SimAgent] = []
+    stages: List[Dict[str, Any]] = []
+    try:
+        for target in [int(x) for x in args.agents.split(",") if x.strip()]:
+            new = [SimAgent(len(agents) + i, args, random.Random(rng.random())) for i in range(max(target - len(agents), 0))]
+            agents.extend(new)
+            handshakes, failures = await _connect_all(new, args.connect_rate)
+            await asyncio.sleep(args.warmup_seconds)
+            for a in agents:
+                a.stats = StageStats()
+            t0, cpu0 = time.perf_counter(), time.process_time()
+            first = sampler.sample()
+            peak_rss = first[1] if first else 0
+            procs = first[2] if first else 0
+            deadline = t0 + args.stage_seconds
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(min(1.0, max(deadline - time.perf_counter(), 0)))
+                s = sampler.sample()
+                if s is not None:
+                    peak_rss, procs = max(peak_rss, s[1]), max(procs, s[2])
+            wall = time.perf_counter() - t0
+            last = sampler.sample()
+            stats = _merge(agents)
+            sent, received = sum(stats.sent.values()), sum(stats.received.values())
+            stage: Dict[str, Any] = {
+                "agents": target,
+                "connected": sum(1 for a in agents if a.connected),
+                "connect_failures": failures,
+                "handshake": percentiles(handshakes) if handshakes else None,
+                "seconds": round(wall, 2),
+                "sent_per_s": round(sent / wall, 1),
+                "received_per_s": round(received / wall, 1),
+                "sent": dict(sorted(stats.sent.items())),
+                "received": dict(sorted(stats.received.items())),
+                "commands": stats.commands,
+                "command_to_plan": percentiles(stats.command_to_plan_us) if stats.command_to_plan_us else None,
+                "command_to_action": percentiles(stats.command_to_action_us) if stats.command_to_action_us else None,
+                "empty_plans": stats.empty_plans,
+                "command_timeouts": stats.command_timeouts,
+                "acks": stats.acks,
+                "resyncs": stats.resyncs,
+                "disconnects": stats.disconnects,
+                "loadgen_cpu_percent": round((time.process_time() - cpu0) / wall * 100.0, 1),
+                "backend": None,
+            }
+            if first is not None and last is not None:
+                stage["backend"] = {
+                    "cpu_percent": round((last[0] - first[0]) / wall * 100.0, 1),
+                    "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+                    "processes": procs,
+                }
+            stages.append(stage)
+            lat = stage["command_to_action"] or {}
+            backend = stage["backend"] or {}
+            print(
+                f"agents={target:<5} connected={stage['connected']:<5} "
+                f"in={stage['sent_per_s']:>8.1f}/s out={stage['received_per_s']:>8.1f}/s "
+                f"cmd->action p50={lat.get('p50_us', 0) / 1000:>8.1f}ms p99={lat.get('p99_us', 0) / 1000:>8.1f}ms "
+                f"timeouts={stats.command_timeouts:<4} "
+                f"backend cpu={backend.get('cpu_percent', '-')}% rss={backend.get('peak_rss_mb', '-')}MB "
+                f"loadgen cpu={stage['loadgen_cpu_percent']}%"
+            )
+    finally:
+        await asyncio.gather(*(a.close() for a in agents), return_exceptions=True)
+    return {
+        "benchmark": "loadgen",
+        "version": __version__,
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "url": args.url,
+        "config": {
+            "telemetry_hz": args.telemetry_hz,
+            "snapshot_interval_s": args.snapshot_interval_s,
+            "diff_hz": args.diff_hz,
+            "command_interval_s": args.command_interval_s,
+            "get": args.get,
+            "codecs": args.codecs,
+            "delta": not args.no_delta,
+            "batch": not args.no_batch,
+            "action_ms": args.action_ms,
+            "mine_ms": args.mine_ms,
+        },
+        "stages": stages,
+    }
+
+
+def _compare(report: Dict[str, Any], base: Dict[str, Any], baseline_path: Path) -> None:
+    old = {s["agents"]: s for s in base.get("stages", [])}
+    print(f"vs {baseline_path} (version {base.get('version')}):")
+    for s in report["stages"]:
+        prev = old.get(s["agents"])
+        if not prev or not s.get("command_to_action") or not prev.get("command_to_action"):
+            continue
+        p99, old_p99 = s["command_to_action"]["p99_us"], prev["command_to_action"]["p99_us"]
+        ratio = p99 / old_p99 if old_p99 else float("nan")
+        cpu = (s.get("backend") or {}).get("cpu_percent")
+        old_cpu = (prev.get("backend") or {}).get("cpu_percent")
+        print(f"  agents={s['agents']:<5} cmd->action p99 x{ratio:.2f}  backend cpu {old_cpu}% -> {cpu}%")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Simulate many mod clients against a running backend")
+    ap.add_argument("--url", default="ws://127.0.0.1:8765")
+    ap.add_argument("--password", default="asdf")
+    ap.add_argument("--agents", default="10,50,100,200", help="agent counts to ramp through, one stage each")
+    ap.add_argument("--stage-seconds", type=float, default=30.0)
+    ap.add_argument("--warmup-seconds", type=float, default=5.0)
+    ap.add_argument("--connect-rate", type=float, default=50.0, help="new connections per second")
+    ap.add_argument("--telemetry-hz", type=float, default=2.0)
+    ap.add_argument("--inventory-slots", type=int, default=27, help="filler stacks in each agent's inventory")
+    ap.add_argument("--snapshot-interval-s", type=float, default=30.0)
+    ap.add_argument("--diff-hz", type=float, default=0.2)
+    ap.add_argument("--container-slots", type=int, default=27)
+    ap.add_argument("--command-interval-s", type=float, default=20.0, help="0 disables commands")
+    ap.add_argument("--command-timeout-s", type=float, default=30.0)
+    ap.add_argument("--get", default="minecraft:stone_pickaxe 1", help="arguments of the !get command")
+    ap.add_argument("--prefix", default="!", help="command prefix (backend command_prefix)")
+    ap.add_argument("--action-ms", type=float, default=20.0, help="simulated time to perform an action")
+    ap.add_argument("--mine-ms", type=float, default=500.0, help="simulated time for #mine to yield the items")
+    ap.add_argument("--codecs", default="msgpack,json", help="codecs offered in the handshake")
+    ap.add_argument("--no-delta", action="store_true", help="do not offer telemetry deltas")
+    ap.add_argument("--no-batch", action="store_true", help="do not offer batched frames")
+    ap.add_argument("--backend-pid", type=int, default=None, help="sample CPU/RSS of this process and its children")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="data/bench/loadgen.json")
+    ap.add_argument("--baseline", default=None, help="previous report to compare latency and CPU against")
+    args = ap.parse_args(argv)
+
+    out_path = Path(args.out).resolve()
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    # Read the baseline up front; --out may point at the same file
+    base_report: Optional[Dict[str, Any]] = None
+    if baseline is not None:
+        try:
+            base_report = json.loads(baseline.read_text(encoding="utf-8"))
+        except Exception as exc:
+            print(f"baseline unreadable: {exc}")
+
+    report = asyncio.run(run(args))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {out_path}")
+    if baseline is not None and base_report is not None:
+        _compare(report, base_report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+"""Planner benchmark over synthetic recipe graphs.
+
+Purpose: Measure `plan_craft` (and the bill-of-materials queries) at vanilla
+scale and beyond: generated skill graphs with configurable depth, breadth,
+fan-in and sharing, across target counts and inventory densities. Reports
+latency percentiles, transient allocation peak and retained blocks per call,
+and writes a JSON report.
+
+How: Each graph is written as a `settings/` tree into a temporary directory and
+the process chdirs there, so the planner loads it through its normal data path.
+Latency is measured without tracing; allocations in a separate pass under
+tracemalloc.
+
+Usage: python -m backend.bench.planner [--depth 6] [--breadth 200] [--fan-in 3]
+       [--sharing 0.5] [--counts 1,8,64] [--densities 0,0.1,0.5]
+       [--iterations 200] [--out data/bench/planner.json] [--baseline old.json]
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .. import __version__
+from . import percentiles
+
+
+CONTEXTS = ("crafting_table_nearby", "furnace_nearby")
+
+
+def generate_skill_graph(depth: int, breadth: int, fan_in: int, sharing: float, seed: int) -> Dict[str, Any]:
+    """Build a layered recipe graph.
+
+    Layer 0 holds world-acquired leaves; each item on layer d >= 1 consumes
+    `fan_in` distinct inputs from lower layers. With probability `sharing` an
+    input comes from a small shared pool (wide fan-in onto common
+    intermediates), otherwise from the layer directly below (deep chains).
+    """
+    rng = random.Random(seed)
+    layers: List[List[str]] = [[f"bench:raw_{i}" for i in range(breadth)]]
+    shared_pool = [layers[0][i] for i in range(max(1, breadth // 20))]
+    skills: Dict[str, Dict[str, Any]] = {}
+    for d in range(1, depth + 1):
+        layer = [f"bench:l{d}_{i}" for i in range(breadth)]
+        below = layers[d - 1]
+        for item in layer:
+            inputs: Dict[str, int] = {}
+            while len(inputs) < min(fan_in, len(below)):
+                src = rng.choice(shared_pool) if rng.random() < sharing else rng.choice(below)
+                inputs[src] = rng.randint(1, 4)
+            smelt = rng.random() < 0.1
+            require = {CONTEXTS[1]: 1} if smelt else ({CONTEXTS[0]: 1} if rng.random() < 0.5 else {})
+            skills[item] = {
+                "op": "smelt" if smelt else "craft",
+                "consume": inputs,
+                "require": require,
+                "obtain": {item: rng.choice((1, 1, 2, 4))},
+            }
+        layers.append(layer)
+        # Promote a few of this layer into the shared pool so sharing spans depths
+        shared_pool.extend(rng.sample(layer, max(1, breadth // 50)))
+    return {"skills": skills, "leaves": layers[0], "top": layers[-1]}
+
+
+def _inventory(rng: random.Random, items: List[str], density: float) -> Dict[str, int]:
+    return {it: rng.randint(1, 64) for it in items if rng.random() < density}
+
+
+def run_case(targets: List[str], count: int, inventories: List[Dict[str, int]], iterations: int) -> Dict[str, Any]:
+    from ..planner import plan_craft
+
+    # Warm caches (data loads, compiled graph) outside the measurement
+    plan_craft(targets[0], count, inventory_counts=inventories[0])
+    samples: List[float] = []
+    steps_total = 0
+    for n in range(iterations):
+        target = targets[n % len(targets)]
+        inv = inventories[n % len(inventories)]
+        t0 = time.perf_counter()
+        steps = plan_craft(target, count, inventory_counts=inv)
+        samples.append((time.perf_counter() - t0) * 1e6)
+        steps_total += len(steps)
+    # Allocation pass: tracing distorts timing, so it runs separately on fewer calls
+    alloc_calls = max(1, min(iterations, 20))
+    tracemalloc.start()
+    retained = 0
+    peak = 0
+    for n in range(alloc_calls):
+        target = targets[n % len(targets)]
+        inv = inventories[n % len(inventories)]
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = plan_craft(target, count, inventory_counts=inv)
+        _, call_peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        # Blocks still alive while the plan is held: the plan itself plus any leaked/cached state
+        retained += sum(max(s.count_diff, 0) for s in after.compare_to(before, "filename"))
+        peak = max(peak, call_peak - base)
+        del result
+    tracemalloc.stop()
+    return {
+        **percentiles(samples),
+        "iterations": iterations,
+        "mean_steps": round(steps_total / iterations, 1),
+        "alloc_retained_blocks_per_call": round(retained / alloc_calls, 1),
+        "alloc_peak_bytes": peak,
+    }
+
+
+def run_bom_case(targets: List[str], count: int, inventories: List[Dict[str, int]], iterations: int) -> Dict[str, Any]:
+    from ..planner import max_craftable, raw_requirements
+
+    raw_requirements(targets[0], count)
+    raw_samples: List[float] = []
+    max_samples: List[float] = []
+    for n in range(iterations):
+        target = targets[n % len(targets)]
+        t0 = time.perf_counter()
+        raw_requirements(target, count)
+        t1 = time.perf_counter()
+        max_craftable(target, inventories[n % len(inventories)])
+        t2 = time.perf_counter()
+        raw_samples.append((t1 - t0) * 1e6)
+        max_samples.append((t2 - t1) * 1e6)
+    return {
+        "raw_requirements": percentiles(raw_samples),
+        "max_craftable": percentiles(max_samples),
+    }
+
+
+def _write_settings(root: Path, graph: Dict[str, Any]) -> None:
+    settings = root / "settings"
+    settings.mkdir(parents=True, exist_ok=True)
+    (settings / "skill_graph.json").write_text(json.dumps({"skills": graph["skills"]}), encoding="utf-8")
+    (settings / "mineable_items.json").write_text(json.dumps(graph["leaves"]), encoding="utf-8")
+    (settings / "tool_tiers.json").write_text("{}", encoding="utf-8")
+    (settings / "acquisition_map.json").write_text("{}", encoding="utf-8")
+    (settings / "aliases.json").write_text("{}", encoding="utf-8")
+
+
+def _compare(report: Dict[str, Any], base: Dict[str, Any], baseline_path: Path) -> None:
+    old = {(c["count"], c["density"]): c["plan_craft"] for c in base.get("cases", [])}
+    print(f"vs {baseline_path} (version {base.get('version')}):")
+    for c in report["cases"]:
+        prev = old.get((c["count"], c["density"]))
+        if not prev:
+            continue
+        cur = c["plan_craft"]
+        r50 = cur["p50_us"] / prev["p50_us"] if prev["p50_us"] else float("nan")
+        r99 = cur["p99_us"] / prev["p99_us"] if prev["p99_us"] else float("nan")
+        print(f"  count={c['count']:<5} density={c['density']:<5} p50 x{r50:.2f}  p99 x{r99:.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark plan_craft on synthetic skill graphs")
+    ap.add_argument("--depth", type=int, default=6)
+    ap.add_argument("--breadth", type=int, default=200)
+    ap.add_argument("--fan-in", type=int, default=3)
+    ap.add_argument("--sharing", type=float, default=0.5)
+    ap.add_argument("--counts", default="1,8,64")
+    ap.add_argument("--densities", default="0,0.1,0.5")
+    ap.add_argument("--iterations", type=int, default=200)
+    ap.add_argument("--targets", type=int, default=20, help="distinct top-layer targets to rotate through")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="data/bench/planner.json")
+    ap.add_argument("--baseline", default=None, help="previous report to compare p50/p99 against")
+    args = ap.parse_args(argv)
+
+    out_path = Path(args.out).resolve()
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    # Read the baseline up front; --out may point at the same file
+    base_report: Optional[Dict[str, Any]] = None
+    if baseline is not None:
+        try:
+            base_report = json.loads(baseline.read_text(encoding="utf-8"))
+        except Exception as exc:
+            print(f"baseline unreadable: {exc}")
+    counts = [int(x) for x in args.counts.split(",") if x.strip()]
+    densities = [float(x) for x in args.densities.split(",") if x.strip()]
+
+    graph = generate_skill_graph(args.depth, args.breadth, args.fan_in, args.sharing, args.seed)
+    rng = random.Random(args.seed)
+    targets = rng.sample(graph["top"], min(args.targets, len(graph["top"])))
+    all_items = list(graph["leaves"]) + list(graph["skills"].keys())
+
+    report: Dict[str, Any] = {
+        "benchmark": "planner",
+        "version": __version__,
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "graph": {
+            "depth": args.depth,
+            "breadth": args.breadth,
+            "fan_in": args.fan_in,
+            "sharing": args.sharing,
+            "seed": args.seed,
+            "recipes": len(graph["skills"]),
+        },
+        "cases": [],
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="automc-bench-") as tmp:
+        _write_settings(Path(tmp), graph)
+        os.chdir(tmp)
+        try:
+            for density in densities:
+                inventories = [_inventory(rng, all_items, density) for _ in range(8)]
+                for count in counts:
+                    case = {
+                        "count": count,
+                        "density": density,
+                        "plan_craft": run_case(targets, count, inventories, args.iterations),
+                        **run_bom_case(targets, count, inventories, args.iterations),
+                    }
+                    report["cases"].append(case)
+                    pc = case["plan_craft"]
+                    print(
+                        f"count={count:<5} density={density:<5} p50={pc['p50_us']:>10.1f}us "
+                        f"p99={pc['p99_us']:>10.1f}us steps={pc['mean_steps']:<8} "
+                        f"peak={pc['alloc_peak_bytes']}B"
+                    )
+        finally:
+            os.chdir(cwd)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {out_path}")
+    if baseline is not None and base_report is not None:
+        _compare(report, base_report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+"""Deterministic replay of recorded traffic against a backend.
+
+Purpose: Re-run a captured production workload (`record_traffic`, see
+`backend/traffic.py`) against `BackendServer`, at the original pace or as fast
+as possible. StateService, StorageCatalog or dispatcher changes can then be
+compared on identical traffic.
+
+How: Each recorded session becomes one WebSocket connection, which sends the
+session's inbound frames as recorded. Pacing is either:
+
+- the original timing, scaled by `--speed`;
+- no pauses at all (`--fast`).
+
+Replies from the live backend differ from the recording in two ways, and the
+replay corrects both:
+
+- Action ids are fresh. The k-th `action_request` of a live session stands for
+  the k-th one in the recording, so `progress_update` acks are rewritten to the
+  live id.
+- Timing differs. Each inbound frame is held until the live session has
+  received as many `action_request`s as the recorded client had seen when it
+  sent that frame. A telemetry update showing mined items, for example, is not
+  sent before the `#mine` it answers. Otherwise the dispatcher would skip steps
+  and the two runs would diverge.
+
+Sessions share backend state (resource sites, the storage catalog), so frames
+also go out in their recorded order across all sessions. One session waiting
+on its gate holds back the frames recorded after it. That keeps runs
+comparable but serialises them: `--fast` measures how quickly the backend
+answers this workload, not its peak throughput (use `backend.bench.loadgen`
+for that).
+
+A gate that is still closed after `--gate-timeout-s` opens anyway and is
+counted in the report. Frames are re-encoded only when they need it: a
+rewritten ack, or a different codec negotiated by the live backend. All other
+frames are sent byte for byte.
+
+Without `--url`, the backend runs in this process on a copy of the working
+directory's `settings/`, in an empty temporary directory. Every run then starts
+from the same empty `data/` and never touches the real state, storage catalog
+or plan journal. Traffic recording and settings reload are switched off in the
+copy. The reported process CPU includes the backend.
+
+Report: wall time, frames and messages in both directions, and gate waits
+(time blocked on the backend, a proxy for its responsiveness) as percentiles.
+At original speed it also reports send lateness against the recorded schedule.
+Gate timeouts and recorded vs live action counts flag divergence.
+
+Usage: python -m backend.bench.replay data/traffic/<file>.amcrec.gz [more files]
+       [--fast | --speed 1.0] [--url ws://127.0.0.1:8765] [--password PW]
+       [--gate-timeout-s 30] [--out data/bench/replay.json] [--baseline old.json]
+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+from .. import __version__
+from ..codec import CODECS, JSON, Codec, Frame, decode_frame
+from ..traffic import CLOSE, INBOUND, OPEN, OUTBOUND, read_recording
+from . import percentiles
+
+
+@dataclass
+class InboundFrame:
+    t: float
+    seq: int  # position among all sessions' inbound frames
+    raw: Frame
+    obj: Any  # decoded frame (a message or a batch); None if undecodable
+    after_actions: int  # action_requests the recorded client had received before sending it
+    acks: bool  # carries progress_update(s) whose action_id needs rewriting
+
+
+@dataclass
+class RecordedSession:
+    key: Tuple[int, int]  # (file index, session number)
+    opened: float = 0.0
+    closed: Optional[float] = None
+    codec: Codec = JSON
+    inbound: List[InboundFrame] = field(default_factory=list)
+    actions: List[str] = field(default_factory=list)  # recorded action ids, in arrival order
+
+
+def _messages(obj: Any) -> List[Dict[str, Any]]:
+    if isinstance(obj, dict) and obj.get("type") == "batch" and isinstance(obj.get("messages"), list):
+        return [m for m in obj["messages"] if isinstance(m, dict)]
+    return [obj] if isinstance(obj, dict) else []
+
+
+def load_sessions(paths: List[Path]) -> List[RecordedSession]:
+    sessions: Dict[Tuple[int, int], RecordedSession] = {}
+    for n, path in enumerate(paths):
+        _, records = read_recording(path)
+        for t, sid, event, frame in records:
+            key = (n, sid)
+            sess = sessions.get(key)
+            if sess is None:
+                sess = sessions[key] = RecordedSession(key=key, opened=t)
+            if event == OPEN:
+                sess.opened = t
+            elif event == CLOSE:
+                sess.closed = t
+            elif event in OUTBOUND:
+                try:
+                    obj = decode_frame(frame, sess.codec)
+                except Exception:
+                    continue
+                for msg in _messages(obj):
+                    mtype = msg.get("type")
+                    if mtype == "settings_update" and "codec" in (msg.get("settings") or {}):
+                        # Binary frames after the handshake reply use the negotiated codec
+                        sess.codec = CODECS.get(str(msg["settings"]["codec"]), JSON)
+                    elif mtype == "action_request":
+                        sess.actions.append(str(msg.get("action_id")))
+            elif event in INBOUND:
+                try:
+                    obj = decode_frame(frame, sess.codec)
+                except Exception:
+                    obj = None
+                acks = any(m.get("type") == "progress_update" for m in _messages(obj))
+                sess.inbound.append(InboundFrame(t=t, seq=0, raw=frame, obj=obj, after_actions=len(sess.actions), acks=acks))
+    # Shards record with their own clocks; those start within moments of each other
+    ordered = sorted((inb for sess in sessions.values() for inb in sess.inbound), key=lambda inb: inb.t)
+    for seq, inb in enumerate(ordered):
+        inb.seq = seq
+    return sorted(sessions.values(), key=lambda s: s.opened)
+
+
+class Sequencer:
+    """Lets inbound frames out one at a time, in their recorded order across sessions."""
+
+    def __init__(self) -> None:
+        self.next = 0
+        self._waiting: Dict[int, asyncio.Future] = {}
+
+    async def turn(self, seq: int) -> None:
+        if self.next == seq:
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting[seq] = fut
+        await fut
+
+    def advance(self) -> None:
+        self.next += 1
+        fut = self._waiting.pop(self.next, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+
+@dataclass
+class ReplayStats:
+    frames_sent: int = 0
+    frames_received: int = 0
+    received: Dict[str, int] = field(default_factory=dict)
+    gate_wait_us: List[float] = field(default_factory=list)
+    lateness_us: List[float] = field(default_factory=list)
+    gate_timeouts: int = 0
+    recorded_actions: int = 0
+    live_actions: int = 0
+    failed_sessions: int = 0
+
+
+class SessionReplay:
+    def __init__(self, rec: RecordedSession, args: argparse.Namespace, stats: ReplayStats, t_start: float, order: Sequencer) -> None:
+        self.rec = rec
+        self.order = order
+        self.args = args
+        self.stats = stats
+        self.t_start = t_start
+        self.codec: Codec = JSON
+        self.live_actions: List[str] = []
+        self._arrived = asyncio.Event()
+        self._settings = asyncio.Event()
+        self._index = {aid: i for i, aid in enumerate(rec.actions)}
+
+    async def _at(self, t: float) -> None:
+        """Sleep until recorded time `t` (scaled); no-op in fast mode."""
+        if self.args.fast:
+            return
+        due = self.t_start + t / self.args.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.stats.lateness_us.append(max(-delay, 0.0) * 1e6)
+
+    async def _gate(self, actions: int) -> None:
+        if len(self.live_actions) >= actions:
+            return
+        t0 = time.perf_counter()
+        deadline = t0 + self.args.gate_timeout_s
+        while len(self.live_actions) < actions:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), max(deadline - time.perf_counter(), 0))
+            except asyncio.TimeoutError:
+                self.stats.gate_timeouts += 1
+                break
+        self.stats.gate_wait_us.append((time.perf_counter() - t0) * 1e6)
+
+    def _frame(self, inb: InboundFrame, first: bool) -> Frame:
+        binary = not isinstance(inb.raw, str)
+        rewrite = inb.acks or (binary and self.codec.name != self.rec.codec.name) or (first and self.args.password is not None)
+        if not rewrite or inb.obj is None:
+            return inb.raw
+        for msg in _messages(inb.obj):
+            if msg.get("type") == "progress_update":
+                i = self._index.get(str(msg.get("action_id")))
+                if i is not None and i < len(self.live_actions):
+                    msg["action_id"] = self.live_actions[i]
+            elif msg.get("type") == "handshake" and self.args.password is not None:
+                msg["password"] = self.args.password
+        return self.codec.encode(inb.obj) if binary else JSON.encode(inb.obj)
+
+    async def _reader(self, ws: Any) -> None:
+        try:
+            async for raw in ws:
+                self.stats.frames_received += 1
+                try:
+                    obj = decode_frame(raw, self.codec)
+                except Exception:
+                    continue
+                for msg in _messages(obj):
+                    mtype = str(msg.get("type"))
+                    self.stats.received[mtype] = self.stats.received.get(mtype, 0) + 1
+                    if mtype == "settings_update" and not self._settings.is_set():
+                        self.codec = CODECS.get(str((msg.get("settings") or {}).get("codec", "json")), JSON)
+                        self._settings.set()
+                    elif mtype == "action_request":
+                        self.live_actions.append(str(msg.get("action_id")))
+                        self._arrived.set()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _skip(self, frames: List[InboundFrame]) -> None:
+        # A dead session still takes its turns, or every later frame would wait on it
+        for inb in frames:
+            await self.order.turn(inb.seq)
+            self.order.advance()
+
+    async def run(self) -> None:
+        await self._at(self.rec.opened)
+        try:
+            ws = await websockets.connect(self.args.url, max_size=None)
+        except Exception:
+            self.stats.failed_sessions += 1
+            await self._skip(self.rec.inbound)
+            return
+        reader = asyncio.create_task(self._reader(ws))
+        n = 0
+        try:
+            for n, inb in enumerate(self.rec.inbound):
+                await self._at(inb.t)
+                await self.order.turn(inb.seq)
+                try:
+                    await self._gate(inb.after_actions)
+                    await ws.send(self._frame(inb, n == 0))
+                    self.stats.frames_sent += 1
+                    if n == 0:
+                        # The handshake reply names the codec for everything after it
+                        try:
+                            await asyncio.wait_for(self._settings.wait(), self.args.gate_timeout_s)
+                        except asyncio.TimeoutError:
+                            self.stats.gate_timeouts += 1
+                finally:
+                    self.order.advance()
+            n = len(self.rec.inbound)
+            # Let the backend finish the recorded work before hanging up
+            await self._gate(len(self.rec.actions))
+            if self.rec.closed is not None:
+                await self._at(self.rec.closed)
+        except websockets.ConnectionClosed:
+            self.stats.failed_sessions += 1
+            await self._skip(self.rec.inbound[n + 1:])
+        finally:
+            self.stats.recorded_actions += len(self.rec.actions)
+            self.stats.live_actions += len(self.live_actions)
+            await ws.close()
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+
+async def _wait_listening(url: str, server_task: asyncio.Task, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        if server_task.done():
+            # Failed to start (e.g. port in use); do not replay against whoever holds the port
+            await server_task
+            raise RuntimeError("in-process backend exited before listening")
+        try:
+            ws = await websockets.connect(url)
+            await ws.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def _scratch_dir(tmp: Path) -> None:
+    """Copy settings/ into `tmp` for an isolated in-process backend (no recording, no reload)."""
+    shutil.copytree(Path("settings"), tmp / "settings")
+    cfg_path = tmp / "settings" / "config.json"
+    cfg = json.loads(cfg_path.read_text(encoding="utf-8"))
+    cfg["record_traffic"] = False
+    cfg["settings_reload_interval_ms"] = 0
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+
+
+async def run(args: argparse.Namespace, sessions: List[RecordedSession]) -> Dict[str, Any]:
+    server = server_task = None
+    cwd = os.getcwd()
+    scratch: Optional[tempfile.TemporaryDirectory] = None
+    stats = ReplayStats()
+    try:
+        if args.url is None:
+            from ..server import BackendServer
+
+            # Fresh data/ per run: the live state would be overwritten and would make runs differ
+            scratch = tempfile.TemporaryDirectory(prefix="automc-replay-")
+            _scratch_dir(Path(scratch.name))
+            os.chdir(scratch.name)
+            server = BackendServer()
+            args.url = f"ws://{server.settings.host}:{server.settings.port}"
+            server_task = asyncio.create_task(server.start())
+            await _wait_listening(args.url, server_task, 10.0)
+        cpu0 = time.process_time()
+        # Recorded times count from backend start; replay from the first connection
+        origin = min(s.opened for s in sessions)
+        t_start = time.perf_counter()
+        t_zero = t_start - origin / args.speed
+        order = Sequencer()
+        await asyncio.gather(*(SessionReplay(s, args, stats, t_zero, order).run() for s in sessions))
+        wall = time.perf_counter() - t_start
+        cpu = time.process_time() - cpu0
+    finally:
+        try:
+            if server_task is not None:
+                await server.stop()
+                await server_task
+        finally:
+            if scratch is not None:
+                os.chdir(cwd)
+                scratch.cleanup()
+    recorded_span = max((s.closed if s.closed is not None else (s.inbound[-1].t if s.inbound else s.opened)) for s in sessions) - min(s.opened for s in sessions)
+    return {
+        "benchmark": "replay",
+        "version": __version__,
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "recordings": [str(p) for p in args.recordings],
+        "mode": "fast" if args.fast else f"x{args.speed:g}",
+        "in_process": server is not None,
+        "sessions": len(sessions),
+        "recorded_seconds": round(recorded_span, 2),
+        "seconds": round(wall, 3),
+        "process_cpu_seconds": round(cpu, 3),
+        "frames_sent": stats.frames_sent,
+        "frames_received": stats.frames_received,
+        "received": dict(sorted(stats.received.items())),
+        "recorded_actions": stats.recorded_actions,
+        "live_actions": stats.live_actions,
+        "gate_wait": percentiles(stats.gate_wait_us) if stats.gate_wait_us else None,
+        "gate_timeouts": stats.gate_timeouts,
+        "lateness": percentiles(stats.lateness_us) if stats.lateness_us else None,
+        "failed_sessions": stats.failed_sessions,
+    }
+
+
+def _compare(report: Dict[str, Any], base: Dict[str, Any], baseline_path: Path) -> None:
+    print(f"vs {baseline_path} (version {base.get('version')}, {base.get('mode')}):")
+    ratio = report["seconds"] / base["seconds"] if base.get("seconds") else float("nan")
+    print(f"  wall x{ratio:.2f}")
+    if report.get("gate_wait") and base.get("gate_wait"):
+        old = base["gate_wait"]["p99_us"]
+        print(f"  gate wait p99 x{report['gate_wait']['p99_us'] / old:.2f}" if old else "  gate wait p99: no baseline")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Replay recorded backend traffic")
+    ap.add_argument("recordings", nargs="+", help=".amcrec.gz files (one per shard for a sharded recording)")
+    pace = ap.add_mutually_exclusive_group()
+    pace.add_argument("--fast", action="store_true", help="send as fast as the backend keeps up")
+    pace.add_argument("--speed", type=float, default=1.0, help="multiple of the original pace")
+    ap.add_argument("--url", default=None, help="replay against a running backend instead of one in this process")
+    ap.add_argument("--password", default=None, help="replace the recorded handshake password")
+    ap.add_argument("--gate-timeout-s", type=float, default=30.0)
+    ap.add_argument("--out", default="data/bench/replay.json")
+    ap.add_argument("--baseline", default=None, help="previous report to compare wall time and gate waits against")
+    args = ap.parse_args(argv)
+    if args.speed <= 0:
+        ap.error("--speed must be positive")
+
+    out_path = Path(args.out).resolve()
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    # Read the baseline up front; --out may point at the same file
+    base_report: Optional[Dict[str, Any]] = None
+    if baseline is not None:
+        try:
+            base_report = json.loads(baseline.read_text(encoding="utf-8"))
+        except Exception as exc:
+            print(f"baseline unreadable: {exc}")
+
+    sessions = [s for s in load_sessions([Path(p) for p in args.recordings]) if s.inbound]
+    if not sessions:
+        print("no sessions with inbound traffic in the recording")
+        return
+    report = asyncio.run(run(args, sessions))
+    print(
+        f"{report['sessions']} sessions, {report['frames_sent']} frames in {report['seconds']:.2f}s "
+        f"(recorded {report['recorded_seconds']:.2f}s, {report['mode']}); "
+        f"actions {report['live_actions']}/{report['recorded_actions']}, gate timeouts {report['gate_timeouts']}"
+    )
+    if report["gate_wait"]:
+        g = report["gate_wait"]
+        print(f"gate wait p50={g['p50_us'] / 1000:.1f}ms p99={g['p99_us'] / 1000:.1f}ms max={g['max_us'] / 1000:.1f}ms")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {out_path}")
+    if baseline is not None and base_report is not None:
+        _compare(report, base_report, baseline)
+
+
+if __name__ == "__main__":
+    main()
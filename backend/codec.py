@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+"""Wire codecs for backend–client frames.
+
+Purpose: Let a session trade JSON for a compact binary encoding once both ends
+agree, without changing message shapes.
+
+How: The handshake is always JSON. The client lists the codecs it can speak in
+`capabilities.codecs`; the backend picks the first entry of `wire_codecs`
+(config) that the client offered and is importable here, and names it in the
+handshake `settings_update`. From then on the backend sends binary frames in
+that codec. Inbound frames are decoded by frame kind: text is JSON, binary is
+the session codec, so the switch-over needs no coordination.
+
+MessagePack (`msgpack`) and CBOR (`cbor2`) are optional dependencies; when one
+is missing it is simply never negotiated.
+
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Union
+
+
+logger = logging.getLogger("automc.codec")
+
+Frame = Union[str, bytes]
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    binary: bool
+    encode: Callable[[Any], Frame]
+    decode: Callable[[Frame], Any]
+
+
+def _json_encode(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+JSON = Codec(name="json", binary=False, encode=_json_encode, decode=json.loads)
+
+CODECS: Dict[str, Codec] = {"json": JSON}
+
+try:
+    import msgpack  # type: ignore
+
+    CODECS["msgpack"] = Codec(
+        name="msgpack",
+        binary=True,
+        encode=lambda obj: msgpack.packb(obj, use_bin_type=True),
+        decode=lambda raw: msgpack.unpackb(raw, raw=False),
+    )
+except ImportError:
+    pass
+
+try:
+    import cbor2  # type: ignore
+
+    CODECS["cbor"] = Codec(name="cbor", binary=True, encode=cbor2.dumps, decode=cbor2.loads)
+except ImportError:
+    pass
+
+
+def negotiate(preferred: Iterable[str], offered: Any) -> Codec:
+    """First codec in `preferred` that the client offered and is available; JSON otherwise."""
+    if not isinstance(offered, list):
+        return JSON
+    offered_names = {str(x) for x in offered}
+    for name in preferred:
+        if name in offered_names and name in CODECS:
+            return CODECS[name]
+    return JSON
+
+
+def decode_frame(raw: Frame, codec: Codec) -> Any:
+    """Decode an inbound frame: text frames are always JSON, binary frames use the session codec."""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not codec.binary:
+        raise ValueError("binary frame before a binary codec was negotiated")
+    return codec.decode(raw)
+
+
+def available() -> List[str]:
+    return list(CODECS)
@@ -6,13 +6,29 @@ Purpose: Load settings from a single JSON file in the project root
 (`config.json`). Environment variables are no longer used. Configure root
 logging with a concise format.
 
+How: `load_settings()` returns the process-wide `Settings`. The file is parsed
+once, and `SettingsStore` re-reads it when its mtime or size changes (polled
+every `settings_reload_interval_ms` while the server runs). A new `Settings` is
+built in full and then swapped in with one assignment, so readers see the old
+values or the new ones, never a mix. An edit that fails to parse or validate is
+logged and ignored; the running values stay. Listeners get `(old, new)` after a
+swap. The server uses this to push `settings_update` to clients and to retune
+the scheduler. Objects that copied values at construction (a running
+dispatcher, the persistence flushers) keep them. Keys in `RESTART_KEYS` take
+effect only after a restart.
+
 """
 
+import asyncio
+import dataclasses
 import logging
 import json
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("automc.config")
 
 
 @dataclass(frozen=True)
@@ -38,9 +54,35 @@ class Settings:
     inventory_diff_debounce_ms: int
     chat_max_length: int
     crafting_click_delay_ms: int
+    # Protocol negotiation
+    telemetry_delta_enabled: bool
+    wire_codecs: Tuple[str, ...]  # preference order; first one the client offers wins
+    batch_window_ms: int
+    # Outbound backpressure
+    outbound_queue_max: int
+    outbound_overflow_policy: str  # drop_oldest | drop_newest | close
+    # Observability
+    metrics_port: int
+    settings_reload_interval_ms: int  # 0 = never re-read settings/config.json
+    record_traffic: bool  # backend/traffic.py; replay with backend.bench.replay
+    # Process layout (backend/coordinator.py); 0 or 1 = single process
+    shard_workers: int
     # Backend behavioral tuning
-    acquire_poll_interval_ms: int
-    # Timeouts removed
+    acquire_timeout_ms: int  # 0 = wait indefinitely
+    await_items_timeout_ms: int  # crafter waiting for helper deliveries; 0 = indefinitely, like acquire_timeout_ms
+    route_budget_ms: int  # travel-aware ordering of world acquisitions; 0 = planner order
+    # Dispatch execution
+    dispatch_mode: str  # paced | ack
+    dispatch_window: int
+    dispatch_ack_timeout_ms: int
+    # Action scheduler (token buckets; 0 = unlimited)
+    mod_native_actions_per_sec: int
+    global_chat_sends_per_sec: int
+    global_mod_native_actions_per_sec: int
+    # Persistence cadence
+    state_flush_interval_ms: int
+    state_compact_interval_ms: int
+    storage_flush_interval_ms: int
 
 
 def _as_bool(value, default: bool) -> bool:
@@ -54,12 +96,76 @@ def _as_bool(value, default: bool) -> bool:
         return default
 
 
-def load_settings() -> Settings:
+def _as_overflow_policy(value) -> str:
+    policy = str(value).strip().lower()
+    if policy not in ("drop_oldest", "drop_newest", "close"):
+        raise ValueError(f"outbound_overflow_policy must be drop_oldest, drop_newest or close (got {value!r})")
+    return policy
+
+
+def _as_dispatch_mode(value) -> str:
+    mode = str(value).strip().lower()
+    if mode not in ("paced", "ack"):
+        raise ValueError(f"dispatch_mode must be paced or ack (got {value!r})")
+    return mode
+
+
+# Keys added after the original config format. They are optional, so an older
+# settings/config.json keeps loading; the defaults match the shipped file.
+OPTIONAL_DEFAULTS: Dict[str, Any] = {
+    "acquire_timeout_ms": 0,
+    "await_items_timeout_ms": 600_000,
+    "route_budget_ms": 5,
+    "dispatch_mode": "paced",
+    "dispatch_window": 4,
+    "dispatch_ack_timeout_ms": 120_000,
+    "mod_native_actions_per_sec": 10,
+    "global_chat_sends_per_sec": 10,
+    "global_mod_native_actions_per_sec": 0,
+    "state_flush_interval_ms": 1000,
+    "state_compact_interval_ms": 60_000,
+    "storage_flush_interval_ms": 1000,
+    "telemetry_delta_enabled": True,
+    "wire_codecs": ["msgpack", "json"],
+    "batch_window_ms": 5,
+    "outbound_queue_max": 256,
+    "outbound_overflow_policy": "drop_oldest",
+    "metrics_port": 0,
+    "record_traffic": False,
+    "settings_reload_interval_ms": 1000,
+    "shard_workers": 0,
+}
+
+
+# Flattened client settings, sent in every settings_update
+CLIENT_KEYS = (
+    "telemetry_interval_ms", "chat_bridge_enabled", "chat_bridge_rate_limit_per_sec", "command_prefix",
+    "echo_public_default", "ack_on_command", "message_pump_max_per_tick", "message_pump_queue_cap",
+    "inventory_diff_debounce_ms", "chat_max_length", "crafting_click_delay_ms", "feedback_prefix",
+    "feedback_prefix_bracket_color", "feedback_prefix_inner_color",
+)
+
+# Read once at startup (sockets, processes, flush cadences); a reload only logs that they changed
+RESTART_KEYS = frozenset({
+    "host", "port", "shard_workers", "metrics_port", "record_traffic", "settings_reload_interval_ms",
+    "state_flush_interval_ms", "state_compact_interval_ms", "storage_flush_interval_ms",
+})
+
+
+def client_settings(settings: Settings) -> Dict[str, Any]:
+    return {key: getattr(settings, key) for key in CLIENT_KEYS}
+
+
+def changed_keys(old: Settings, new: Settings) -> List[str]:
+    return [f.name for f in dataclasses.fields(Settings) if getattr(old, f.name) != getattr(new, f.name)]
+
+
+def _read_settings(cfg_path: Path) -> Settings:
     """Load settings strictly from config.json at project root.
 
-    No environment variables or fallbacks are used; the file must exist and contain the required keys.
+    No environment variables are used; the file must exist and contain the required keys.
+    Keys in OPTIONAL_DEFAULTS may be omitted.
     """
-    cfg_path = Path("settings/config.json")
     if not cfg_path.exists():
         raise FileNotFoundError("settings/config.json not found in project root")
     try:
@@ -79,12 +185,14 @@ def load_settings() -> Settings:
         "command_prefix","echo_public_default","ack_on_command","feedback_prefix",
         "message_pump_max_per_tick","message_pump_queue_cap","inventory_diff_debounce_ms",
         "chat_max_length","crafting_click_delay_ms",
-        # backend tuning
-        "acquire_poll_interval_ms",
     ]
     missing = [k for k in required_keys if k not in data]
     if missing:
         raise KeyError(f"settings/config.json missing required keys: {', '.join(missing)}")
+    data = {**OPTIONAL_DEFAULTS, **data}
+    if "acquire_poll_interval_ms" in data:
+        # Acquisitions wait on telemetry now; older config files still carry the polling interval
+        logger.warning("settings/config.json: acquire_poll_interval_ms is deprecated and ignored (see acquire_timeout_ms)")
 
     settings = Settings(
         host=str(gv("host", None)),
@@ -107,11 +215,119 @@ def load_settings() -> Settings:
         inventory_diff_debounce_ms=int(gv("inventory_diff_debounce_ms", None)),
         chat_max_length=int(gv("chat_max_length", None)),
         crafting_click_delay_ms=int(gv("crafting_click_delay_ms", None)),
-        acquire_poll_interval_ms=int(data["acquire_poll_interval_ms"]),
+        telemetry_delta_enabled=_as_bool(data["telemetry_delta_enabled"], False),
+        wire_codecs=tuple(str(x) for x in data["wire_codecs"]),
+        batch_window_ms=max(int(data["batch_window_ms"]), 0),
+        outbound_queue_max=max(int(data["outbound_queue_max"]), 1),
+        outbound_overflow_policy=_as_overflow_policy(data["outbound_overflow_policy"]),
+        metrics_port=int(data["metrics_port"]),
+        record_traffic=_as_bool(data["record_traffic"], False),
+        settings_reload_interval_ms=max(int(data["settings_reload_interval_ms"]), 0),
+        shard_workers=max(int(data["shard_workers"]), 0),
+        acquire_timeout_ms=max(int(data["acquire_timeout_ms"]), 0),
+        await_items_timeout_ms=max(int(data["await_items_timeout_ms"]), 0),
+        route_budget_ms=max(int(data["route_budget_ms"]), 0),
+        dispatch_mode=_as_dispatch_mode(data["dispatch_mode"]),
+        dispatch_window=max(int(data["dispatch_window"]), 1),
+        dispatch_ack_timeout_ms=max(int(data["dispatch_ack_timeout_ms"]), 0),
+        mod_native_actions_per_sec=max(int(data["mod_native_actions_per_sec"]), 0),
+        global_chat_sends_per_sec=max(int(data["global_chat_sends_per_sec"]), 0),
+        global_mod_native_actions_per_sec=max(int(data["global_mod_native_actions_per_sec"]), 0),
+        state_flush_interval_ms=int(data["state_flush_interval_ms"]),
+        state_compact_interval_ms=int(data["state_compact_interval_ms"]),
+        storage_flush_interval_ms=int(data["storage_flush_interval_ms"]),
     )
     return settings
 
 
+class SettingsStore:
+    """Process-wide settings: parsed once, swapped atomically when the file changes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.current: Optional[Settings] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._listeners: List[Callable[[Settings, Settings], None]] = []
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> Settings:
+        if self.current is None:
+            # First load is strict: a broken config must stop startup
+            signature = self._stat()
+            self.current = _read_settings(self.path)
+            self._signature = signature
+        return self.current
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed; True if new settings were swapped in."""
+        signature = self._stat()
+        if signature is None or signature == self._signature or self.current is None:
+            return False
+        # Recorded before parsing, so a broken edit is reported once rather than on every poll
+        self._signature = signature
+        try:
+            new = _read_settings(self.path)
+        except Exception as exc:
+            logger.warning("ignoring invalid settings/config.json edit; keeping running settings: %s", exc)
+            return False
+        old, self.current = self.current, new
+        if new == old:
+            return False
+        for listener in list(self._listeners):
+            try:
+                listener(old, new)
+            except Exception:
+                logger.exception("settings listener failed")
+        return True
+
+    def subscribe(self, listener: Callable[[Settings, Settings], None]) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Settings, Settings], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def start(self) -> None:
+        """Start polling the file on the running event loop (no-op if the interval is 0)."""
+        if self.get().settings_reload_interval_ms <= 0:
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(self.get().settings_reload_interval_ms / 1000.0))
+
+    async def close(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            self.reload()
+
+
+_STORE = SettingsStore(Path("settings/config.json"))
+
+
+def settings_store() -> SettingsStore:
+    return _STORE
+
+
+def load_settings() -> Settings:
+    """The current settings; parsed from settings/config.json on first use, then cached."""
+    return _STORE.get()
+
+
 def configure_logging(log_level: str) -> None:
     """Configure root logger with a concise, structured-ish format."""
     level = getattr(logging, log_level.upper(), logging.INFO)
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+"""Sharded backend: a state-owning coordinator plus N worker processes.
+
+Purpose: Spread JSON decoding, planning and dispatch for many agents over
+several cores. With one event loop in one process they all share one core.
+
+How: `run_sharded` starts the coordinator in the main process, then spawns
+`shard_workers` worker processes (`backend.server.worker_main`). Each worker
+runs a normal `BackendServer` bound to the same port with SO_REUSEPORT. The
+kernel spreads new connections over the workers, and a session stays on the
+worker that accepted it.
+
+The coordinator owns everything shared between agents and is reached over
+loopback IPC (`backend/ipc.py`):
+
+- Telemetry persistence. Each worker keeps the live state of its own agents in
+  memory (waiters, delta merging). Its flusher sends dirty entries here, where
+  a regular `StateService` persists them and answers cross-shard reads.
+- The `StorageCatalog`. Workers forward container snapshots/diffs and query it.
+- The `PlanJournal`. Workers forward plan events, so `!resume` works whichever
+  worker an agent reconnects to.
+- A presence directory (player -> worker, username) for `!who` and routing.
+- Relays. Fan-out, `!stop` and commands evaluated for other agents are
+  forwarded to the other workers (or to the one owning a player). Each worker
+  applies them to its local sessions.
+- Watches. A worker that needs another shard's agent state (a helper
+  delivering to a crafter on another shard) subscribes to it. The coordinator
+  pushes that player's entries as they arrive.
+
+"""
+
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import signal
+import socket
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .config import Settings, configure_logging
+from .ipc import Peer
+from .plan_journal import PlanJournal
+from .state_service import StateService
+from .storage import StorageCatalog
+
+
+logger = logging.getLogger("automc.coordinator")
+
+# Read-only StorageCatalog queries workers may call
+STORAGE_QUERIES = frozenset({"count_item", "nearest_with_item", "within_radius", "top_containers", "nearest_container"})
+PLAN_EVENTS = frozenset({"begin", "step_done", "stopped", "end"})
+
+
+class Coordinator:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.state = StateService(
+            Path("data/state.json"),
+            flush_interval_ms=settings.state_flush_interval_ms,
+            compact_interval_ms=settings.state_compact_interval_ms,
+        )
+        self.state.load()
+        self.storage = StorageCatalog(flush_interval_ms=settings.storage_flush_interval_ms)
+        self.plans = PlanJournal(
+            Path("data/plans.jsonl"),
+            flush_interval_ms=settings.state_flush_interval_ms,
+            compact_interval_ms=settings.state_compact_interval_ms,
+        )
+        self.plans.load()
+        self._workers: Set[Peer] = set()
+        self._owner: Dict[str, Peer] = {}  # player_id -> worker hosting its session
+        self._names: Dict[str, str] = {}  # player_id -> username
+        self._watchers: Dict[str, Set[Peer]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self) -> int:
+        """Start persistence and listen for workers on a loopback port; returns the port."""
+        self.state.start()
+        self.storage.start()
+        self.plans.start()
+        self._server = await asyncio.start_server(self._accept, "127.0.0.1", 0)
+        self.port = int(self._server.sockets[0].getsockname()[1])
+        return self.port
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for peer in list(self._workers):
+            await peer.close()
+        await self.state.close()
+        await self.storage.close()
+        await self.plans.close()
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = Peer(reader, writer, self._handle)
+        self._workers.add(peer)
+        try:
+            await peer.serve()
+        finally:
+            self._workers.discard(peer)
+            for pid in [pid for pid, owner in self._owner.items() if owner is peer]:
+                self._owner.pop(pid, None)
+            for watchers in self._watchers.values():
+                watchers.discard(peer)
+
+    async def _handle(self, peer: Peer, method: str, params: Dict[str, Any]) -> Any:
+        handler = getattr(self, f"_on_{method}", None)
+        if handler is None:
+            raise ValueError(f"unknown method {method}")
+        return await handler(peer, **params)
+
+    # --- telemetry -----------------------------------------------------------
+
+    async def _on_telemetry(self, peer: Peer, batch: Dict[str, Dict[str, Any]]) -> None:
+        for pid, entry in batch.items():
+            await self.state.update_telemetry(pid, str(entry.get("ts", "")), entry.get("state", {}))
+            for watcher in self._watchers.get(pid, ()):
+                if watcher is not peer:
+                    watcher.notify("mirror", player=pid, entry=entry)
+
+    async def _on_player_state(self, peer: Peer, player: str) -> Optional[Dict[str, Any]]:
+        return self.state.get_player_state(player)
+
+    async def _on_watch(self, peer: Peer, player: str) -> None:
+        self._watchers.setdefault(player, set()).add(peer)
+        entry = self.state.get_player_state(player)
+        if entry is not None:
+            peer.notify("mirror", player=player, entry=entry)
+
+    async def _on_unwatch(self, peer: Peer, player: str) -> None:
+        watchers = self._watchers.get(player)
+        if watchers is not None:
+            watchers.discard(peer)
+            if not watchers:
+                self._watchers.pop(player, None)
+
+    # --- storage catalog -----------------------------------------------------
+
+    async def _on_storage_snapshot(self, peer: Peer, player: str, container: Dict[str, Any]) -> None:
+        self.storage.handle_snapshot(player, container)
+
+    async def _on_storage_diff(self, peer: Peer, player: str, diff: Dict[str, Any]) -> None:
+        self.storage.handle_diff(player, diff)
+
+    async def _on_storage(self, peer: Peer, query: str, args: List[Any]) -> Any:
+        if query not in STORAGE_QUERIES:
+            raise ValueError(f"storage query not allowed: {query}")
+        # JSON turned position tuples into lists
+        args = [tuple(a) if isinstance(a, list) else a for a in args]
+        return getattr(self.storage, query)(*args)
+
+    # --- plan journal --------------------------------------------------------
+
+    async def _on_plan(self, peer: Peer, event: str, args: List[Any]) -> None:
+        if event not in PLAN_EVENTS:
+            raise ValueError(f"unknown plan event {event}")
+        getattr(self.plans, event)(*args)
+
+    async def _on_plan_resumable(self, peer: Peer, player: str) -> Optional[Dict[str, Any]]:
+        rec = self.plans.resumable(player)
+        if rec is None:
+            return None
+        return {**dataclasses.asdict(rec), "done": sorted(rec.done)}
+
+    # --- presence and relays -------------------------------------------------
+
+    async def _on_presence(self, peer: Peer, player: str, username: Optional[str] = None, online: bool = True) -> None:
+        if not online:
+            if self._owner.get(player) is peer:
+                self._owner.pop(player, None)
+            return
+        self._owner[player] = peer
+        if username:
+            self._names[player] = username
+
+    async def _on_who(self, peer: Peer) -> List[List[Optional[str]]]:
+        return [[pid, self._names.get(pid)] for pid in self._owner]
+
+    async def _on_relay(self, peer: Peer, msg: Dict[str, Any], player: Optional[str] = None) -> None:
+        """Forward to the worker owning `player`, or to every other worker."""
+        if player is not None:
+            owner = self._owner.get(player)
+            if owner is not None and owner is not peer:
+                owner.notify("relay", msg=msg)
+            return
+        for worker in self._workers:
+            if worker is not peer:
+                worker.notify("relay", msg=msg)
+
+
+def _reuse_port_supported() -> bool:
+    if not hasattr(socket, "SO_REUSEPORT"):
+        return False
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        return True
+    except OSError:
+        return False
+
+
+def run_sharded(settings: Settings) -> bool:
+    """Run the coordinator and `shard_workers` workers until SIGINT/SIGTERM; False if unsupported here."""
+    if not _reuse_port_supported():
+        return False
+    configure_logging(settings.log_level)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    coordinator = Coordinator(settings)
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    async def _run() -> None:
+        port = await coordinator.start()
+        # spawn: workers must not inherit the coordinator's event loop or open files
+        ctx = multiprocessing.get_context("spawn")
+        from .server import worker_main
+
+        workers = [ctx.Process(target=worker_main, args=(i, port), name=f"automc-shard-{i}") for i in range(settings.shard_workers)]
+        for w in workers:
+            w.start()
+        logger.info("coordinator on 127.0.0.1:%s with %d workers", port, len(workers))
+        try:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                if not any(w.is_alive() for w in workers):
+                    logger.warning("all workers exited")
+                    break
+        finally:
+            for w in workers:
+                if w.is_alive():
+                    w.terminate()  # SIGTERM: workers shut down gracefully
+            for w in workers:
+                await asyncio.to_thread(w.join, 10)
+            await coordinator.close()
+
+    try:
+        loop.run_until_complete(_run())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+    return True
@@ -4,33 +4,59 @@ from __future__ import annotations
 
 Purpose: Centralize loading of external JSON mappings that control acquisition
 and tool tier requirements, keeping code free of hardcoded tables.
+
+How: All `settings/*.json` tables are read, validated and compiled together
+into one immutable `GameData` snapshot with a version number. `game_data()`
+returns the current snapshot; the `load_*` helpers return fields of it and do
+no work per call. While the server runs, `GameDataStore` polls the files'
+mtimes and sizes every `settings_reload_interval_ms`. After an edit it builds
+a complete new snapshot off the event loop and swaps it in with one
+assignment. A build that fails (bad JSON, invalid entry, consume cycle) is
+logged and the previous snapshot stays. A plan takes one snapshot when it is
+made and uses it until it ends, so it never sees half an edit.
+
 """
 
+import asyncio
 import json
+import logging
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from .skill_graph import BillOfMaterials, SkillGraph, compile_bill_of_materials, compile_skill_graph
+
 
+logger = logging.getLogger("automc.data_files")
 
-_CACHE: Dict[str, Any] = {}
+DATA_FILES = ("acquisition_map.json", "tool_tiers.json", "aliases.json", "skill_graph.json", "mineable_items.json")
+
+
+@dataclass(frozen=True)
+class GameData:
+    version: int  # 1 for the first snapshot of the process, +1 per reload
+    acquisition_map: Mapping[str, str]  # item_id -> baritone target
+    tool_tiers: Mapping[str, Tuple[str, ...]]  # mineable item_id -> acceptable tools, weakest first
+    aliases: Mapping[str, str]  # alias -> canonical item_id
+    skills: Mapping[str, Mapping[str, Any]]  # validated skill_graph.json entries
+    mineable_items: Tuple[str, ...]
+    mineable_set: FrozenSet[str]
+    skill_graph: SkillGraph
+    bill_of_materials: BillOfMaterials
 
 
 def _load_required(path: Path) -> Any:
-    key = str(path.resolve())
-    if key in _CACHE:
-        return _CACHE[key]
     if not path.exists():
         raise FileNotFoundError(f"required data file missing: {path}")
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        return json.loads(path.read_text(encoding="utf-8"))
     except Exception as e:
         raise RuntimeError(f"failed to parse {path}: {e}")
-    _CACHE[key] = data
-    return data
 
 
-def load_acquisition_map() -> Dict[str, str]:
-    """Return mapping of item_id -> baritone target string (e.g., iron_ore)."""
-    data = _load_required(Path("settings/acquisition_map.json"))
+def _parse_acquisition_map(data: Any) -> Dict[str, str]:
     if not isinstance(data, dict):
         raise ValueError("acquisition_map.json must be an object of {item_id: target}")
     # Normalize keys/values to strings
@@ -42,22 +68,18 @@ def load_acquisition_map() -> Dict[str, str]:
     return out
 
 
-def load_tool_tiers() -> Dict[str, list[str]]:
-    """Return mapping of mineable item_id -> ordered list of acceptable tool ids."""
-    data = _load_required(Path("settings/tool_tiers.json"))
+def _parse_tool_tiers(data: Any) -> Dict[str, Tuple[str, ...]]:
     if not isinstance(data, dict):
         raise ValueError("tool_tiers.json must be an object of {item_id: [tools...]}\n")
-    out: Dict[str, list[str]] = {}
+    out: Dict[str, Tuple[str, ...]] = {}
     for k, v in data.items():
         if not isinstance(k, str) or not isinstance(v, list) or not all(isinstance(x, str) for x in v):
             raise ValueError("tool_tiers contains invalid entry")
-        out[k] = list(v)
+        out[k] = tuple(v)
     return out
 
 
-def load_aliases() -> Dict[str, str]:
-    """Return mapping of alias -> canonical item_id (e.g., iron_pick -> minecraft:iron_pickaxe)."""
-    data = _load_required(Path("settings/aliases.json"))
+def _parse_aliases(data: Any) -> Dict[str, str]:
     if not isinstance(data, dict):
         raise ValueError("aliases.json must be an object of {alias: canonical_id}")
     out: Dict[str, str] = {}
@@ -68,12 +90,8 @@ def load_aliases() -> Dict[str, str]:
     return out
 
 
-def load_skill_graph() -> Dict[str, Dict[str, Any]]:
-    """Return mapping of recipe_id -> skill dict {op, consume, require, obtain}.
-
-    File: settings/skill_graph.json with shape: { "skills": { <id>: { ... } } }
-    """
-    data = _load_required(Path("settings/skill_graph.json"))
+def _parse_skill_graph(data: Any) -> Dict[str, Dict[str, Any]]:
+    """Shape: { "skills": { <id>: { op, consume, require, obtain } } }."""
     if not isinstance(data, dict) or "skills" not in data or not isinstance(data["skills"], dict):
         raise ValueError("skill_graph.json must contain top-level 'skills' object")
     skills_in = data["skills"]
@@ -99,12 +117,147 @@ def load_skill_graph() -> Dict[str, Dict[str, Any]]:
     return out
 
 
-def load_mineable_items() -> List[str]:
-    """Return list of item ids that are acquired from world mining.
+def _parse_mineable_items(data: Any) -> Tuple[str, ...]:
+    if not isinstance(data, list) or not all(isinstance(x, str) for x in data):
+        raise ValueError("mineable_items.json must be an array of strings")
+    return tuple(data)
+
+
+def build_game_data(root: Path, version: int) -> GameData:
+    """Read, validate and compile every table under `root`; raises on the first problem."""
+    skills = _parse_skill_graph(_load_required(root / "skill_graph.json"))
+    mineable = _parse_mineable_items(_load_required(root / "mineable_items.json"))
+    graph = compile_skill_graph(skills)
+    return GameData(
+        version=version,
+        acquisition_map=MappingProxyType(_parse_acquisition_map(_load_required(root / "acquisition_map.json"))),
+        tool_tiers=MappingProxyType(_parse_tool_tiers(_load_required(root / "tool_tiers.json"))),
+        aliases=MappingProxyType(_parse_aliases(_load_required(root / "aliases.json"))),
+        skills=MappingProxyType({rid: MappingProxyType(s) for rid, s in skills.items()}),
+        mineable_items=mineable,
+        mineable_set=frozenset(mineable),
+        skill_graph=graph,
+        bill_of_materials=compile_bill_of_materials(graph, list(mineable)),
+    )
+
+
+class GameDataStore:
+    """The current GameData; rebuilt in the background when a data file changes."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.current: Optional[GameData] = None
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Tuple[Any, ...]:
+        out: List[Any] = []
+        for name in DATA_FILES:
+            try:
+                st = (self.root / name).stat()
+                out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def get(self) -> GameData:
+        if self.current is None:
+            signature = self._stat()
+            self.current = build_game_data(self.root, 1)
+            self._signature = signature
+        return self.current
+
+    def reload(self) -> bool:
+        """Rebuild if any file changed; True if a new snapshot was swapped in."""
+        signature = self._stat()
+        if signature == self._signature or self.current is None:
+            return False
+        # Recorded before building, so a broken edit is reported once rather than on every poll
+        self._signature = signature
+        t0 = time.perf_counter()
+        try:
+            data = build_game_data(self.root, self.current.version + 1)
+        except Exception as exc:
+            logger.warning("ignoring invalid game data edit; keeping version %d: %s", self.current.version, exc)
+            return False
+        self.current = data
+        logger.info(
+            "game data reloaded: version %d (%d recipes) in %.1f ms",
+            data.version, sum(1 for r in data.skill_graph.recipes if r is not None), (time.perf_counter() - t0) * 1000.0,
+        )
+        return True
+
+    def start(self, interval_ms: int) -> None:
+        """Start polling the files on the running event loop (no-op if the interval is 0)."""
+        if interval_ms <= 0:
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(interval_ms / 1000.0))
+
+    async def close(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            # Parsing and compiling a large graph must not stall the event loop
+            await asyncio.to_thread(self.reload)
+
+
+_STORE = GameDataStore(Path("settings"))
+
+
+def game_data_store() -> GameDataStore:
+    return _STORE
+
+
+def game_data() -> GameData:
+    """The current snapshot; built on first use. Keep the returned object for a consistent view."""
+    return _STORE.get()
+
+
+def load_acquisition_map() -> Mapping[str, str]:
+    """Return mapping of item_id -> baritone target string (e.g., iron_ore)."""
+    return game_data().acquisition_map
+
+
+def load_tool_tiers() -> Mapping[str, Tuple[str, ...]]:
+    """Return mapping of mineable item_id -> ordered tuple of acceptable tool ids."""
+    return game_data().tool_tiers
+
+
+def load_aliases() -> Mapping[str, str]:
+    """Return mapping of alias -> canonical item_id (e.g., iron_pick -> minecraft:iron_pickaxe)."""
+    return game_data().aliases
+
+
+def load_skill_graph() -> Mapping[str, Mapping[str, Any]]:
+    """Return mapping of recipe_id -> skill dict {op, consume, require, obtain}.
+
+    File: settings/skill_graph.json with shape: { "skills": { <id>: { ... } } }
+    """
+    return game_data().skills
+
+
+def load_compiled_skill_graph() -> SkillGraph:
+    """Return the compiled skill graph of the current snapshot."""
+    return game_data().skill_graph
+
+
+def load_bill_of_materials() -> BillOfMaterials:
+    """Return per-item closures down to mineable leaves for the current snapshot."""
+    return game_data().bill_of_materials
+
+
+def load_mineable_items() -> Tuple[str, ...]:
+    """Return item ids that are acquired from world mining.
 
     File: settings/mineable_items.json (array of strings).
     """
-    data = _load_required(Path("settings/mineable_items.json"))
-    if not isinstance(data, list) or not all(isinstance(x, str) for x in data):
-        raise ValueError("mineable_items.json must be an array of strings")
-    return list(data)
+    return game_data().mineable_items
@@ -3,10 +3,28 @@ from __future__ import annotations
 """Action dispatcher for streaming planner steps to the mod.
 
 Purpose: Convert planner steps into concrete action_request messages and send
-them to the client at a paced interval. Uses chat-bridge for world acquisition
-and mod-native for crafting/smelting.
+them to the client as fast as the rate limits allow. Uses chat-bridge for world
+acquisition and mod-native for crafting/smelting.
 
-Engineering notes: Keep JSON lean (minified); preserve ordering; avoid waiting inline for progress; centralize mapping logic.
+How: Every action takes a token from the shared `ActionScheduler` for its
+channel (per-agent and global buckets) right before it is sent, so mod-native
+crafts are not held back by chat pacing.
+
+With `dispatch_mode: "ack"` each action's `progress_update` is awaited through
+the session's `ProgressTracker`. Chat-bridge actions are a barrier: in-flight
+crafts settle first, then the action is sent and its ack awaited. A chat action
+the client skipped (its local rate limit) is resent once. Consecutive
+mod-native steps are pipelined up to `dispatch_window` in flight. A step waits
+only for in-flight steps that produce one of its inputs (per the skill graph).
+`fail`, `skipped` or no ack within `dispatch_ack_timeout_ms` stops the plan and
+tells the player which step failed. The exception is a `skipped` smelt: the mod
+does not implement smelting yet, so the plan carries on as it does when paced.
+`"paced"` (the default) sends without waiting for acks.
+
+Acquire steps routed by `backend/route.py` carry a `site`; when the agent is
+more than `SITE_RADIUS` away it walks there (`#goto x y z`) before `#mine`.
+
+Engineering notes: Keep JSON lean (minified); preserve ordering; in paced mode never wait inline for progress; centralize mapping logic.
 
 """
 
@@ -14,15 +32,31 @@ import asyncio
 import json
 import logging
 import uuid
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from websockets.server import WebSocketServerProtocol
+from . import metrics
 from .config import load_settings
-from .data_files import load_acquisition_map
+from .data_files import GameData, game_data
+from .progress import ProgressTracker, Verdict
+from .scheduler import ActionScheduler
 
 
 logger = logging.getLogger("automc.dispatcher")
 
+# Blocks from the receiver at which a delivering agent drops its items (pickup range is ~1)
+DELIVER_RADIUS = 3.0
+# A routed acquire walks to its remembered site first unless already this close; #mine searches from there
+SITE_RADIUS = 32.0
+
+
+class StepFailed(Exception):
+    def __init__(self, msg: Dict[str, Any], status: str, note: Optional[str]) -> None:
+        super().__init__(f"{msg.get('op')} {msg.get('recipe') or msg.get('item') or msg.get('chat_text') or ''}: {status}")
+        self.msg = msg
+        self.status = status
+        self.note = note
+
 
 class Dispatcher:
     def __init__(
@@ -32,31 +66,76 @@ class Dispatcher:
         player_id: Optional[str] = None,
         state_service: Optional[object] = None,
         on_action_send: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        send: Optional[Callable[[Dict[str, Any]], Awaitable[Optional[bool]]]] = None,
+        scheduler: Optional[ActionScheduler] = None,
+        tracker: Optional[ProgressTracker] = None,
+        on_step_done: Optional[Callable[[int], None]] = None,
+        data: Optional[GameData] = None,
     ) -> None:
         self.websocket = websocket
+        # The server's session send path (codec, batching); plain JSON frames otherwise
+        self._send_fn = send
+        # Snapshot for this plan: a settings reload applies to the next one
         self.settings = load_settings()
+        # Game data the plan was made with; a data reload applies to the next plan
+        self.data = data if data is not None else game_data()
         self.player_id = player_id
         self.state_service = state_service
         self._on_action_send = on_action_send
+        # Shared across dispatchers by the server; a private one still enforces per-agent limits
+        self.scheduler = scheduler if scheduler is not None else ActionScheduler(self.settings)
+        # Without a tracker there is nothing to correlate acks with, so dispatch stays paced
+        self.tracker = tracker if self.settings.dispatch_mode == "ack" else None
+        # action_id -> (ack future, action, send time) for mod-native actions awaiting their progress_update
+        self._inflight: Dict[str, Tuple[asyncio.Future, Dict[str, Any], float]] = {}
+        # Plan journal hook (backend/plan_journal.py): called with a step's index once it has completed
+        self._on_step_done = on_step_done
+        # action_id -> step index for pipelined steps, completed by their ack instead of by the loop
+        self._step_of: Dict[str, int] = {}
 
-    async def run_linear(self, steps: List[Dict[str, Any]]) -> None:
-        # Ensure we respect the client's chat-bridge rate limit; never send
-        # chat commands faster than allowed or they will be dropped client-side.
+    async def run_linear(self, steps: List[Dict[str, Any]]) -> str:
+        """Run the plan to the end; returns "done", or "failed" when a step stopped it."""
+        metrics.DISPATCH_ACTIVE.inc()
+        depth_label = self.player_id or "unknown"
         try:
-            chat_rate = int(self.settings.chat_bridge_rate_limit_per_sec)
-        except Exception:
-            chat_rate = 0
-        min_chat_interval_s = 0.0 if chat_rate <= 0 else (1.0 / float(chat_rate))
-        # Pace actions conservatively: always add configured spacing on top of the
-        # client's chat-bridge minimum interval to avoid sent=false due to jitter.
-        action_spacing_s = max(int(self.settings.default_action_spacing_ms) / 1000.0, 0.0)
-        spacing = min_chat_interval_s + action_spacing_s
+            await self._run_steps(steps, depth_label)
+            await self._settle(all_done=True)
+            return "done"
+        except StepFailed as exc:
+            logger.warning("plan stopped for %s: %s (%s)", self.player_id, exc, exc.note)
+            await self._notify(f"Stopped: {exc.msg.get('op')} {exc.msg.get('recipe') or exc.msg.get('item') or exc.msg.get('chat_text') or ''} -> {exc.status}"
+                               + (f" ({exc.note})" if exc.note else ""))
+            return "failed"
+        finally:
+            if self.tracker is not None:
+                for aid in list(self._inflight):
+                    self.tracker.discard(aid)
+            self._inflight.clear()
+            self._step_of.clear()
+            metrics.DISPATCH_ACTIVE.dec()
+            metrics.DISPATCH_QUEUE_DEPTH.set(0, depth_label)
+
+    async def _run_steps(self, steps: List[Dict[str, Any]], depth_label: str) -> None:
         last_chat_text: str = ""
-        for step in steps:
+        # A step counts as done when the loop moves past it without StepFailed,
+        # except a #mine whose inventory target was not reached in time
+        finished: Optional[int] = None
+        for n, step in enumerate(steps):
+            if finished is not None:
+                self._step_done(finished)
+            finished = n
+            metrics.DISPATCH_QUEUE_DEPTH.set(len(steps) - n, depth_label)
             action_id = str(uuid.uuid4())
             # Inventory-aware skip: if we already have enough of the target, skip acquire/craft/smelt
             if self._should_skip_step_due_to_inventory(step):
                 continue
+            # Multi-agent plans (backend/partition.py): crafter waits for deliveries, helpers hand over
+            if step.get("op") == "await_items":
+                await self._await_items(step)
+                continue
+            if step.get("op") == "deliver":
+                await self._deliver(step)
+                continue
             # For ensure-context placeholders, send chat-based settings and navigate to target with ETA probe
             if step.get("op") == "acquire" and str(step.get("item")) in {"crafting_table_nearby", "furnace_nearby"}:
                 # 1) Ensure auto-open via chat command
@@ -67,9 +146,7 @@ class Dispatcher:
                     "op": "chat",
                     "chat_text": "#set rightClickContainerOnArrival true",
                 }
-                await self.websocket.send(json.dumps(set_msg, separators=(",", ":")))
-                if spacing > 0:
-                    await asyncio.sleep(spacing)
+                await self._send(set_msg)
                 # 2) Navigate and probe ETA
                 target = "crafting_table" if str(step.get("item")) == "crafting_table_nearby" else "furnace"
                 goto_msg = {
@@ -79,9 +156,7 @@ class Dispatcher:
                     "op": "acquire",
                     "chat_text": f"#goto {target}",
                 }
-                await self.websocket.send(json.dumps(goto_msg, separators=(",", ":")))
-                if spacing > 0:
-                    await asyncio.sleep(spacing)
+                await self._send(goto_msg)
                 # Ask client to surface #eta result
                 eta_cmd = {
                     "type": "action_request",
@@ -90,7 +165,7 @@ class Dispatcher:
                     "op": "chat",
                     "chat_text": "#eta",
                 }
-                await self.websocket.send(json.dumps(eta_cmd, separators=(",", ":")))
+                await self._send(eta_cmd)
                 # This step is fully handled; do not emit another action for it
                 continue
             msg = self._to_action_request(step, action_id)
@@ -106,27 +181,163 @@ class Dispatcher:
                 if chat_text and chat_text == last_chat_text:
                     continue
                 last_chat_text = chat_text
-            await self.websocket.send(json.dumps(msg, separators=(",", ":")))
-            # If we started a world-acquire (#mine), poll inventory and stop when satisfied
+            if step.get("op") == "acquire" and "site" in step and str(msg.get("chat_text", "")).startswith("#mine "):
+                await self._walk_to_site(step)
+            await self._send(msg)
+            if action_id in self._inflight:
+                # Pipelined: done when its ack arrives (_settle)
+                self._step_of[action_id] = n
+                finished = None
+            # If we started a world-acquire (#mine), wait on telemetry and stop when satisfied
             if msg.get("mode") == "chat_bridge" and str(msg.get("chat_text", "")).startswith("#mine "):
                 target_item = str(step.get("item", ""))
                 need = int(step.get("count", 0)) if isinstance(step.get("count"), int) else 0
-                if target_item and need > 0:
+                if target_item and need > 0 and self.player_id and self.state_service:
+                    t0 = metrics.now()
                     reached = await self._wait_until_inventory_has(target_item, need)
-                    if reached:
-                        stop = {
-                            "type": "action_request",
-                            "action_id": str(uuid.uuid4()),
-                            "mode": "chat_bridge",
-                            "op": "chat",
-                            "chat_text": "#stop",
-                        }
-                        await self.websocket.send(json.dumps(stop, separators=(",", ":")))
+                    metrics.ACQUIRE_WAIT_SECONDS.observe_since(t0)
+                    if not reached:
+                        # Timed out: still stop, Baritone would otherwise mine indefinitely
+                        logger.warning("acquire timed out: %s x%s for %s", target_item, need, self.player_id)
+                        # Not done: !resume keeps it, and the inventory skip drops it if it filled up meanwhile
+                        finished = None
+                    stop = {
+                        "type": "action_request",
+                        "action_id": str(uuid.uuid4()),
+                        "mode": "chat_bridge",
+                        "op": "chat",
+                        "chat_text": "#stop",
+                    }
+                    await self._send(stop)
             # We do not wait synchronously for progress; the mod should reply
-            if spacing > 0:
-                await asyncio.sleep(spacing)
-            else:
-                await asyncio.sleep(0)  # yield control
+            await asyncio.sleep(0)  # yield control
+        if finished is not None:
+            self._step_done(finished)
+
+    def _step_done(self, index: int) -> None:
+        if self._on_step_done is not None:
+            try:
+                self._on_step_done(index)
+            except Exception:
+                logger.debug("step-done hook failed")
+
+    async def _send(self, msg: Dict[str, Any]) -> None:
+        if self.tracker is None:
+            await self._send_now(msg)
+        elif msg.get("mode") == "mod_native":
+            await self._send_pipelined(msg)
+        else:
+            await self._send_acked(msg)
+
+    async def _send_now(self, msg: Dict[str, Any]) -> None:
+        # Chat-bridge sends arriving early are dropped client-side, so every action waits for its token
+        await self.scheduler.acquire(self.player_id, str(msg.get("mode", "")))
+        metrics.DISPATCH_ACTIONS.inc(str(msg.get("mode", "")))
+        await self._write(msg)
+
+    async def _write(self, msg: Dict[str, Any]) -> None:
+        if self._send_fn is not None:
+            if await self._send_fn(msg) is False:
+                # Not queued (the session is closing on overflow): the action will never be acked
+                if self.tracker is not None and msg.get("action_id"):
+                    self.tracker.discard(str(msg["action_id"]))
+                raise StepFailed(msg, "dropped", "outbound queue overflow")
+        else:
+            await self.websocket.send(json.dumps(msg, separators=(",", ":")))
+
+    async def _notify(self, text: str) -> None:
+        try:
+            await self._write({
+                "type": "chat_send",
+                "request_id": str(uuid.uuid4()),
+                "player_uuid": self.player_id or "unknown",
+                "text": f"{self.settings.feedback_prefix}{text}",
+            })
+        except Exception:
+            logger.debug("failed to send plan failure notice")
+
+    def _ack_timeout(self) -> Optional[float]:
+        ms = int(self.settings.dispatch_ack_timeout_ms)
+        return ms / 1000.0 if ms > 0 else None
+
+    async def _send_acked(self, msg: Dict[str, Any]) -> None:
+        """Barrier: settle in-flight crafts, send, and wait for this action's ack (one resend if skipped)."""
+        assert self.tracker is not None
+        await self._settle(all_done=True)
+        aid = str(msg.get("action_id") or uuid.uuid4())
+        for attempt in range(2):
+            fut = self.tracker.expect(aid)
+            await self._send_now(msg)
+            t0 = metrics.now()
+            status, note = await self._await_verdict(aid, fut)
+            metrics.ACTION_ACK_SECONDS.observe_since(t0, str(msg.get("mode", "")))
+            if status == "ok":
+                return
+            if status == "skipped" and attempt == 0:
+                # The mod's chat limiter dropped it; the next scheduler token is a safe retry point
+                continue
+            raise StepFailed(msg, status, note)
+
+    async def _send_pipelined(self, msg: Dict[str, Any]) -> None:
+        """Send once the window has room and no in-flight action produces one of this action's inputs."""
+        assert self.tracker is not None
+        window = max(int(self.settings.dispatch_window), 1)
+        needs = self._inputs_of(msg)
+        while self._inflight and (
+            len(self._inflight) >= window
+            or any(str(m.get("recipe", "")) in needs for _, m, _ in self._inflight.values())
+        ):
+            await self._settle(all_done=False)
+        aid = str(msg.get("action_id") or uuid.uuid4())
+        fut = self.tracker.expect(aid)
+        await self._send_now(msg)
+        self._inflight[aid] = (fut, msg, metrics.now())
+
+    async def _settle(self, *, all_done: bool) -> None:
+        """Wait for one (or every) in-flight action's ack; the first non-ok verdict stops the plan."""
+        while self._inflight:
+            futs = {fut: aid for aid, (fut, _, _) in self._inflight.items()}
+            done, _ = await asyncio.wait(
+                futs, timeout=self._ack_timeout(), return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                _, msg, _ = next(iter(self._inflight.values()))
+                metrics.ACTION_RESULTS.inc("timeout")
+                raise StepFailed(msg, "timeout", "no progress_update")
+            for fut in done:
+                aid = futs[fut]
+                _, msg, t0 = self._inflight.pop(aid)
+                status, note = fut.result()
+                metrics.ACTION_ACK_SECONDS.observe_since(t0, "mod_native")
+                metrics.ACTION_RESULTS.inc(status)
+                if status == "skipped" and msg.get("op") == "smelt":
+                    # Not implemented client-side (ActionExecutor); same outcome as paced dispatch
+                    logger.info("smelt %s skipped by %s: %s", msg.get("recipe"), self.player_id, note)
+                    self._step_of.pop(aid, None)
+                    continue
+                if status != "ok":
+                    raise StepFailed(msg, status, note)
+                if aid in self._step_of:
+                    self._step_done(self._step_of.pop(aid))
+            if not all_done:
+                return
+
+    async def _await_verdict(self, aid: str, fut: asyncio.Future) -> Verdict:
+        assert self.tracker is not None
+        try:
+            status, note = await asyncio.wait_for(fut, self._ack_timeout())
+        except asyncio.TimeoutError:
+            self.tracker.discard(aid)
+            status, note = "timeout", "no progress_update"
+        metrics.ACTION_RESULTS.inc(status)
+        return status, note
+
+    def _inputs_of(self, msg: Dict[str, Any]) -> Set[str]:
+        graph = self.data.skill_graph
+        recipe = graph.recipe_for(str(msg.get("recipe", "")))
+        if recipe is None:
+            return set()
+        return {graph.names[i] for i, _ in recipe.consume}
 
     def _to_action_request(self, step: Dict[str, Any], action_id: str) -> Dict[str, Any]:
         op = step.get("op")
@@ -152,7 +363,7 @@ class Dispatcher:
                     **{k: v for k, v in step.items() if k not in {"op"}},
                 }
             # For mineable targets, only emit one mining command at a time.
-            # The planner may request multiple different acquires; spacing in run_linear reduces overlap.
+            # The planner may request multiple different acquires; each #mine is stopped before the next step.
             chat_text = self._acquire_to_chat(step)
             return {
                 "type": "action_request",
@@ -185,10 +396,7 @@ class Dispatcher:
         We therefore emit only the target and manage stopping via separate logic.
         """
         item: str = str(step.get("item", "")).lower()
-        try:
-            item_to_target = load_acquisition_map()
-        except Exception:
-            item_to_target = {}
+        item_to_target = self.data.acquisition_map
         if item in item_to_target:
             return f"#mine {item_to_target[item]}"
         if item.startswith("minecraft:"):
@@ -201,49 +409,136 @@ class Dispatcher:
             return f"#mine {x} {y} {z}"
         return "#stop"
 
-    async def _wait_until_inventory_has(self, item_id: str, count: int) -> bool:
-        """Poll latest telemetry inventory until count met (no timeout)."""
+    async def _wait_until_inventory_has(self, item_id: str, count: int, timeout_ms: Optional[int] = None) -> bool:
+        """Wait until telemetry inventory holds `count` of the item; woken by telemetry, not polled."""
         if not self.player_id or not self.state_service or count <= 0:
             await asyncio.sleep(0)
             return False
-        poll_ms = int(self.settings.acquire_poll_interval_ms)
-        while True:
+
+        state_service = self.state_service
+        player_id = self.player_id
+
+        def _has_enough(_entry: Dict[str, Any]) -> bool:
+            return state_service.get_inventory_counts(player_id).get(item_id, 0) >= count  # type: ignore[attr-defined]
+
+        if timeout_ms is None:
+            timeout_ms = int(self.settings.acquire_timeout_ms)
+        timeout = timeout_ms / 1000.0 if timeout_ms > 0 else None
+        return await self.state_service.wait_for(self.player_id, _has_enough, timeout)  # type: ignore[attr-defined]
+
+    async def _await_items(self, step: Dict[str, Any]) -> None:
+        item, count = str(step.get("item", "")), int(step.get("count", 0) or 0)
+        if not item or count <= 0 or not self.player_id or not self.state_service:
+            return
+        t0 = metrics.now()
+        # Bounded by default even when mining waits forever: helpers can fail or disconnect without delivering
+        reached = await self._wait_until_inventory_has(item, count, int(self.settings.await_items_timeout_ms))
+        metrics.ACQUIRE_WAIT_SECONDS.observe_since(t0)
+        if not reached:
+            raise StepFailed(step, "timeout", "deliveries incomplete")
+
+    async def _deliver(self, step: Dict[str, Any]) -> None:
+        """Walk to the receiving agent and drop the items next to it."""
+        target = str(step.get("to", ""))
+        items = {str(k): int(v) for k, v in dict(step.get("items") or {}).items() if int(v) > 0}
+        if not target or not items or not self.player_id or not self.state_service:
+            return
+        entry = self.state_service.get_player_state(target) or {}  # type: ignore[attr-defined]
+        tstate = entry.get("state", {}) if isinstance(entry, dict) else {}
+        username = tstate.get("username")
+        pos = tstate.get("pos")
+        if isinstance(username, str) and username:
+            # Follow rather than goto: the receiver may still be moving (mining its own share)
+            nav = f"#follow player {username}"
+        elif isinstance(pos, (list, tuple)) and len(pos) == 3:
+            nav = "#goto " + " ".join(str(int(round(float(v)))) for v in pos)
+        else:
+            raise StepFailed(step, "fail", f"receiver {target} position unknown")
+        await self._send({
+            "type": "action_request",
+            "action_id": str(uuid.uuid4()),
+            "mode": "chat_bridge",
+            "op": "chat",
+            "chat_text": nav,
+        })
+
+        state_service = self.state_service
+        arrived = await self._wait_near(
+            lambda: ((state_service.get_player_state(target) or {}).get("state") or {}).get("pos"),  # type: ignore[attr-defined]
+            DELIVER_RADIUS,
+        )
+        if nav.startswith("#follow"):
+            await self._send({
+                "type": "action_request",
+                "action_id": str(uuid.uuid4()),
+                "mode": "chat_bridge",
+                "op": "chat",
+                "chat_text": "#stop",
+            })
+        if not arrived:
+            raise StepFailed(step, "timeout", f"did not reach receiver {target}")
+        for item, count in items.items():
+            await self._send({
+                "type": "action_request",
+                "action_id": str(uuid.uuid4()),
+                "mode": "mod_native",
+                "op": "drop",
+                "item": item,
+                "count": count,
+            })
+
+    async def _wait_near(self, there: Callable[[], Any], radius: float) -> bool:
+        """Wait (bounded by `acquire_timeout_ms`) until telemetry puts this agent within `radius` of `there()`."""
+
+        def _near(entry: Dict[str, Any]) -> bool:
+            here = (entry.get("state") or {}).get("pos")
             try:
-                player_state = self.state_service.get_player_state(self.player_id)  # type: ignore[attr-defined]
-                if player_state and isinstance(player_state.get("state", {}).get("inventory"), list):
-                    total = 0
-                    for slot in player_state["state"]["inventory"]:
-                        if str(slot.get("id")) == item_id:
-                            total += int(slot.get("count", 0))
-                    if total >= count:
-                        return True
+                return sum((float(a) - float(b)) ** 2 for a, b in zip(here, there())) <= radius ** 2
             except Exception:
-                pass
-            await asyncio.sleep(poll_ms / 1000.0)
+                return False
+
+        timeout_ms = int(self.settings.acquire_timeout_ms)
+        return await self.state_service.wait_for(self.player_id, _near, timeout_ms / 1000.0 if timeout_ms > 0 else None)  # type: ignore[attr-defined]
+
+    async def _walk_to_site(self, step: Dict[str, Any]) -> None:
+        """Walk to the acquire step's remembered resource site (backend/route.py) before mining."""
+        site = step.get("site")
+        if not self.player_id or not self.state_service or not isinstance(site, list) or len(site) != 3:
+            return
+        here = ((self.state_service.get_player_state(self.player_id) or {}).get("state") or {}).get("pos")  # type: ignore[attr-defined]
+        try:
+            if sum((float(a) - float(b)) ** 2 for a, b in zip(here, site)) <= SITE_RADIUS ** 2:
+                return
+        except Exception:
+            pass
+        await self._send({
+            "type": "action_request",
+            "action_id": str(uuid.uuid4()),
+            "mode": "chat_bridge",
+            "op": "chat",
+            "chat_text": "#goto " + " ".join(str(int(v)) for v in site),
+        })
+        if not await self._wait_near(lambda: site, SITE_RADIUS):
+            # Mine from wherever we got to; the site is only a hint
+            logger.info("did not reach site %s for %s; mining from here", site, step.get("item"))
+        # Clear the goto goal so #mine is the only active Baritone process
+        await self._send({
+            "type": "action_request",
+            "action_id": str(uuid.uuid4()),
+            "mode": "chat_bridge",
+            "op": "chat",
+            "chat_text": "#stop",
+        })
 
     def _should_skip_step_due_to_inventory(self, step: Dict[str, Any]) -> bool:
         if not self.player_id or not self.state_service:
             return False
         try:
-            player_state = self.state_service.get_player_state(self.player_id)  # type: ignore[attr-defined]
+            counts = self.state_service.get_inventory_counts(self.player_id)  # type: ignore[attr-defined]
         except Exception:
             return False
-        if not player_state:
-            return False
-        state = player_state.get("state", {})
-        inv = state.get("inventory", [])
-        if not isinstance(inv, list):
+        if not counts:
             return False
-        # Build counts by id
-        counts: Dict[str, int] = {}
-        for slot in inv:
-            try:
-                iid = str(slot.get("id"))
-                c = int(slot.get("count", 0))
-                if iid:
-                    counts[iid] = counts.get(iid, 0) + c
-            except Exception:
-                continue
         op = step.get("op")
         need = int(step.get("count", 1))
         if op == "acquire":
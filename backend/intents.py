@@ -9,7 +9,8 @@ Supported patterns:
 - !say <text|!command|#cmd|.cmd>
 - !saymulti <name1,name2,...> <text|!command|#cmd|.cmd>
 - !sayall <text|!command|#cmd|.cmd>
-- !get <item words> <count>
+- !get <item words> <count> [@all|@name1,name2,...]
+- !find <item words>
 
 """
 
@@ -17,6 +18,18 @@ import re
 from typing import Dict, Optional
 
 
+def _normalize_item(words: str) -> str:
+    item_words = words.strip().lower().replace(" ", "_")
+    # Normalization: resolve aliases from data file first, else assume minecraft: namespace
+    try:
+        from .data_files import game_data  # lazy import
+        aliases = game_data().aliases
+    except Exception:
+        aliases = {}
+    base = aliases.get(item_words, item_words)
+    return base if ":" in base else f"minecraft:{base}"
+
+
 def parse_command_text(text: str) -> Optional[Dict[str, object]]:
     text = text.strip()
     if not text.startswith("!"):
@@ -31,6 +44,9 @@ def parse_command_text(text: str) -> Optional[Dict[str, object]]:
     if text == "!stop":
         return {"type": "stop"}
 
+    if text == "!resume":
+        return {"type": "resume"}
+
     # !say <payload>
     if text == "!say" or text.startswith("!say "):
         if text == "!say":
@@ -38,22 +54,26 @@ def parse_command_text(text: str) -> Optional[Dict[str, object]]:
         payload = text[len("!say ") :].strip()
         return {"type": "say", "text": payload}
 
-    m = re.match(r"^!get\s+(.+)\s+(\d+)$", text)
+    m = re.match(r"^!get\s+(.+)\s+(\d+)(?:\s+@([^\s]+))?$", text)
     if m:
-        item_words = m.group(1).strip().lower().replace(" ", "_")
         count = int(m.group(2))
-        # Normalization: resolve aliases from data file first, else assume minecraft: namespace
-        try:
-            from .data_files import load_aliases  # lazy import
-            aliases = load_aliases()
-        except Exception:
-            aliases = {}
-        base = aliases.get(item_words, item_words)
-        item_id = base if ":" in base else f"minecraft:{base}"
-        return {"type": "craft_item", "item": item_id, "count": count}
+        intent: Dict[str, object] = {"type": "craft_item", "item": _normalize_item(m.group(1)), "count": count}
+        # Optional agent group: the issuer crafts, the group gathers materials
+        if m.group(3):
+            group = [t.strip() for t in m.group(3).split(",") if t.strip()]
+            if group:
+                intent["agents"] = ["all"] if "all" in group else group
+        return intent
     if text == "!get" or text.startswith("!get "):
         return {"type": "usage", "cmd": "get"}
 
+    # !find <item words>
+    m_find = re.match(r"^!find\s+(.+)$", text)
+    if m_find:
+        return {"type": "find", "item": _normalize_item(m_find.group(1))}
+    if text == "!find":
+        return {"type": "usage", "cmd": "find"}
+
     # !saymulti name1,name2 <message|#cmd|.cmd|!command>
     m2 = re.match(r"^!saymulti\s+([^\s]+)\s+(.+)$", text)
     if m2:
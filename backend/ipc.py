@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+"""Local IPC between the shard coordinator and its worker processes.
+
+Purpose: Give workers a cheap request/notify channel to the process that owns
+shared state (telemetry persistence, storage catalog, plan journal) and lets
+messages cross shards.
+
+How: One loopback TCP stream per worker. Each frame is a 4-byte big-endian
+length followed by compact JSON. A frame with an `id` is a call and gets exactly
+one reply frame with the same `id`, carrying `r` (result) or `e` (error text).
+A frame without an `id` is a notification and gets no reply. Frames are handled
+in arrival order, so a notification sent before a call is applied before the
+call is answered.
+
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import struct
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+logger = logging.getLogger("automc.ipc")
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class IpcError(Exception):
+    pass
+
+
+class Peer:
+    """One end of an IPC stream; `handler(peer, method, params)` serves the other end's frames."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        handler: Callable[["Peer", str, Dict[str, Any]], Awaitable[Any]],
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._handler = handler
+        self._ids = itertools.count(1)
+        self._calls: Dict[int, asyncio.Future] = {}
+        self.closed = False
+
+    def _write(self, frame: Dict[str, Any]) -> None:
+        if self.closed:
+            raise IpcError("ipc peer closed")
+        body = json.dumps(frame, separators=(",", ":")).encode("utf-8")
+        self._writer.write(_HEADER.pack(len(body)) + body)
+
+    def notify(self, method: str, **params: Any) -> None:
+        """Fire-and-forget; silently dropped once the peer is gone."""
+        try:
+            self._write({"m": method, "p": params})
+        except IpcError:
+            logger.debug("ipc notify %s dropped: peer closed", method)
+
+    async def call(self, method: str, **params: Any) -> Any:
+        call_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[call_id] = fut
+        try:
+            self._write({"id": call_id, "m": method, "p": params})
+            await self._writer.drain()
+            return await fut
+        finally:
+            self._calls.pop(call_id, None)
+
+    async def serve(self) -> None:
+        """Read frames until the stream ends; pending calls then fail with IpcError."""
+        try:
+            while True:
+                header = await self._reader.readexactly(_HEADER.size)
+                (size,) = _HEADER.unpack(header)
+                if size > MAX_FRAME:
+                    raise IpcError(f"ipc frame too large: {size}")
+                frame = json.loads(await self._reader.readexactly(size))
+                await self._on_frame(frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.closed = True
+            for fut in self._calls.values():
+                if not fut.done():
+                    fut.set_exception(IpcError("ipc peer closed"))
+            self._calls.clear()
+
+    async def _on_frame(self, frame: Dict[str, Any]) -> None:
+        call_id: Optional[int] = frame.get("id")
+        method = frame.get("m")
+        if method is None:
+            # Reply to one of our calls
+            fut = self._calls.get(call_id) if call_id is not None else None
+            if fut is not None and not fut.done():
+                if "e" in frame:
+                    fut.set_exception(IpcError(str(frame["e"])))
+                else:
+                    fut.set_result(frame.get("r"))
+            return
+        try:
+            result = await self._handler(self, str(method), frame.get("p") or {})
+        except Exception as exc:
+            if call_id is None:
+                logger.warning("ipc notification %s failed: %s", method, exc)
+                return
+            self._reply({"id": call_id, "e": f"{type(exc).__name__}: {exc}"})
+            return
+        if call_id is not None:
+            self._reply({"id": call_id, "r": result})
+
+    def _reply(self, frame: Dict[str, Any]) -> None:
+        try:
+            self._write(frame)
+        except IpcError:
+            pass
+
+    async def close(self) -> None:
+        self.closed = True
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+"""In-process metrics with an optional Prometheus text endpoint.
+
+Purpose: Message rates per type, handler latency, plan sizes, dispatcher queue
+depth and persistence latency, readable by any Prometheus-compatible scraper.
+
+How: Counters, gauges and fixed-bucket histograms keyed by label tuples, all
+declared below so the exposition is a fixed catalogue. Nothing is recorded
+until `enable()` is called (the server does so when `metrics_port` > 0); while
+disabled every record call returns after one attribute check and `now()`
+returns 0.0 without reading the clock. `serve()` exposes `GET /metrics` on a
+local port using a bare asyncio server (no extra dependencies).
+
+"""
+
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger("automc.metrics")
+
+
+class _Registry:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.metrics: List["_Metric"] = []
+
+
+REGISTRY = _Registry()
+
+
+def enable() -> None:
+    REGISTRY.enabled = True
+
+
+def now() -> float:
+    """Start timestamp for `Histogram.observe_since`; 0.0 (no clock read) while disabled."""
+    return time.perf_counter() if REGISTRY.enabled else 0.0
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        REGISTRY.metrics.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not REGISTRY.enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        if not REGISTRY.enabled:
+            return
+        self._values[labels] = float(value)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not REGISTRY.enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def remove(self, *labels: str) -> None:
+        self._values.pop(labels, None)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}")
+        return lines
+
+
+# Seconds; covers sub-millisecond handlers up to multi-second saves
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label tuple -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not REGISTRY.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[labels] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def observe_since(self, start: float, *labels: str) -> None:
+        if not REGISTRY.enabled or not start:
+            return
+        self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    out: List[str] = []
+    for metric in REGISTRY.metrics:
+        out.extend(metric.render())
+    return "\n".join(out) + "\n"
+
+
+# Known message types; anything else is counted as "other" to keep label cardinality bounded
+_MESSAGE_TYPES = frozenset({
+    "handshake", "command", "plan", "action_request", "progress_update", "telemetry_update",
+    "telemetry_delta", "telemetry_resync", "state_request", "state_response", "inventory_snapshot",
+    "inventory_diff", "chat_send", "chat_event", "cancel", "batch", "settings_update",
+    "settings_broadcast", "ping", "pong",
+})
+
+
+def message_type(mtype: object) -> str:
+    return mtype if isinstance(mtype, str) and mtype in _MESSAGE_TYPES else "other"
+
+
+# --- catalogue -------------------------------------------------------------
+
+SESSIONS = Gauge("automc_sessions", "Connected client sessions")
+MESSAGES_RECEIVED = Counter("automc_messages_received_total", "Inbound messages by type (batch contents counted individually)", ("type",))
+HANDLER_SECONDS = Histogram("automc_message_handler_seconds", "Time spent handling one inbound message", ("type",))
+MESSAGES_SENT = Counter("automc_messages_sent_total", "Outbound messages by type", ("type",))
+FRAMES_SENT = Counter("automc_frames_sent_total", "Outbound WebSocket frames by codec", ("codec",))
+BATCH_SIZE = Histogram("automc_batch_messages", "Messages per outbound batch frame", buckets=SIZE_BUCKETS)
+OUTBOUND_QUEUE_DEPTH = Gauge("automc_outbound_queue_depth", "Messages waiting in a session's outbound queue", ("player",))
+OUTBOUND_DROPPED = Counter("automc_outbound_dropped_total", "Outbound messages dropped before sending", ("reason",))
+OUTBOUND_CLOSED = Counter("automc_outbound_closed_total", "Sessions closed for overflowing their outbound queue")
+
+PLAN_SECONDS = Histogram("automc_plan_seconds", "plan_craft latency")
+PLAN_STEPS = Histogram("automc_plan_steps", "Steps per plan", buckets=SIZE_BUCKETS)
+ROUTE_SECONDS = Histogram("automc_route_seconds", "Travel-aware ordering of a plan's world acquisitions")
+
+DISPATCH_ACTIVE = Gauge("automc_dispatch_active", "Running dispatcher tasks")
+DISPATCH_QUEUE_DEPTH = Gauge("automc_dispatch_queue_depth", "Plan steps not yet dispatched", ("player",))
+DISPATCH_ACTIONS = Counter("automc_dispatch_actions_total", "Actions sent by dispatchers", ("mode",))
+ACTION_ACK_SECONDS = Histogram("automc_action_ack_seconds", "Time from sending an action to its progress_update (ack mode)", ("mode",))
+ACTION_RESULTS = Counter("automc_action_results_total", "Action verdicts seen by ack-mode dispatchers", ("status",))
+SCHEDULER_WAIT_SECONDS = Histogram("automc_scheduler_wait_seconds", "Time an action waited for rate-limit tokens", ("channel",))
+ACQUIRE_WAIT_SECONDS = Histogram(
+    "automc_acquire_wait_seconds",
+    "Time from #mine to the inventory target (or timeout)",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+STATE_FLUSH_SECONDS = Histogram("automc_state_flush_seconds", "State journal append latency")
+STATE_SAVE_SECONDS = Histogram("automc_state_save_seconds", "State snapshot (compaction) save latency")
+STORAGE_UPDATES = Counter("automc_storage_updates_total", "Container updates applied", ("kind",))
+STORAGE_CONTAINERS = Gauge("automc_storage_containers", "Containers known to the storage catalog")
+STORAGE_FLUSH_SECONDS = Histogram("automc_storage_flush_seconds", "Storage catalog SQLite flush latency")
+STORAGE_FLUSH_ROWS = Counter("automc_storage_flush_rows_total", "Container rows written to SQLite")
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5.0)
+        # Drain headers; the request body (if any) is ignored
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 5.0)
+            if not line or line in (b"\r\n", b"\n"):
+                break
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", render().encode("utf-8")
+        else:
+            status, ctype, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    except Exception as exc:
+        logger.debug("metrics request failed: %s", exc)
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int) -> Optional[asyncio.AbstractServer]:
+    """Enable recording and start the `/metrics` endpoint; None if the port can't be bound."""
+    enable()
+    try:
+        server = await asyncio.start_server(_handle_http, host, port)
+    except OSError as exc:
+        logger.warning("metrics endpoint unavailable on %s:%s: %s", host, port, exc)
+        return None
+    logger.info("metrics on http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+"""Split one `!get` plan across several agents.
+
+Purpose: Let idle agents gather a plan's raw materials in parallel and hand
+them to a single crafter, so wall-clock time shrinks with the number of agents.
+
+How: The crafter's plan is computed as usual. Its world acquisitions (leaf
+`acquire` steps; context placeholders such as `crafting_table_nearby` stay with
+the crafter) are merged per item and shared out in chunks. Each chunk goes to
+the agent whose finish time grows least. An agent's cost for an item is what it
+still has to mine beyond what it already holds, divided by a load weight
+(`1 / (1 + running dispatchers)`).
+
+- Helpers get `acquire(item, share)`, which mines until they hold `share`, then
+  one `deliver` step listing all their items. The dispatcher turns `deliver`
+  into walking to the crafter and dropping the items.
+- The crafter mines its own share first. It then runs `await_items` steps until
+  its inventory holds the full amount, and finally runs the original non-acquire
+  steps in order.
+
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence
+
+
+CONTEXT_PLACEHOLDERS = frozenset({"crafting_table_nearby", "furnace_nearby"})
+
+
+@dataclass(frozen=True)
+class Agent:
+    player_id: str
+    inventory: Mapping[str, int]
+    load: int = 0  # dispatchers already running for this agent
+
+
+@dataclass
+class Partition:
+    steps: Dict[str, List[Dict[str, object]]]  # player_id -> steps, crafter included
+    shares: Dict[str, Dict[str, int]] = field(default_factory=dict)  # item -> {player_id: units}
+
+
+def _world_acquires(steps: Sequence[Dict[str, object]]) -> Dict[str, int]:
+    needs: Dict[str, int] = {}
+    for step in steps:
+        item = str(step.get("item", ""))
+        if step.get("op") == "acquire" and item and item not in CONTEXT_PLACEHOLDERS:
+            needs[item] = needs.get(item, 0) + int(step.get("count", 0) or 0)
+    return needs
+
+
+def _split(total: int, item: str, agents: Sequence[Agent], crafter: str, work: Dict[str, float]) -> Dict[str, int]:
+    """Share `total` units of `item` out in chunks, each to the agent whose finish time grows least."""
+    share = {a.player_id: 0 for a in agents}
+    chunk = max(1, total // (4 * len(agents)))
+    remaining = total
+    while remaining > 0:
+        n = min(chunk, remaining)
+        best, best_cost, best_delta = agents[0].player_id, float("inf"), 0.0
+        for a in agents:
+            # The crafter's stock is already counted by the planner; helpers' stock is free to hand over
+            held = 0 if a.player_id == crafter else int(a.inventory.get(item, 0))
+            mined = max(share[a.player_id] + n - held, 0) - max(share[a.player_id] - held, 0)
+            delta = mined * (1 + a.load)
+            cost = work[a.player_id] + delta
+            # Strict: ties go to the earlier agent, and the crafter (no delivery trip) is first
+            if cost < best_cost:
+                best, best_cost, best_delta = a.player_id, cost, delta
+        share[best] += n
+        work[best] += best_delta
+        remaining -= n
+    return {pid: n for pid, n in share.items() if n > 0}
+
+
+def partition_plan(steps: Sequence[Dict[str, object]], crafter: Agent, helpers: Sequence[Agent]) -> Partition:
+    agents = [crafter] + [h for h in helpers if h.player_id != crafter.player_id]
+    needs = _world_acquires(steps)
+    if len(agents) < 2 or not needs:
+        return Partition(steps={crafter.player_id: list(steps)})
+
+    work = {a.player_id: 0.0 for a in agents}
+    shares: Dict[str, Dict[str, int]] = {}
+    # Largest needs first so smaller ones fill the gaps
+    for item, total in sorted(needs.items(), key=lambda kv: (-kv[1], kv[0])):
+        shares[item] = _split(total, item, agents, crafter.player_id, work)
+
+    out: Dict[str, List[Dict[str, object]]] = {a.player_id: [] for a in agents}
+    for item, by_agent in shares.items():
+        for pid, units in by_agent.items():
+            if pid == crafter.player_id:
+                continue
+            if int(next(a for a in agents if a.player_id == pid).inventory.get(item, 0)) < units:
+                out[pid].append({"op": "acquire", "item": item, "count": units})
+    # One trip per helper: walk to the crafter once and drop everything
+    for a in agents[1:]:
+        items = {item: by_agent[a.player_id] for item, by_agent in shares.items() if a.player_id in by_agent}
+        if items:
+            out[a.player_id].append({"op": "deliver", "to": crafter.player_id, "items": items})
+
+    own = out[crafter.player_id]
+    for item, by_agent in shares.items():
+        have = int(crafter.inventory.get(item, 0))
+        mine = by_agent.get(crafter.player_id, 0)
+        if mine:
+            own.append({"op": "acquire", "item": item, "count": have + mine})
+    for item, by_agent in shares.items():
+        if any(pid != crafter.player_id for pid in by_agent):
+            own.append({"op": "await_items", "item": item, "count": int(crafter.inventory.get(item, 0)) + needs[item]})
+    own.extend(
+        s for s in steps
+        if not (s.get("op") == "acquire" and str(s.get("item", "")) not in CONTEXT_PLACEHOLDERS)
+    )
+    return Partition(steps={pid: s for pid, s in out.items() if s}, shares=shares)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+"""Persistent journal of plan execution, for `!resume`.
+
+Purpose: Keep each agent's unfinished plan (steps plus which of them completed)
+across disconnects and backend restarts. `!resume` can then continue where the
+agent stopped instead of re-planning and re-mining from scratch.
+
+How: Records live in memory. Every change appends one event to a pending list,
+and a background flusher writes the pending events to `data/plans.jsonl` on a
+fixed cadence, off the event loop. The events are:
+
+- `begin`: plan id, player, request id, goal and steps.
+- `step`: the index of a step the dispatcher finished.
+- `status`: the plan stopped (`failed` or `interrupted`).
+- `end`: the plan completed or was replaced.
+
+Startup replays the file. Plans still `running` at that point were cut off by
+the restart and count as `interrupted`. Compaction (startup, on a cadence and at
+shutdown) rewrites the file with unfinished plans only. A player keeps at most
+one stopped plan: starting a new one replaces it.
+
+`remaining_steps` rebuilds the work left: steps not yet done, in order. A done
+context step (`crafting_table_nearby`, `furnace_nearby`) is kept again ahead of
+the first remaining craft that needs it, because the agent may have moved since.
+Acquire steps the fresh inventory already satisfies are skipped by the
+dispatcher as usual.
+
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .partition import CONTEXT_PLACEHOLDERS
+
+
+logger = logging.getLogger("automc.plans")
+
+
+@dataclass
+class PlanRecord:
+    plan_id: str
+    player_id: str
+    request_id: str
+    goal: str
+    steps: List[Dict[str, Any]]
+    done: Set[int] = field(default_factory=set)
+    status: str = "running"  # running | failed | interrupted
+
+
+def remaining_steps(record: PlanRecord) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    contexts: Dict[str, Dict[str, Any]] = {}  # "crafting_table" -> its placeholder step
+    present: Set[str] = set()
+    for i, step in enumerate(record.steps):
+        item = str(step.get("item", ""))
+        if step.get("op") == "acquire" and item in CONTEXT_PLACEHOLDERS:
+            ctx = item[: -len("_nearby")]
+            contexts[ctx] = step
+            if i not in record.done:
+                out.append(step)
+                present.add(ctx)
+            continue
+        if i in record.done:
+            continue
+        ctx = str(step.get("context") or "")
+        if ctx and ctx in contexts and ctx not in present:
+            out.append(contexts[ctx])
+            present.add(ctx)
+        out.append(step)
+    return out
+
+
+class PlanJournal:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_interval_ms: int = 1000,
+        compact_interval_ms: int = 60000,
+    ) -> None:
+        self._path = path
+        self._flush_interval_s = max(int(flush_interval_ms), 1) / 1000.0
+        self._compact_interval_s = max(int(compact_interval_ms), 0) / 1000.0
+        self._plans: Dict[str, PlanRecord] = {}  # insertion order = start order
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_compact = time.monotonic()
+
+    def load(self) -> None:
+        """Replay the journal; plans the previous run left running become interrupted."""
+        try:
+            if not self._path.exists():
+                return
+            with self._path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        self._apply(json.loads(line))
+                    except Exception:
+                        # A torn last line after a crash is expected; skip it
+                        continue
+        except Exception as exc:
+            logger.warning("failed to load plan journal: %s", exc)
+        for rec in self._plans.values():
+            if rec.status == "running":
+                rec.status = "interrupted"
+        try:
+            self._rewrite(self._snapshot_events())
+        except Exception as exc:
+            logger.warning("failed to compact plan journal: %s", exc)
+
+    def _apply(self, ev: Dict[str, Any]) -> None:
+        kind, plan_id = ev.get("ev"), str(ev.get("plan_id", ""))
+        if kind == "begin":
+            self._plans[plan_id] = PlanRecord(
+                plan_id=plan_id,
+                player_id=str(ev.get("player", "")),
+                request_id=str(ev.get("request_id", "")),
+                goal=str(ev.get("goal", "")),
+                steps=list(ev.get("steps") or []),
+                done=set(int(i) for i in ev.get("done") or []),
+                status=str(ev.get("status", "running")),
+            )
+            return
+        rec = self._plans.get(plan_id)
+        if rec is None:
+            return
+        if kind == "step":
+            rec.done.add(int(ev.get("i", -1)))
+        elif kind == "status":
+            rec.status = str(ev.get("status", rec.status))
+        elif kind == "end":
+            self._plans.pop(plan_id, None)
+
+    def _record(self, ev: Dict[str, Any]) -> None:
+        self._apply(ev)
+        self._pending.append(ev)
+
+    # --- plan lifecycle ----------------------------------------------------
+
+    def begin(self, plan_id: str, player_id: str, request_id: str, steps: List[Dict[str, Any]], goal: str = "") -> None:
+        # A new plan replaces the player's stopped one; plans still running are left alone
+        for rec in list(self._plans.values()):
+            if rec.player_id == player_id and rec.status != "running":
+                self.end(rec.plan_id)
+        self._record({"ev": "begin", "plan_id": plan_id, "player": player_id, "request_id": request_id, "goal": goal, "steps": steps})
+
+    def step_done(self, plan_id: str, index: int) -> None:
+        if plan_id in self._plans:
+            self._record({"ev": "step", "plan_id": plan_id, "i": int(index)})
+
+    def stopped(self, plan_id: str, status: str) -> None:
+        if plan_id in self._plans:
+            self._record({"ev": "status", "plan_id": plan_id, "status": status})
+
+    def end(self, plan_id: str) -> None:
+        if plan_id in self._plans:
+            self._record({"ev": "end", "plan_id": plan_id})
+
+    def resumable(self, player_id: str) -> Optional[PlanRecord]:
+        """The player's most recent stopped plan, if any."""
+        for rec in reversed(list(self._plans.values())):
+            if rec.player_id == player_id and rec.status != "running":
+                return rec
+        return None
+
+    # --- persistence -------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher, write pending events and compact."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self._compact()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            await self.flush()
+            if self._compact_interval_s > 0 and (time.monotonic() - self._last_compact) >= self._compact_interval_s:
+                await self._compact()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._append, batch)
+            except Exception as exc:
+                # keep them pending so the next flush retries
+                self._pending[:0] = batch
+                logger.warning("failed to flush plan journal: %s", exc)
+
+    async def _compact(self) -> None:
+        # Pending events are folded into the snapshot, so they must not be appended afterwards
+        events, self._pending = self._snapshot_events(), []
+        async with self._lock:
+            self._last_compact = time.monotonic()
+            try:
+                await asyncio.to_thread(self._rewrite, events)
+            except Exception as exc:
+                logger.warning("failed to compact plan journal: %s", exc)
+
+    def _snapshot_events(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "ev": "begin", "plan_id": rec.plan_id, "player": rec.player_id, "request_id": rec.request_id,
+                "goal": rec.goal, "steps": rec.steps, "done": sorted(rec.done), "status": rec.status,
+            }
+            for rec in self._plans.values()
+        ]
+
+    def _append(self, events: List[Dict[str, Any]]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._path.open("a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(ev, separators=(",", ":")) + "\n" for ev in events))
+
+    def _rewrite(self, events: List[Dict[str, Any]]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        # write-then-rename so a crash never leaves a torn journal
+        tmp.write_text("".join(json.dumps(ev, separators=(",", ":")) + "\n" for ev in events), encoding="utf-8")
+        tmp.replace(self._path)
@@ -4,76 +4,113 @@ from __future__ import annotations
 
 Purpose: Given an item id and count, expand via a tiny skill graph into a list
 of steps the mod understands (acquire/craft/smelt), including minimal tool
-gating for mining.
+gating for mining. Also answers bill-of-materials queries (raw needs, max
+craftable now) from precomputed closures.
 
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
-from .data_files import load_tool_tiers, load_skill_graph, load_mineable_items
+from . import metrics
+from .data_files import GameData, game_data
+from .skill_graph import SkillGraph, max_craftable as _max_craftable, raw_requirements as _raw_requirements
 from .state_service import StateService  # type: ignore
 
 
-def _expand_with_inventory(target: str, required: int, inv_counts: Dict[str, int], steps: List[Dict[str, object]]) -> None:
+class _Pool:
+    """Working inventory: a dense list for graph items plus a dict for anything else."""
+
+    __slots__ = ("known", "other")
+
+    def __init__(self, graph: SkillGraph, counts: Mapping[str, int]) -> None:
+        self.known: List[int] = [0] * len(graph.names)
+        self.other: Dict[str, int] = {}
+        ids = graph.ids
+        for k, v in counts.items():
+            i = ids.get(k)
+            if i is None:
+                self.other[k] = int(v)
+            else:
+                self.known[i] = int(v)
+
+
+def _expand_id(graph: SkillGraph, tid: int, required: int, known: List[int], steps: List[Dict[str, object]]) -> None:
     """Inventory-aware expansion: prune leaves/outputs using current inventory, emit only missing deltas."""
     if required <= 0:
         return
-    skills = load_skill_graph()
-    skill = skills.get(target)
-    if skill is None:
-        have = int(inv_counts.get(target, 0))
-        if have >= required:
-            inv_counts[target] = have - required
-            return
-        if have > 0:
-            inv_counts[target] = 0
-            required -= have
-        steps.append({"op": "acquire", "item": target, "count": required})
+    # Satisfy from existing inventory/outputs first
+    have = known[tid]
+    if have >= required:
+        known[tid] = have - required
         return
-
-    # Satisfy from existing outputs first
-    have_out = int(inv_counts.get(target, 0))
-    if have_out >= required:
-        inv_counts[target] = have_out - required
+    if have > 0:
+        known[tid] = 0
+        required -= have
+    recipe = graph.recipes[tid]
+    if recipe is None:
+        steps.append({"op": "acquire", "item": graph.names[tid], "count": required})
         return
-    if have_out > 0:
-        inv_counts[target] = 0
-        required -= have_out
 
-    obtain_per_craft = int((skill.get("obtain") or {}).get(target, 1))
+    obtain_per_craft = recipe.obtain
     crafts_needed = max(1, (required + obtain_per_craft - 1) // obtain_per_craft)
 
     # Expand inputs for total crafts
-    for dep, qty in (skill.get("consume") or {}).items():
-        _expand_with_inventory(dep, int(qty) * crafts_needed, inv_counts, steps)
+    for dep, qty in recipe.consume:
+        _expand_id(graph, dep, qty * crafts_needed, known, steps)
 
     # Ensure context
-    for req, qty in (skill.get("require") or {}).items():
-        steps.append({"op": "acquire", "item": req, "count": int(qty)})
-    # Account for outputs produced by this craft/smelt so downstream expansions can reuse them
-    produced_total = crafts_needed * obtain_per_craft
-    inv_counts[target] = int(inv_counts.get(target, 0)) + produced_total
-    # Consume the required amount from the produced/available pool, leaving any extra available
-    have_after = int(inv_counts.get(target, 0))
-    if have_after >= required:
-        inv_counts[target] = have_after - required
-    else:
-        inv_counts[target] = 0
-
-    steps.append({"op": "craft" if skill.get("op") == "craft" else "smelt", "recipe": target, "count": crafts_needed})
-
-
-def plan_craft(item_id: str, count: int, inventory_counts: Optional[Dict[str, int]] = None) -> List[Dict[str, object]]:
+    for req, qty in recipe.require:
+        steps.append({"op": "acquire", "item": req, "count": qty})
+    # Keep any surplus from this craft/smelt available to downstream expansions
+    known[tid] = max(known[tid] + crafts_needed * obtain_per_craft - required, 0)
+
+    steps.append({"op": recipe.op, "recipe": graph.names[tid], "count": crafts_needed})
+
+
+def _expand_with_inventory(graph: SkillGraph, target: str, required: int, pool: _Pool, steps: List[Dict[str, object]]) -> None:
+    tid = graph.ids.get(target)
+    if tid is not None:
+        _expand_id(graph, tid, required, pool.known, steps)
+        return
+    # Item unknown to the graph: a plain world acquisition
+    if required <= 0:
+        return
+    have = pool.other.get(target, 0)
+    if have >= required:
+        pool.other[target] = have - required
+        return
+    if have > 0:
+        pool.other[target] = 0
+        required -= have
+    steps.append({"op": "acquire", "item": target, "count": required})
+
+
+def plan_craft(
+    item_id: str,
+    count: int,
+    inventory_counts: Optional[Mapping[str, int]] = None,
+    data: Optional[GameData] = None,
+) -> List[Dict[str, object]]:
     """Produce a linear step list based on a small skill graph.
 
     - Expands consume prerequisites recursively
     - Adds simple context requirements as acquire placeholders (e.g., furnace_nearby)
     - Leaves world acquisitions to dispatcher/chat-bridge (e.g., logs, ores)
     - Prunes leaves/outputs using provided inventory snapshot (if any)
+    - Reads one game data snapshot throughout (`data`, else the current one)
     """
+    t0 = metrics.now()
+    steps = _plan_craft(item_id, count, inventory_counts, data if data is not None else game_data())
+    metrics.PLAN_SECONDS.observe_since(t0)
+    metrics.PLAN_STEPS.observe(len(steps))
+    return steps
+
+
+def _plan_craft(item_id: str, count: int, inventory_counts: Optional[Mapping[str, int]], data: GameData) -> List[Dict[str, object]]:
+    graph = data.skill_graph
     steps: List[Dict[str, object]] = []
-    inv_copy: Dict[str, int] = {k: int(v) for k, v in (inventory_counts or {}).items()}
-    _expand_with_inventory(item_id, int(count), inv_copy, steps)
+    pool = _Pool(graph, inventory_counts or {})
+    _expand_with_inventory(graph, item_id, int(count), pool, steps)
 
     # Coalesce adjacent identical acquires (keep order stable)
     coalesced: List[Dict[str, object]] = []
@@ -87,10 +124,7 @@ def plan_craft(item_id: str, count: int, inventory_counts: Optional[Dict[str, in
     # Insert minimal tool gating for mineables: ensure a capable pickaxe appears before mining iron ore/cobblestone
     gated: List[Dict[str, object]] = []
     have_tools: Dict[str, int] = {}
-    try:
-        tool_tiers = load_tool_tiers()
-    except Exception:
-        tool_tiers = {}
+    tool_tiers = data.tool_tiers
     for s in steps:
         if s.get("op") == "craft" and isinstance(s.get("recipe"), str):
             tool = str(s["recipe"])  # type: ignore[index]
@@ -101,22 +135,20 @@ def plan_craft(item_id: str, count: int, inventory_counts: Optional[Dict[str, in
                 # Craft the first acceptable tool we don't yet have (wooden -> stone -> iron)
                 for candidate in required_any:
                     if have_tools.get(candidate, 0) == 0:
-                        _expand_with_inventory(candidate, 1, inv_copy, gated)
+                        _expand_with_inventory(graph, candidate, 1, pool, gated)
                         have_tools[candidate] = 1
                         break
         gated.append(s)
 
     # Reorder for context: if the root craft requires a context (e.g., crafting_table_nearby),
     # aggregate world acquisitions (logs/ores) up-front, then ensure context, then do conversions/crafts.
-    skills = load_skill_graph()
-    root_skill = skills.get(item_id)
-    requires_ctx = set((root_skill.get("require") or {}).keys()) if root_skill else set()
+    root_recipe = graph.recipe_for(item_id)
+    requires_ctx = {req for req, _ in root_recipe.require} if root_recipe else set()
     ctx_items = {r for r in requires_ctx if r in {"crafting_table_nearby", "furnace_nearby"}}
     if not ctx_items:
         return gated
 
-    skill_keys = set(skills.keys())
-    world_set = set(load_mineable_items())
+    world_set = data.mineable_set
     world_counts: Dict[str, int] = {}
     post_steps: List[Dict[str, object]] = []
     need_ctx: Dict[str, int] = {}
@@ -126,7 +158,7 @@ def plan_craft(item_id: str, count: int, inventory_counts: Optional[Dict[str, in
             if item in {"crafting_table_nearby", "furnace_nearby"}:
                 need_ctx[item] = 1
                 continue
-            if (item in world_set) or (item not in skill_keys):
+            if (item in world_set) or not graph.has_recipe(item):
                 world_counts[item] = world_counts.get(item, 0) + int(s.get("count", 1))
                 continue
         # Annotate conversions with required context when present
@@ -147,3 +179,16 @@ def plan_craft(item_id: str, count: int, inventory_counts: Optional[Dict[str, in
     # Then perform conversions/crafts/smelts
     reordered.extend(post_steps)
     return reordered
+
+
+def raw_requirements(item_id: str, count: int) -> Dict[str, int]:
+    """World-acquired leaves needed to make `count` of `item_id` from an empty inventory.
+
+    Context placeholders the closure needs (e.g., crafting_table_nearby) are included with count 1.
+    """
+    return _raw_requirements(game_data().bill_of_materials, item_id, int(count))
+
+
+def max_craftable(item_id: str, inventory_counts: Optional[Mapping[str, int]] = None) -> int:
+    """How many `item_id` the given inventory can produce right now (contexts assumed reachable)."""
+    return _max_craftable(game_data().bill_of_materials, item_id, inventory_counts or {})
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+"""Correlate `progress_update` messages with the actions awaiting them.
+
+Purpose: Let a dispatcher await the client's verdict on an action instead of
+assuming it succeeded after a fixed delay.
+
+How: One `ProgressTracker` per session maps `action_id` to a future. The
+dispatcher registers an action before sending it (`expect`). The server calls
+`resolve` from its `progress_update` handler, which completes the future with
+`(status, note)`. Updates for unknown ids (timed out, from paced dispatchers,
+or duplicates) are ignored.
+
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+
+
+TERMINAL_STATUSES = frozenset({"ok", "fail", "skipped", "cancelled"})
+
+# (status, note)
+Verdict = Tuple[str, Optional[str]]
+
+
+class ProgressTracker:
+    def __init__(self) -> None:
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def expect(self, action_id: str) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[action_id] = fut
+        return fut
+
+    def resolve(self, action_id: str, status: object, note: object = None) -> bool:
+        """Complete the action's future on a terminal status; False if nobody is waiting."""
+        if status not in TERMINAL_STATUSES:
+            return False
+        fut = self._pending.pop(action_id, None)
+        if fut is None or fut.done():
+            return False
+        fut.set_result((status, note if isinstance(note, str) else None))
+        return True
+
+    def discard(self, action_id: str) -> None:
+        fut = self._pending.pop(action_id, None)
+        if fut is not None and not fut.done():
+            fut.cancel()
+
+    def cancel_all(self) -> None:
+        for action_id in list(self._pending):
+            self.discard(action_id)
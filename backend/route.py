@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+"""Travel-aware ordering of world acquisitions.
+
+Purpose: Sequence a plan's `acquire` steps so the agent walks the shortest
+estimated route between resource sites, instead of visiting them in planner
+(dictionary) order.
+
+How: `ResourceSites` learns where items come from. Whenever an agent's
+inventory count of an item grows between telemetry updates, its position is
+recorded as a site for that item. Nearby sightings merge into one site, and
+each item keeps only the most recent sites. `order_acquisitions` takes every run
+of consecutive world `acquire` steps whose item has a known site. It orders
+them by nearest neighbour from the agent's position, then improves that with
+2-opt until no move helps, the deadline (`route_budget_ms`) passes, or a pass
+cap is hit. A following context step with a known location (e.g. the nearest
+furnace for `furnace_nearby`) is a fixed end point. Steps without a known site
+keep their relative order after the routed ones. Routed steps carry their
+`site` so the dispatcher can walk there before `#mine`.
+
+"""
+
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from . import metrics
+from .partition import CONTEXT_PLACEHOLDERS
+
+
+Point = Tuple[float, float, float]
+
+
+def _dist(a: Point, b: Point) -> float:
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+def as_point(value: object) -> Optional[Point]:
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        try:
+            return (float(value[0]), float(value[1]), float(value[2]))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class ResourceSites:
+    """Per-dimension, per-item positions where agents were seen gaining an item."""
+
+    MERGE_RADIUS = 16.0
+    MAX_PER_ITEM = 32
+
+    def __init__(self) -> None:
+        self._sites: Dict[Tuple[str, str], Deque[Point]] = {}
+
+    def observe(self, dim: str, pos: Point, before: Mapping[str, int], after: Mapping[str, int]) -> None:
+        if before is after:
+            return
+        for item, n in after.items():
+            if n > before.get(item, 0):
+                self._add(dim, item, pos)
+
+    def _add(self, dim: str, item: str, pos: Point) -> None:
+        sites = self._sites.get((dim, item))
+        if sites is None:
+            sites = self._sites[(dim, item)] = deque(maxlen=self.MAX_PER_ITEM)
+        for known in sites:
+            if _dist(known, pos) <= self.MERGE_RADIUS:
+                # Refresh recency without drifting the site
+                sites.remove(known)
+                sites.append(known)
+                return
+        sites.append(pos)
+
+    def nearest(self, item: str, dim: str, pos: Point) -> Optional[Point]:
+        sites = self._sites.get((dim, item))
+        if not sites:
+            return None
+        return min(sites, key=lambda s: _dist(s, pos))
+
+
+def _path_cost(start: Point, pts: Sequence[Point], end: Optional[Point]) -> float:
+    cost, here = 0.0, start
+    for p in pts:
+        cost += _dist(here, p)
+        here = p
+    return cost + (_dist(here, end) if end is not None else 0.0)
+
+
+def _nearest_neighbour(start: Point, pts: Sequence[Point]) -> List[int]:
+    left = set(range(len(pts)))
+    order: List[int] = []
+    here = start
+    while left:
+        i = min(left, key=lambda k: (_dist(here, pts[k]), k))
+        order.append(i)
+        left.remove(i)
+        here = pts[i]
+    return order
+
+
+def _two_opt(start: Point, pts: Sequence[Point], order: List[int], end: Optional[Point], deadline: float, max_passes: int = 50) -> List[int]:
+    """Open-path 2-opt: reverse order[i..j] while that shortens the path; stops at the deadline."""
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            if time.perf_counter() > deadline:
+                return order
+            a = start if i == 0 else pts[order[i - 1]]
+            b = pts[order[i]]
+            for j in range(i + 1, n):
+                c = pts[order[j]]
+                d = end if j == n - 1 else pts[order[j + 1]]
+                before = _dist(a, b) + (_dist(c, d) if d is not None else 0.0)
+                after = _dist(a, c) + (_dist(b, d) if d is not None else 0.0)
+                if after < before - 1e-9:
+                    order[i : j + 1] = reversed(order[i : j + 1])
+                    b = pts[order[i]]
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def order_acquisitions(
+    steps: Sequence[Dict[str, object]],
+    start: Optional[Point],
+    locate: Callable[[str, Point], Optional[Point]],
+    budget_ms: int,
+) -> List[Dict[str, object]]:
+    """Reorder runs of consecutive world acquisitions by estimated travel from `start`.
+
+    `locate(item, near)` returns a known position for an item (or context placeholder) or None.
+    """
+    if start is None or budget_ms <= 0:
+        return list(steps)
+    t0 = metrics.now()
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    out: List[Dict[str, object]] = []
+    here = start
+    i = 0
+    while i < len(steps):
+        step = steps[i]
+        if not _is_world_acquire(step):
+            out.append(step)
+            i += 1
+            continue
+        j = i
+        while j < len(steps) and _is_world_acquire(steps[j]):
+            j += 1
+        run = list(steps[i:j])
+        known: List[Tuple[Dict[str, object], Point]] = []
+        unknown: List[Dict[str, object]] = []
+        for s in run:
+            site = locate(str(s.get("item", "")), here)
+            if site is None:
+                unknown.append(s)
+            else:
+                known.append(({**s, "site": [round(v) for v in site]}, site))
+        end = None
+        if j < len(steps) and steps[j].get("op") == "acquire" and str(steps[j].get("item")) in CONTEXT_PLACEHOLDERS:
+            end = locate(str(steps[j].get("item")), here)
+        if len(known) > 1:
+            pts = [p for _, p in known]
+            order = _two_opt(here, pts, _nearest_neighbour(here, pts), end, deadline)
+            known = [known[k] for k in order]
+        out.extend(s for s, _ in known)
+        out.extend(unknown)
+        if known:
+            here = known[-1][1]
+        i = j
+    metrics.ROUTE_SECONDS.observe_since(t0)
+    return out
+
+
+def _is_world_acquire(step: Dict[str, object]) -> bool:
+    return step.get("op") == "acquire" and str(step.get("item", "")) not in CONTEXT_PLACEHOLDERS
+
+
+def route_length(start: Point, steps: Sequence[Dict[str, object]]) -> float:
+    """Estimated travel over the `site`s of routed steps, in plan order."""
+    pts = [p for p in (as_point(s.get("site")) for s in steps) if p is not None]
+    return _path_cost(start, pts, None)
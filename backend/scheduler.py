@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+"""Token-bucket action scheduler shared by every dispatcher.
+
+Purpose: Release actions as soon as the rate limits allow instead of sleeping a
+worst-case interval after every step, and enforce chat limits across agents as
+well as per agent.
+
+How: Each channel (`chat_bridge`, `mod_native`) has one bucket per agent and
+one global bucket. `acquire(player, channel)` waits until both hold a token and
+then takes from both, so a token is never spent while waiting on the other.
+Waiters for the same agent bucket queue on its lock, and so do waiters for the
+same global bucket. The per-agent chat bucket has a burst of 1 and an interval
+of `1/rate + default_action_spacing_ms`. This matches the mod's strict
+minimum-interval limiter, which drops early sends. Mod-native actions queue
+client-side, so their buckets allow one second of burst.
+
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from . import metrics
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; rate <= 0 means unlimited."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def retune(self, rate: float, burst: float) -> None:
+        """Change the limits, keeping the tokens already earned (capped at the new burst)."""
+        if self.unlimited:
+            self.updated = time.monotonic()
+        else:
+            self._refill(time.monotonic())
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = min(self.tokens, self.burst)
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0.0 if one is available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.unlimited:
+            return
+        self._refill(time.monotonic())
+        self.tokens -= 1.0
+
+    async def ready(self) -> None:
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class ActionScheduler:
+    def __init__(self, settings: object) -> None:
+        self._agent_limits: Dict[str, Tuple[float, float]] = {}
+        self._global: Dict[str, TokenBucket] = {}
+        self._agents: Dict[Tuple[str, str], TokenBucket] = {}
+        self.configure(settings)
+
+    def configure(self, settings: object) -> None:
+        """Apply (possibly reloaded) rate settings; existing buckets are retuned in place."""
+        # The client's chat limit and the server-side cap, whichever is stricter, plus a jitter margin
+        chat_rates = [
+            r for r in (int(settings.chat_bridge_rate_limit_per_sec), int(settings.max_chat_sends_per_sec))  # type: ignore[attr-defined]
+            if r > 0
+        ]
+        chat_interval = (1.0 / min(chat_rates) if chat_rates else 0.0) + max(int(settings.default_action_spacing_ms), 0) / 1000.0  # type: ignore[attr-defined]
+        native_rate = float(settings.mod_native_actions_per_sec)  # type: ignore[attr-defined]
+        # channel -> (rate, burst) for each agent bucket
+        self._agent_limits = {
+            "chat_bridge": (1.0 / chat_interval if chat_interval > 0 else 0.0, 1.0),
+            "mod_native": (native_rate, native_rate),
+        }
+        global_chat = float(settings.global_chat_sends_per_sec)  # type: ignore[attr-defined]
+        global_native = float(settings.global_mod_native_actions_per_sec)  # type: ignore[attr-defined]
+        for channel, rate in (("chat_bridge", global_chat), ("mod_native", global_native)):
+            bucket = self._global.get(channel)
+            if bucket is None:
+                self._global[channel] = TokenBucket(rate, rate)
+            else:
+                bucket.retune(rate, rate)
+        for (_, channel), bucket in self._agents.items():
+            bucket.retune(*self._agent_limits[channel])
+
+    def _agent(self, player_id: str, channel: str) -> TokenBucket:
+        key = (player_id, channel)
+        bucket = self._agents.get(key)
+        if bucket is None:
+            rate, burst = self._agent_limits[channel]
+            bucket = self._agents[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, player_id: Optional[str], channel: str) -> None:
+        """Wait until `player_id` may send one action on `channel`; unknown channels pass through."""
+        if channel not in self._agent_limits:
+            return
+        agent = self._agent(player_id or "unknown", channel)
+        glob = self._global[channel]
+        t0 = metrics.now()
+        async with agent.lock:
+            await agent.ready()
+            async with glob.lock:
+                await glob.ready()
+                # Tokens only accrue while waiting, so the agent bucket is still ready here
+                agent.take()
+                glob.take()
+        metrics.SCHEDULER_WAIT_SECONDS.observe_since(t0, channel)
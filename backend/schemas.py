@@ -17,6 +17,8 @@ MessageType = Literal[
     "action_request",
     "progress_update",
     "telemetry_update",
+    "telemetry_delta",
+    "telemetry_resync",
     "state_request",
     "state_response",
     "inventory_snapshot",
@@ -24,6 +26,7 @@ MessageType = Literal[
     "chat_send",
     "chat_event",
     "cancel",
+    "batch",
 ]
 
 
@@ -103,13 +106,30 @@ class TelemetryState(TypedDict, total=False):
     biome: str
 
 
-class TelemetryUpdate(TypedDict):
+class TelemetryUpdate(TypedDict, total=False):
     type: Literal["telemetry_update"]
     player_uuid: str
     ts: str
+    seq: int  # present when telemetry_delta was negotiated; deltas chain from it
     state: TelemetryState
 
 
+class TelemetryDelta(TypedDict, total=False):
+    type: Literal["telemetry_delta"]
+    player_uuid: str
+    ts: str
+    seq: int
+    base_seq: int  # seq of the update this delta applies to
+    changed: Dict[str, Any]  # changed top-level fields (inventory excluded)
+    removed: List[str]  # top-level fields no longer present
+    inventory: List[Dict[str, Any]]  # changed slots; {slot, count: 0} means emptied
+
+
+class TelemetryResync(TypedDict):
+    type: Literal["telemetry_resync"]
+    player_uuid: str
+
+
 class StateRequest(TypedDict):
     type: Literal["state_request"]
     request_id: str
@@ -175,3 +195,8 @@ class InventoryDiff(TypedDict, total=False):
 class Cancel(TypedDict):
     type: Literal["cancel"]
     request_id: str
+
+
+class Batch(TypedDict):
+    type: Literal["batch"]
+    messages: List[Dict[str, Any]]  # ordered; each handled exactly as if sent in its own frame
@@ -14,46 +14,123 @@ logging with request and player ids; avoid blocking the event loop.
 """
 
 import asyncio
+import functools
+import inspect
 import json
 import logging
 import signal
+import time
 import uuid
-from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Mapping, Optional, Tuple
 
 import websockets
 from websockets.server import WebSocketServerProtocol, serve
 
-from .config import configure_logging, load_settings
+from .config import RESTART_KEYS, Settings, changed_keys, client_settings, configure_logging, load_settings, settings_store
 from .storage import StorageCatalog
 from .intents import parse_command_text
 from .planner import plan_craft
+from .data_files import GameData, game_data, game_data_store
 from .dispatcher import Dispatcher
+from .partition import Agent, partition_plan
+from .plan_journal import PlanJournal, remaining_steps
+from .progress import ProgressTracker
+from .route import Point, ResourceSites, as_point, order_acquisitions
+from .scheduler import ActionScheduler
 from .state_service import StateService
+from .traffic import TrafficRecorder
+from .codec import JSON, decode_frame, negotiate
+from .sessions import OutboundQueue, Session, SessionRegistry
+from .ipc import Peer
+from .shard import RemotePlans, RemoteStorage, ShardLink
+from .coordinator import run_sharded
+from . import metrics
 from .schemas import ChatSend
 
 
 logger = logging.getLogger("automc.server")
 
-
-@dataclass
-class Session:
-    player_uuid: Optional[str]
-    websocket: WebSocketServerProtocol
-    last_eta_ms: Optional[int] = None
-    dispatch_tasks: list[asyncio.Task] = field(default_factory=list)
+# A telemetry_resync unanswered for this long is sent again on the next gapped delta
+RESYNC_RETRY_S = 5.0
 
 
 class BackendServer:
-    def __init__(self) -> None:
-        self.settings = load_settings()
-        self.sessions: Dict[WebSocketServerProtocol, Session] = {}
+    def __init__(self, link: Optional[ShardLink] = None) -> None:
+        # Cached and hot-reloaded; read through the property so edits show up everywhere
+        self._settings_store = settings_store()
+        # Set when this is one worker of a sharded backend (backend/coordinator.py)
+        self.link = link
+        self._relay_tasks: set[asyncio.Task] = set()
+        # Split !get plans whose crafter runs here, by group id: stopped when a helper's plan does not finish
+        self._plan_groups: dict[str, dict] = {}
+        self.sessions = SessionRegistry()
+        # One scheduler for every dispatcher so global rate limits hold across agents
+        self.scheduler = ActionScheduler(self.settings)
         self._shutdown_event = asyncio.Event()
         self._idle_task: Optional[asyncio.Task] = None
-        self.state = StateService(Path("data/state.json"))
-        self.state.load()
-        self.storage = StorageCatalog()
+        if link is not None:
+            # Live state of this worker's agents stays here; the coordinator owns persistence,
+            # the storage catalog and the plan journal
+            self.state = StateService(
+                Path("data/state.json"),
+                flush_interval_ms=self.settings.state_flush_interval_ms,
+                sink=link.push_telemetry,
+            )
+            self.storage = RemoteStorage(link)
+            self.plans = RemotePlans(link)
+        else:
+            self.state = StateService(
+                Path("data/state.json"),
+                flush_interval_ms=self.settings.state_flush_interval_ms,
+                compact_interval_ms=self.settings.state_compact_interval_ms,
+            )
+            self.state.load()
+            self.storage = StorageCatalog(flush_interval_ms=self.settings.storage_flush_interval_ms)
+            # Unfinished plans per agent, for !resume after a disconnect or restart
+            self.plans = PlanJournal(
+                Path("data/plans.jsonl"),
+                flush_interval_ms=self.settings.state_flush_interval_ms,
+                compact_interval_ms=self.settings.state_compact_interval_ms,
+            )
+            self.plans.load()
+        # Where agents were seen gaining items; feeds travel-aware plan ordering
+        self.sites = ResourceSites()
+        # Every frame in both directions, for replay (backend/bench/replay.py)
+        self.recorder: Optional[TrafficRecorder] = None
+        if self.settings.record_traffic:
+            shard_suffix = f"-shard{link.index}" if link is not None else ""
+            self.recorder = TrafficRecorder(
+                Path("data/traffic") / f"{time.strftime('%Y%m%d-%H%M%S')}{shard_suffix}.amcrec.gz",
+                flush_interval_ms=self.settings.state_flush_interval_ms,
+            )
+
+    @property
+    def settings(self) -> Settings:
+        return self._settings_store.get()
+
+    def _on_settings_changed(self, old: Settings, new: Settings) -> None:
+        changed = changed_keys(old, new)
+        logger.info("settings reloaded: %s", ", ".join(changed))
+        restart = sorted(RESTART_KEYS.intersection(changed))
+        if restart:
+            logger.warning("settings changed that apply only after a restart: %s", ", ".join(restart))
+        if old.log_level != new.log_level:
+            logging.getLogger().setLevel(getattr(logging, new.log_level.upper(), logging.INFO))
+        self.scheduler.configure(new)
+        # Only clients whose effective values changed; keys set with !settings stay as set
+        changed_client = set(changed).intersection(client_settings(new))
+        if not changed_client:
+            return
+        update = client_settings(new)
+        pushed = 0
+        for session in list(self.sessions):
+            if session.player_uuid is None or changed_client.issubset(session.settings_overrides):
+                continue
+            # A full set: a newer settings_update supersedes an older one still queued
+            self._enqueue(session, {"type": "settings_update", "settings": {**update, **session.settings_overrides}})
+            pushed += 1
+        logger.info("pushed settings_update to %d client(s)", pushed)
 
     def _player_label(self, player_id: Optional[str]) -> str:
         pid = player_id or "unknown"
@@ -71,146 +148,224 @@ class BackendServer:
         host = self.settings.host
         port = self.settings.port
 
-        logger.info("listening on %s:%s", host, port)
+        shard = self.link.index if self.link is not None else None
+        if self.link is not None:
+            await self.link.connect(self._on_shard_message)
+        logger.info("listening on %s:%s%s", host, port, f" (shard {shard})" if shard is not None else "")
 
-        async with serve(self._handle_client, host, port, ssl=None):
-            try:
-                await self._shutdown_event.wait()
-            finally:
-                pass
+        # Local-only scrape endpoint; recording stays off (near-zero cost) unless it is configured
+        metrics_server = None
+        if self.settings.metrics_port > 0:
+            # Shards cannot share the scrape port: worker i serves metrics_port + i
+            metrics_server = await metrics.serve("127.0.0.1", self.settings.metrics_port + (shard or 0))
+        self.state.start()
+        self.storage.start()
+        self.plans.start()
+        if self.recorder is not None:
+            self.recorder.start()
+            logger.info("recording traffic to %s", self.recorder.path)
+        # Each shard worker watches the file itself and updates its own clients
+        self._settings_store.subscribe(self._on_settings_changed)
+        self._settings_store.start()
+        try:
+            # Build the game data snapshot now rather than on the first !get
+            logger.info("game data version %d loaded", game_data().version)
+        except Exception as exc:
+            logger.error("game data failed to load: %s", exc)
+        game_data_store().start(self.settings.settings_reload_interval_ms)
+        try:
+            # Shards bind the same port; the kernel spreads connections over them
+            async with serve(self._handle_client, host, port, ssl=None, reuse_port=shard is not None):
+                try:
+                    await self._shutdown_event.wait()
+                finally:
+                    if metrics_server is not None:
+                        metrics_server.close()
+                    # Drain write-behind persistence (state journal, storage rows, plan journal)
+                    await self.state.close()
+                    await self.storage.close()
+                    await self.plans.close()
+                    if self.link is not None:
+                        await self.link.close()
+        finally:
+            self._settings_store.unsubscribe(self._on_settings_changed)
+            await self._settings_store.close()
+            await game_data_store().close()
+            # After the server closed its connections, so their last frames are kept
+            if self.recorder is not None:
+                await self.recorder.close()
 
     async def stop(self) -> None:
         self._shutdown_event.set()
 
     async def _handle_client(self, websocket: WebSocketServerProtocol) -> None:
-        session = Session(player_uuid=None, websocket=websocket)
-        self.sessions[websocket] = session
+        session = Session(
+            player_uuid=None,
+            websocket=websocket,
+            outbound=OutboundQueue(self.settings.outbound_queue_max, self.settings.outbound_overflow_policy),
+        )
+        recorder = self.recorder
+        if recorder is not None:
+            session.trace_id = recorder.open()
+        self.sessions.add(session)
+        session.writer_task = asyncio.create_task(self._writer(session))
+        metrics.SESSIONS.set(len(self.sessions))
         client = f"{websocket.remote_address}"
         logger.info("client connected: %s", client)
         try:
             async for raw in websocket:
+                if recorder is not None:
+                    recorder.inbound(session.trace_id, raw)
                 try:
-                    msg = json.loads(raw)
+                    frame = decode_frame(raw, session.codec)
                 except Exception:
-                    logger.warning("invalid JSON from %s", client)
+                    logger.warning("undecodable frame from %s", client)
                     continue
 
-                mtype = msg.get("type")
-                if mtype == "handshake":
-                    pid = msg.get("player_uuid")
-                    provided_pw = msg.get("password")
-                    pname = msg.get("player_name")
-                    # Validate password strictly
-                    if not isinstance(provided_pw, str) or provided_pw != self.settings.password:
-                        logger.info("handshake rejected for %s: auth_failed", pid)
-                        try:
-                            await websocket.close(code=1008, reason="auth_failed")
-                        finally:
-                            return
-                    session.player_uuid = pid if isinstance(pid, str) and pid else None
-                    # If a player name is provided in handshake, persist it so labels include it immediately
-                    try:
-                        if isinstance(pname, str) and pname and isinstance(pid, str) and pid:
-                            await self.state.update_telemetry(pid, "", {"username": pname})
-                    except Exception:
-                        pass
-                    # Log using uuid (name) if we have a cached username
-                    logger.info("handshake from %s", self._player_label(session.player_uuid))
-                    # Immediately push flattened client settings so the mod has no local fallbacks
-                    try:
-                        await self._send_json(session.websocket, {
-                            "type": "settings_update",
-                            "settings": {
-                                "telemetry_interval_ms": self.settings.telemetry_interval_ms,
-                                "chat_bridge_enabled": self.settings.chat_bridge_enabled,
-                                "chat_bridge_rate_limit_per_sec": self.settings.chat_bridge_rate_limit_per_sec,
-                                "command_prefix": self.settings.command_prefix,
-                                "echo_public_default": self.settings.echo_public_default,
-                                "ack_on_command": self.settings.ack_on_command,
-                                "message_pump_max_per_tick": self.settings.message_pump_max_per_tick,
-                                "message_pump_queue_cap": self.settings.message_pump_queue_cap,
-                                "inventory_diff_debounce_ms": self.settings.inventory_diff_debounce_ms,
-                                "chat_max_length": self.settings.chat_max_length,
-                                "crafting_click_delay_ms": self.settings.crafting_click_delay_ms,
-                                "feedback_prefix": self.settings.feedback_prefix,
-                            "feedback_prefix_bracket_color": self.settings.feedback_prefix_bracket_color,
-                            "feedback_prefix_inner_color": self.settings.feedback_prefix_inner_color,
-                            },
-                        })
-                    except Exception:
-                        logger.debug("failed to send initial settings_update")
-                    # Send a local chat confirmation so users see connection succeeded
+                # A batch carries an ordered list of messages; each is handled as if sent alone
+                if isinstance(frame, dict) and frame.get("type") == "batch" and isinstance(frame.get("messages"), list):
+                    msgs = frame["messages"]
+                else:
+                    msgs = [frame]
+                for msg in msgs:
+                    if not isinstance(msg, dict):
+                        continue
+                    mtype = msg.get("type")
+                    mlabel = metrics.message_type(mtype)
+                    metrics.MESSAGES_RECEIVED.inc(mlabel)
+                    t0 = metrics.now()
                     try:
-                        await self._send_json(session.websocket, {
-                            "type": "chat_send",
-                            "request_id": str(uuid.uuid4()),
-                            "player_uuid": session.player_uuid or "unknown",
-                            "text": f"{self.settings.feedback_prefix}Connected to backend {self.settings.host}:{self.settings.port}",
-                        })
-                    except Exception:
-                        logger.debug("failed to send connection confirmation chat")
-                    continue
+                        if mtype == "handshake":
+                            pid = msg.get("player_uuid")
+                            provided_pw = msg.get("password")
+                            pname = msg.get("player_name")
+                            # Validate password strictly
+                            if not isinstance(provided_pw, str) or provided_pw != self.settings.password:
+                                logger.info("handshake rejected for %s: auth_failed", pid)
+                                try:
+                                    await websocket.close(code=1008, reason="auth_failed")
+                                finally:
+                                    return
+                            self.sessions.bind(session, pid if isinstance(pid, str) and pid else None)
+                            caps = msg.get("capabilities")
+                            session.telemetry_delta = bool(
+                                self.settings.telemetry_delta_enabled
+                                and isinstance(caps, dict)
+                                and caps.get("telemetry_delta") is True
+                            )
+                            codec = negotiate(self.settings.wire_codecs, caps.get("codecs") if isinstance(caps, dict) else None)
+                            batch = isinstance(caps, dict) and caps.get("batch") is True
+                            # If a player name is provided in handshake, persist it so labels include it immediately
+                            try:
+                                if isinstance(pname, str) and pname and isinstance(pid, str) and pid:
+                                    await self.state.update_telemetry(pid, "", {"username": pname})
+                            except Exception:
+                                pass
+                            known = self.state.get_player_state(session.player_uuid or "")
+                            uname = pname if isinstance(pname, str) and pname else (known or {}).get("state", {}).get("username")
+                            if isinstance(uname, str) and uname:
+                                self.sessions.set_username(session, uname)
+                            # Log using uuid (name) if we have a cached username
+                            logger.info("handshake from %s", self._player_label(session.player_uuid))
+                            self._announce(session)
+                            # Immediately push flattened client settings so the mod has no local fallbacks.
+                            # Written directly (not queued): it must leave as JSON before the codec switch.
+                            try:
+                                await self._send_direct(session, {
+                                    "type": "settings_update",
+                                    "settings": {
+                                        **client_settings(self.settings),
+                                        "telemetry_delta": session.telemetry_delta,
+                                        "codec": codec.name,
+                                        "batch": batch,
+                                    },
+                                })
+                            except Exception:
+                                logger.debug("failed to send initial settings_update")
+                            # The settings_update above is the last JSON frame; everything after uses the codec
+                            session.codec = codec
+                            session.batch = batch
+                            if codec is not JSON:
+                                logger.info("wire codec for %s: %s", self._player_label(session.player_uuid), codec.name)
+                            # Send a local chat confirmation so users see connection succeeded
+                            try:
+                                await self._send_json(session.websocket, {
+                                    "type": "chat_send",
+                                    "request_id": str(uuid.uuid4()),
+                                    "player_uuid": session.player_uuid or "unknown",
+                                    "text": f"{self.settings.feedback_prefix}Connected to backend {self.settings.host}:{self.settings.port}",
+                                })
+                            except Exception:
+                                logger.debug("failed to send connection confirmation chat")
+                            await self._offer_resume(session)
+                            continue
 
-                if mtype == "command":
-                    await self._on_command(session, msg)
-                    continue
+                        if mtype == "command":
+                            await self._on_command(session, msg)
+                            continue
 
-                if mtype == "telemetry_update":
-                    # If player_uuid is 'auto' and state includes a uuid hint, adopt it
-                    try:
-                        if (session.player_uuid == "auto"):
-                            st = msg.get("state", {})
-                            # accept uuid from possible future field, or from equipment/other hints (not present now)
-                            uuid_hint = st.get("uuid")
-                            if isinstance(uuid_hint, str) and uuid_hint:
-                                session.player_uuid = uuid_hint
-                                logger.info("adopted player uuid for session: %s", session.player_uuid)
-                    except Exception:
-                        pass
-                    await self._on_telemetry(session, msg)
-                    continue
-                if mtype == "inventory_snapshot":
-                    container = msg.get("container") or {}
-                    try:
-                        self.storage.handle_snapshot(session.player_uuid or "unknown", container)
-                    except Exception:
-                        logger.debug("invalid inventory_snapshot ignored")
-                    continue
+                        if mtype == "telemetry_update":
+                            # If player_uuid is 'auto' and state includes a uuid hint, adopt it
+                            try:
+                                if (session.player_uuid == "auto"):
+                                    st = msg.get("state", {})
+                                    # accept uuid from possible future field, or from equipment/other hints (not present now)
+                                    uuid_hint = st.get("uuid")
+                                    if isinstance(uuid_hint, str) and uuid_hint:
+                                        self.sessions.bind(session, uuid_hint)
+                                        self._announce(session)
+                                        logger.info("adopted player uuid for session: %s", session.player_uuid)
+                            except Exception:
+                                pass
+                            await self._on_telemetry(session, msg)
+                            continue
+                        if mtype == "telemetry_delta":
+                            await self._on_telemetry_delta(session, msg)
+                            continue
+                        if mtype == "inventory_snapshot":
+                            container = msg.get("container") or {}
+                            try:
+                                self.storage.handle_snapshot(session.player_uuid or "unknown", container)
+                            except Exception:
+                                logger.debug("invalid inventory_snapshot ignored")
+                            continue
 
-                if mtype == "inventory_diff":
-                    try:
-                        self.storage.handle_diff(session.player_uuid or "unknown", msg)
-                    except Exception:
-                        logger.debug("invalid inventory_diff ignored")
-                    continue
+                        if mtype == "inventory_diff":
+                            try:
+                                self.storage.handle_diff(session.player_uuid or "unknown", msg)
+                            except Exception:
+                                logger.debug("invalid inventory_diff ignored")
+                            continue
 
-                if mtype == "state_request":
-                    await self._on_state_request(session, msg)
-                    continue
+                        if mtype == "state_request":
+                            await self._on_state_request(session, msg)
+                            continue
 
-                if mtype == "progress_update":
-                    await self._on_progress(session, msg)
-                    continue
+                        if mtype == "progress_update":
+                            await self._on_progress(session, msg)
+                            continue
 
-                if mtype == "ping":
-                    await self._send_json(websocket, {"type": "pong"})
-                    continue
+                        if mtype == "ping":
+                            await self._send_json(websocket, {"type": "pong"})
+                            continue
 
-                logger.debug("unhandled message type: %s", mtype)
-                # Log chat_event minimally (already handled client-side)
-                if mtype == "chat_event":
-                    text = str(msg.get("text", ""))
-                    # Parse Baritone ETA lines to capture last ETA
-                    try:
-                        # Examples: "Next segment: 6.6s (131 ticks)\nGoal: 10.6s (213 ticks)"
-                        import re
-                        m = re.search(r"Goal:\s*([0-9]+(?:\.[0-9]+)?)s", text)
-                        if m:
-                            sec = float(m.group(1))
-                            session.last_eta_ms = int(sec * 1000)
-                    except Exception:
-                        pass
-                    logger.info("chat_event: %s", text)
+                        logger.debug("unhandled message type: %s", mtype)
+                        # Log chat_event minimally (already handled client-side)
+                        if mtype == "chat_event":
+                            text = str(msg.get("text", ""))
+                            # Parse Baritone ETA lines to capture last ETA
+                            try:
+                                # Examples: "Next segment: 6.6s (131 ticks)\nGoal: 10.6s (213 ticks)"
+                                import re
+                                m = re.search(r"Goal:\s*([0-9]+(?:\.[0-9]+)?)s", text)
+                                if m:
+                                    sec = float(m.group(1))
+                                    session.last_eta_ms = int(sec * 1000)
+                            except Exception:
+                                pass
+                            logger.info("chat_event: %s", text)
+                    finally:
+                        metrics.HANDLER_SECONDS.observe_since(t0, mlabel)
 
         except websockets.ConnectionClosedError:
             # Connection dropped unexpectedly; log agent identity if known
@@ -227,7 +382,15 @@ class BackendServer:
                 session.dispatch_tasks.clear()
             except Exception:
                 pass
-            self.sessions.pop(websocket, None)
+            session.progress.cancel_all()
+            self._announce(session, online=False)
+            if session.writer_task is not None:
+                session.writer_task.cancel()
+            self.sessions.remove(websocket)
+            if recorder is not None:
+                recorder.close_session(session.trace_id)
+            metrics.SESSIONS.set(len(self.sessions))
+            metrics.OUTBOUND_QUEUE_DEPTH.remove(session.player_uuid or "unknown")
 
     
 
@@ -262,14 +425,17 @@ class BackendServer:
                 "!help - Show this help",
                 "!who - List online agents (uuid and username)",
                 "!stop - Cancel all active tasks for all agents",
+                "!resume - Continue this agent's last unfinished plan",
                 "!connect <ip:port> <pw> - Connect client to backend",
                 "!disconnect - Disconnect client from backend",
                 "!say <text> - Send as user or evaluate commands",
                 "!saymulti <p1,p2,...> <text> - Send as target users",
                 "!sayall <text> - Send as all users",
-                "!get <item> <count> - Plan and execute item acquisition",
+                "!get <item> <count> [@all|@p1,p2] - Plan and execute item acquisition (optionally shared across agents)",
+                "!find <item> - List the nearest known containers holding an item",
                 "!settings <json> - Apply runtime settings to clients",
             ]
+            # Queued back-to-back, so batching sessions receive all lines in one frame
             for line in help_lines:
                 await self._send_json(session.websocket, {
                     "type": "chat_send",
@@ -289,7 +455,9 @@ class BackendServer:
             elif cmd == "sayall":
                 usage = "Usage: !sayall <text|!command|#cmd|.cmd>"
             elif cmd == "get":
-                usage = "Usage: !get <item> <count>"
+                usage = "Usage: !get <item> <count> [@all|@p1,p2,...]"
+            elif cmd == "find":
+                usage = "Usage: !find <item>"
             elif cmd == "settings":
                 usage = "Usage: !settings <json>"
             if usage:
@@ -304,58 +472,32 @@ class BackendServer:
         if intent and intent.get("type") == "craft_item":
             item_id = str(intent["item"])  # type: ignore[index]
             count = int(intent["count"])  # type: ignore[index]
-            # Build current inventory counts from last telemetry for inventory-aware planning
-            inv_counts: Dict[str, int] = {}
-            try:
-                ps = self.state.get_player_state(player_id)
-                inv_list = (ps or {}).get("state", {}).get("inventory", [])
-                if isinstance(inv_list, list):
-                    for slot in inv_list:
-                        try:
-                            iid = str(slot.get("id"))
-                            c = int(slot.get("count", 0))
-                            if iid:
-                                inv_counts[iid] = inv_counts.get(iid, 0) + c
-                        except Exception:
-                            continue
-            except Exception:
-                inv_counts = {}
-            steps = plan_craft(item_id, count, inventory_counts=inv_counts)
-            plan_id = str(uuid.uuid4())
-            plan = {
-                "type": "plan",
-                "plan_id": plan_id,
+            # Current inventory counts (maintained per telemetry update) for inventory-aware planning
+            inv_counts = self.state.get_inventory_counts(player_id)
+            # One game data snapshot for planning and dispatch, even if the files are reloaded meanwhile
+            data = game_data()
+            steps = plan_craft(item_id, count, inventory_counts=inv_counts, data=data)
+            group = intent.get("agents")
+            goal = f"{item_id} x{count}"
+            if group:
+                await self._start_partitioned_plan(session, request_id, steps, list(group), goal, data=data)  # type: ignore[arg-type]
+                return
+            await self._start_plan(session, request_id, steps, goal, data=data)
+            return
+
+        if intent and intent.get("type") == "resume":
+            await self._resume_plan(session, request_id)
+            return
+
+        if intent and intent.get("type") == "find":
+            item_id = str(intent["item"])  # type: ignore[index]
+            text = await self._find_item_text(player_id, item_id)
+            await self._send_json(session.websocket, {
+                "type": "chat_send",
                 "request_id": request_id,
-                "steps": steps,
-            }
-            await self._send_json(session.websocket, plan)
-            # stream actions in the background to keep the receive loop responsive
-            # Track action_id -> (request_id, step) for basic progress bookkeeping
-            action_index: dict[str, dict] = {}
-            def _on_action_send(aid: str, step: dict) -> None:
-                action_index[aid] = {"request_id": request_id, "step": step}
-
-            dispatcher = Dispatcher(
-                session.websocket,
-                player_id=session.player_uuid,
-                state_service=self.state,
-                on_action_send=_on_action_send,
-            )
-            # Store the index on the session object for later lookups
-            setattr(session, "_action_index", action_index)
-            task = asyncio.create_task(dispatcher.run_linear(steps))
-            # Track task for cancellation
-            try:
-                session.dispatch_tasks.append(task)
-                def _cleanup_task(t: asyncio.Task) -> None:
-                    try:
-                        if t in session.dispatch_tasks:
-                            session.dispatch_tasks.remove(t)
-                    except Exception:
-                        pass
-                task.add_done_callback(_cleanup_task)
-            except Exception:
-                pass
+                "player_uuid": player_id,
+                "text": f"{self.settings.feedback_prefix}{text}",
+            })
             return
 
         if intent and intent.get("type") == "saymulti":
@@ -368,6 +510,10 @@ class BackendServer:
                     if tgt == player_id:
                         continue
                     # Reconstruct a full command and run it as if from that target
+                    if self.link is not None and not self.sessions.for_uuid(tgt):
+                        # Hosted by another shard
+                        self.link.relay({"kind": "eval", "player": tgt, "text": payload}, player=tgt)
+                        continue
                     await self._eval_command_as_target(tgt, payload)
                 return
             # Otherwise, forward as chat text
@@ -385,9 +531,9 @@ class BackendServer:
             payload = str(intent.get("text", ""))
             # If payload is a command, run it for each connected agent
             if payload.startswith("!"):
-                for s in list(self.sessions.values()):
-                    pid = s.player_uuid or "unknown"
-                    await self._eval_command_as_target(pid, payload)
+                if self.link is not None:
+                    self.link.relay({"kind": "eval_all", "text": payload})
+                await self._eval_all(payload)
                 return
             # Otherwise, broadcast as plain chat
             out = {
@@ -415,7 +561,11 @@ class BackendServer:
             # Build list of online agents from telemetry cache
             try:
                 players = []
-                for s in self.sessions.values():
+                if self.link is not None:
+                    # Every shard's agents, from the coordinator's directory
+                    for pid, uname in await self.link.call("who"):
+                        players.append(f"{pid} ({uname})" if uname else pid)
+                for s in self.sessions if self.link is None else ():
                     pid = s.player_uuid or "unknown"
                     ps = self.state.get_player_state(pid)
                     uname = ps.get("state", {}).get("username") if ps else None
@@ -446,29 +596,12 @@ class BackendServer:
         if text.startswith("!settings "):
             try:
                 payload = json.loads(text[len("!settings "):].strip())
-                # Merge with current flattened settings
-                merged = {
-                    "telemetry_interval_ms": self.settings.telemetry_interval_ms,
-                    "chat_bridge_enabled": self.settings.chat_bridge_enabled,
-                    "chat_bridge_rate_limit_per_sec": self.settings.chat_bridge_rate_limit_per_sec,
-                    "command_prefix": self.settings.command_prefix,
-                    "echo_public_default": self.settings.echo_public_default,
-                    "ack_on_command": self.settings.ack_on_command,
-                    "message_pump_max_per_tick": self.settings.message_pump_max_per_tick,
-                    "message_pump_queue_cap": self.settings.message_pump_queue_cap,
-                    "inventory_diff_debounce_ms": self.settings.inventory_diff_debounce_ms,
-                    "chat_max_length": self.settings.chat_max_length,
-                    "crafting_click_delay_ms": self.settings.crafting_click_delay_ms,
-                }
+                # Merge with current flattened settings; kept across config reloads for this session
                 if isinstance(payload, dict):
-                    merged.update(payload)
+                    session.settings_overrides.update(payload)
                 await self._send_json(session.websocket, {
                     "type": "settings_update",
-                    "settings": {
-                        **merged,
-                        "feedback_prefix_bracket_color": self.settings.feedback_prefix_bracket_color,
-                        "feedback_prefix_inner_color": self.settings.feedback_prefix_inner_color,
-                    },
+                    "settings": {**client_settings(self.settings), **session.settings_overrides},
                 })
             except Exception:
                 await self._send_json(session.websocket, {
@@ -487,10 +620,356 @@ class BackendServer:
             "text": f"{self.settings.feedback_prefix}Unrecognized command: {text}",
         })
 
+    def _agent_position(self, player_id: str) -> Optional[Tuple[str, Point]]:
+        st = (self.state.get_player_state(player_id) or {}).get("state", {})
+        pos, dim = as_point(st.get("pos")), st.get("dim")
+        return (dim, pos) if pos is not None and isinstance(dim, str) else None
+
+    async def _route_steps(self, player_id: str, steps: list) -> list:
+        """Order world acquisitions by estimated travel from the agent's last telemetry position."""
+        where = self._agent_position(player_id)
+        if where is None:
+            return steps
+        dim, start = where
+        furnace: Optional[Point] = None
+        if any(s.get("item") == "furnace_nearby" for s in steps):
+            try:
+                hit = await self._query(self.storage.nearest_container("furnace", dim, start))
+                furnace = (float(hit[0][1][0]), float(hit[0][1][1]), float(hit[0][1][2])) if hit else None
+            except Exception:
+                furnace = None
+
+        def locate(item: str, near: Point) -> Optional[Point]:
+            if item == "furnace_nearby":
+                return furnace
+            return self.sites.nearest(item, dim, near)
+
+        try:
+            return order_acquisitions(steps, start, locate, self.settings.route_budget_ms)
+        except Exception as exc:
+            logger.warning("route ordering failed for %s: %s", self._player_label(player_id), exc)
+            return steps
+
+    async def _start_plan(
+        self,
+        session: Session,
+        request_id: str,
+        steps: list,
+        goal: str = "",
+        data: Optional[GameData] = None,
+        group: Optional[Tuple[str, str]] = None,
+    ) -> asyncio.Task:
+        """Start dispatching in the background; `group` is (group id, crafter) for a split !get."""
+        player_id = session.player_uuid or "unknown"
+        steps = await self._route_steps(player_id, steps)
+        plan_id = str(uuid.uuid4())
+        plan = {
+            "type": "plan",
+            "plan_id": plan_id,
+            "request_id": request_id,
+            "steps": steps,
+        }
+        await self._send_json(session.websocket, plan)
+        self.plans.begin(plan_id, player_id, request_id, steps, goal)
+        # stream actions in the background to keep the receive loop responsive
+        # Track action_id -> (request_id, step) for basic progress bookkeeping
+        action_index: dict[str, dict] = {}
+        def _on_action_send(aid: str, step: dict) -> None:
+            action_index[aid] = {"request_id": request_id, "step": step}
+
+        dispatcher = Dispatcher(
+            session.websocket,
+            send=functools.partial(self._send_json, session.websocket),
+            player_id=session.player_uuid,
+            state_service=self.state,
+            on_action_send=_on_action_send,
+            scheduler=self.scheduler,
+            tracker=self._tracker_for(session.websocket),
+            on_step_done=functools.partial(self.plans.step_done, plan_id),
+            data=data,
+        )
+        # Store the index on the session object for later lookups
+        setattr(session, "_action_index", action_index)
+        task = asyncio.create_task(dispatcher.run_linear(steps))
+
+        def _journal_outcome(t: asyncio.Task) -> None:
+            # Completed plans leave the journal; stopped ones stay resumable
+            if t.cancelled():
+                self.plans.stopped(plan_id, "interrupted")
+            elif t.exception() is not None or t.result() != "done":
+                self.plans.stopped(plan_id, "failed")
+            else:
+                self.plans.end(plan_id)
+        task.add_done_callback(_journal_outcome)
+        if group is not None:
+            task.add_done_callback(functools.partial(self._on_group_plan_done, group[0], group[1], player_id))
+        if self.link is not None:
+            # A helper delivering to an agent on another shard follows that agent's telemetry
+            watched = {str(st.get("to")) for st in steps if st.get("op") == "deliver" and not self.sessions.for_uuid(str(st.get("to")))}
+            for pid in watched:
+                self.link.notify("watch", player=pid)
+            link = self.link
+
+            def _unwatch(_t: asyncio.Task) -> None:
+                for pid in watched:
+                    link.notify("unwatch", player=pid)
+            task.add_done_callback(_unwatch)
+        # Track task for cancellation
+        try:
+            session.dispatch_tasks.append(task)
+            def _cleanup_task(t: asyncio.Task) -> None:
+                try:
+                    if t in session.dispatch_tasks:
+                        session.dispatch_tasks.remove(t)
+                except Exception:
+                    pass
+            task.add_done_callback(_cleanup_task)
+        except Exception:
+            pass
+        return task
+
+    def _on_group_plan_done(self, group_id: str, crafter_id: str, player_id: str, t: asyncio.Task) -> None:
+        if player_id == crafter_id:
+            self._plan_groups.pop(group_id, None)
+            return
+        if t.cancelled():
+            status = "interrupted"
+        elif t.exception() is not None or t.result() != "done":
+            status = "failed"
+        else:
+            return
+        if group_id in self._plan_groups:
+            self._helper_failed(group_id, player_id, status)
+        elif self.link is not None:
+            # The crafter is on another shard
+            self.link.relay({"kind": "helper_failed", "group": group_id, "helper": player_id, "status": status}, player=crafter_id)
+
+    def _helper_failed(self, group_id: str, helper_id: str, status: str) -> None:
+        """A helper will not deliver: stop the crafter's plan (it stays resumable) and tell the issuer."""
+        grp = self._plan_groups.get(group_id)
+        if grp is None or grp["failed"]:
+            return
+        grp["failed"] = True
+        task = grp["task"]
+        if task is not None and not task.done():
+            task.cancel()
+        session = grp["session"]
+        name = grp["names"].get(helper_id, helper_id)
+        logger.warning("helper %s %s; stopping plan %s for %s", helper_id, status, grp["goal"], self._player_label(session.player_uuid))
+        self._spawn(self._send_json(session.websocket, {
+            "type": "chat_send",
+            "request_id": grp["request_id"],
+            "player_uuid": session.player_uuid or "unknown",
+            "text": f"{self.settings.feedback_prefix}Stopped {grp['goal'] or 'plan'}: helper {name} {status} before delivering. Type !resume to continue.",
+        }))
+
+    async def _resume_plan(self, session: Session, request_id: str) -> None:
+        player_id = session.player_uuid or "unknown"
+        rec = await self._query(self.plans.resumable(player_id))
+        if rec is None:
+            text = "Nothing to resume"
+        else:
+            steps = remaining_steps(rec)
+            text = f"Resuming {rec.goal or 'plan'}: {len(steps)} of {len(rec.steps)} steps left"
+        await self._send_json(session.websocket, {
+            "type": "chat_send",
+            "request_id": request_id,
+            "player_uuid": player_id,
+            "text": f"{self.settings.feedback_prefix}{text}",
+        })
+        if rec is not None:
+            # begin() inside _start_plan replaces the stopped record with the resumed plan
+            await self._start_plan(session, rec.request_id, steps, rec.goal)
+
+    async def _offer_resume(self, session: Session) -> None:
+        try:
+            rec = await self._query(self.plans.resumable(session.player_uuid or "unknown"))
+        except Exception:
+            return
+        if rec is None:
+            return
+        try:
+            await self._send_json(session.websocket, {
+                "type": "chat_send",
+                "request_id": str(uuid.uuid4()),
+                "player_uuid": session.player_uuid or "unknown",
+                "text": f"{self.settings.feedback_prefix}Unfinished plan {rec.goal or rec.plan_id} ({rec.status}, "
+                        f"{len(rec.done)}/{len(rec.steps)} steps done). Type !resume to continue.",
+            })
+        except Exception:
+            logger.debug("failed to send resume offer")
+
+    async def _start_partitioned_plan(
+        self, session: Session, request_id: str, steps: list, group: list[str], goal: str = "", data: Optional[GameData] = None
+    ) -> None:
+        """Share a plan's world acquisitions across a group of agents; the issuer crafts."""
+        crafter_id = session.player_uuid or "unknown"
+        peers: dict[str, Session] = {}
+        for s in self.sessions.resolve([] if group == ["all"] else group):
+            if s.player_uuid and s.player_uuid != crafter_id and s.player_uuid not in peers:
+                peers[s.player_uuid] = s
+        names = {pid: (s.username or pid) for pid, s in peers.items()}
+        crafter = Agent(crafter_id, self.state.get_inventory_counts(crafter_id), len(getattr(session, "dispatch_tasks", [])))
+        helpers = [Agent(pid, self.state.get_inventory_counts(pid), len(s.dispatch_tasks)) for pid, s in peers.items()]
+        remote = await self._remote_helpers(group, crafter_id, set(peers))
+        for pid, uname, entry in remote:
+            # Their load lives on their shard; treat them as idle
+            self.state.mirror(pid, entry)
+            helpers.append(Agent(pid, self.state.get_inventory_counts(pid), 0))
+            names[pid] = uname or pid
+        part = partition_plan(steps, crafter, helpers)
+        group_id = str(uuid.uuid4())
+        grp = {"session": session, "request_id": request_id, "goal": goal, "names": names, "task": None, "failed": False}
+        if len(part.steps) > 1:
+            self._plan_groups[group_id] = grp
+        for pid, agent_steps in part.steps.items():
+            if pid == crafter_id or pid in peers:
+                task = await self._start_plan(
+                    session if pid == crafter_id else peers[pid], request_id, agent_steps, goal, data=data, group=(group_id, crafter_id),
+                )
+                if pid == crafter_id:
+                    grp["task"] = task
+                    if grp["failed"]:
+                        task.cancel()
+            elif self.link is not None:
+                self.link.relay({
+                    "kind": "start_plan", "player": pid, "request_id": request_id, "steps": agent_steps, "goal": goal,
+                    "group": group_id, "crafter": crafter_id,
+                }, player=pid)
+        if len(part.steps) > 1:
+            names[crafter_id] = getattr(session, "username", None) or crafter_id
+            split = "; ".join(
+                f"{item.split(':', 1)[-1]}: " + ", ".join(f"{names[pid]} x{n}" for pid, n in by_agent.items())
+                for item, by_agent in part.shares.items()
+            )
+            text = f"Split across {len(part.steps)} agents ({split}); {names[crafter_id]} crafts"
+        else:
+            text = "No other agents available; running on this agent only"
+        await self._send_json(session.websocket, {
+            "type": "chat_send",
+            "request_id": request_id,
+            "player_uuid": crafter_id,
+            "text": f"{self.settings.feedback_prefix}{text}",
+        })
+
+    async def _remote_helpers(self, group: list[str], crafter_id: str, local: set[str]) -> list:
+        """(player, username, last entry) for group members hosted by other shards."""
+        if self.link is None:
+            return []
+        out = []
+        try:
+            for pid, uname in await self.link.call("who"):
+                if pid == crafter_id or pid in local:
+                    continue
+                if group != ["all"] and pid not in group and uname not in group:
+                    continue
+                entry = await self.link.call("player_state", player=pid)
+                out.append((pid, uname, entry or {"ts": "", "state": {}}))
+        except Exception as exc:
+            logger.warning("could not list agents on other shards: %s", exc)
+        return out
+
+    async def _find_item_text(self, player_id: str, item_id: str, k: int = 5) -> str:
+        """Rank known containers holding an item by distance from the agent's last telemetry pos."""
+        total = await self._query(self.storage.count_item(item_id))
+        if total <= 0:
+            return f"No known containers hold {item_id}"
+        ps = self.state.get_player_state(player_id)
+        st = (ps or {}).get("state", {})
+        pos = st.get("pos")
+        dim = st.get("dim")
+        lines = [f"{item_id}: {total} in storage"]
+        if isinstance(pos, (list, tuple)) and len(pos) == 3 and isinstance(dim, str):
+            try:
+                origin = (float(pos[0]), float(pos[1]), float(pos[2]))
+                hits = await self._query(self.storage.nearest_with_item(item_id, dim, origin, k))
+            except Exception:
+                hits = []
+            for (_dim, (x, y, z)), cnt, dist in hits:
+                lines.append(f"{x} {y} {z} - {cnt} ({dist:.0f}m)")
+            if not hits:
+                lines.append(f"none in {dim}")
+            return "\n".join(lines)
+        # No position yet: fall back to the largest holders
+        for (cdim, (x, y, z)), cnt in await self._query(self.storage.top_containers(item_id, k)):
+            lines.append(f"{x} {y} {z} {cdim} - {cnt}")
+        return "\n".join(lines)
+
     async def _on_telemetry(self, session: Session, msg: dict) -> None:
         player_id = session.player_uuid or "unknown"
         logger.debug("telemetry_update from %s: %s", player_id, msg.get("state", {}))
-        await self.state.update_telemetry(player_id, str(msg.get("ts", "")), msg.get("state", {}))
+        seq = msg.get("seq")
+        session.resync_pending = False
+        uname = (msg.get("state") or {}).get("username")
+        if isinstance(uname, str) and uname != session.username:
+            self.sessions.set_username(session, uname)
+            self._announce(session)
+        before = self._inventory_before(player_id)
+        await self.state.update_telemetry(
+            player_id,
+            str(msg.get("ts", "")),
+            msg.get("state", {}),
+            seq=int(seq) if isinstance(seq, int) else None,
+        )
+        self._observe_sites(player_id, before)
+
+    def _inventory_before(self, player_id: str) -> Optional[Mapping[str, int]]:
+        # None until telemetry has carried an inventory (the handshake stores only the
+        # username), so the initial inventory is not mistaken for gains
+        entry = self.state.get_player_state(player_id)
+        if entry is None or "inventory" not in (entry.get("state") or {}):
+            return None
+        return self.state.get_inventory_counts(player_id)
+
+    def _observe_sites(self, player_id: str, before: Optional[Mapping[str, int]]) -> None:
+        # Counts are immutable per entry, so `before` still holds the previous update's view
+        after = self.state.get_inventory_counts(player_id)
+        if before is None or after is before:
+            return
+        where = self._agent_position(player_id)
+        if where is not None:
+            self.sites.observe(where[0], where[1], before, after)
+
+    async def _on_telemetry_delta(self, session: Session, msg: dict) -> None:
+        player_id = session.player_uuid or "unknown"
+        seq, base_seq = msg.get("seq"), msg.get("base_seq")
+        changed = msg.get("changed") or {}
+        removed = msg.get("removed") or []
+        inventory = msg.get("inventory") or []
+        if not isinstance(seq, int) or not isinstance(base_seq, int) or not isinstance(changed, dict):
+            logger.debug("invalid telemetry_delta from %s ignored", player_id)
+            return
+        if isinstance(changed.get("username"), str) and changed["username"] != session.username:
+            self.sessions.set_username(session, changed["username"])
+            self._announce(session)
+        before = self._inventory_before(player_id)
+        applied = await self.state.apply_telemetry_delta(
+            player_id,
+            str(msg.get("ts", "")),
+            seq,
+            base_seq,
+            changed,
+            removed=[str(k) for k in removed if isinstance(k, str)],
+            inventory=[slot for slot in inventory if isinstance(slot, dict)],
+        )
+        if applied:
+            self._observe_sites(player_id, before)
+        if applied:
+            return
+        now = time.monotonic()
+        if session.resync_pending and now - session.resync_requested_at < RESYNC_RETRY_S:
+            return
+        # Gap (or no base yet, e.g. after a backend restart): ask for a full snapshot,
+        # again if the last request went unanswered (lost, or the client ignored it)
+        logger.info("telemetry gap from %s at base_seq=%s; requesting resync", self._player_label(player_id), base_seq)
+        session.resync_pending = True
+        session.resync_requested_at = now
+        try:
+            queued = await self._send_json(session.websocket, {"type": "telemetry_resync", "player_uuid": player_id})
+        except Exception:
+            queued = False
+        if not queued:
+            session.resync_pending = False
 
     async def _on_state_request(self, session: Session, msg: dict) -> None:
         req_id: str = msg.get("request_id", str(uuid.uuid4()))
@@ -507,8 +986,14 @@ class BackendServer:
             "state": payload,
         })
 
+    def _tracker_for(self, websocket: WebSocketServerProtocol) -> Optional[ProgressTracker]:
+        # Acks arrive on the real session, also for commands evaluated on a peer's behalf
+        real = self.sessions.get(websocket)
+        return real.progress if real is not None else None
+
     async def _on_progress(self, session: Session, msg: dict) -> None:
         player_id = session.player_uuid or "unknown"
+        session.progress.resolve(str(msg.get("action_id")), msg.get("status"), msg.get("note"))
         logger.info(
             "progress_update from %s: action_id=%s status=%s note=%s",
             self._player_label(player_id),
@@ -533,35 +1018,105 @@ class BackendServer:
         except Exception:
             pass
 
-    async def _multicast(self, targets: list[str], message: dict) -> None:
-        # Targets can be UUIDs or usernames; resolve usernames using last telemetry
-        if not targets:
-            uuids = [s.player_uuid or "unknown" for s in self.sessions.values()]
-        else:
-            # Build uuid set by mapping names to uuids where applicable
-            uuids = []
-            name_to_uuid = {}
-            try:
-                for uuid_key, state in (self.state._last_telemetry or {}).items():  # type: ignore[attr-defined]
-                    uname = state.get("state", {}).get("username")
-                    if isinstance(uname, str) and uname:
-                        name_to_uuid[uname] = uuid_key
-            except Exception:
-                pass
-            for t in targets:
-                if t in name_to_uuid:
-                    uuids.append(name_to_uuid[t])
-                else:
-                    uuids.append(t)
-        for s in list(self.sessions.values()):
-            if (s.player_uuid or "unknown") in uuids:
-                try:
-                    await self._send_json(s.websocket, message)
-                except Exception:
-                    continue
+    async def _multicast(self, targets: list[str], message: dict, *, relay: bool = True) -> None:
+        """Queue one message for many sessions; each codec encodes it once.
+
+        Targets can be uuids or usernames (empty means everyone). Recipients share an
+        encode cache, so the first writer to send it in a codec encodes for the rest.
+        Sharded workers also relay it to the other shards, which resolve the same targets.
+        """
+        if relay and self.link is not None:
+            self.link.relay({"kind": "fanout", "targets": targets, "msg": message})
+        recipients = self.sessions.resolve(targets)
+        shared: dict = {}
+        for s in recipients:
+            self._enqueue(s, message, shared)
+
+    async def _send_json(self, websocket: WebSocketServerProtocol, obj: dict) -> bool:
+        # Name predates codecs and queues: enqueues for the session's writer, which encodes
+        # with whatever the session negotiated. Never waits on the client's socket.
+        # False if the message was dropped (outbound overflow); callers tracking state check it.
+        session = self.sessions.get(websocket)
+        if session is None or session.outbound is None:
+            await websocket.send(JSON.encode(obj))
+            metrics.MESSAGES_SENT.inc(metrics.message_type(obj.get("type")))
+            metrics.FRAMES_SENT.inc(JSON.name)
+            return True
+        return self._enqueue(session, obj)
+
+    def _enqueue(self, session: Session, obj: dict, shared: Optional[dict] = None) -> bool:
+        q = session.outbound
+        if q is None:
+            return False
+        queued = q.put(obj, shared)
+        if not queued:
+            logger.debug("outbound queue full for %s; dropped %s", self._player_label(session.player_uuid), obj.get("type"))
+        metrics.OUTBOUND_QUEUE_DEPTH.set(len(q), session.player_uuid or "unknown")
+        return queued
 
-    async def _send_json(self, websocket: WebSocketServerProtocol, obj: dict) -> None:
-        await websocket.send(json.dumps(obj, separators=(",", ":")))
+    async def _send_direct(self, session: Session, obj: dict) -> None:
+        frame = session.codec.encode(obj)
+        await session.websocket.send(frame)
+        if self.recorder is not None:
+            self.recorder.outbound(session.trace_id, frame)
+        metrics.MESSAGES_SENT.inc(metrics.message_type(obj.get("type")))
+        metrics.FRAMES_SENT.inc(session.codec.name)
+
+    async def _writer(self, session: Session) -> None:
+        """Drain the session's outbound queue; the only coroutine that writes to its socket.
+
+        Batching sessions wait `batch_window_ms` after the first queued message and send
+        everything queued by then as one frame. Under the "close" overflow policy a full
+        queue closes the connection (1013, slow_consumer) instead of growing.
+        """
+        q = session.outbound
+        if q is None:
+            return
+        ws = session.websocket
+        try:
+            while True:
+                await q.ready.wait()
+                if session.batch and not q.overflowed:
+                    await asyncio.sleep(self.settings.batch_window_ms / 1000.0)
+                q.ready.clear()
+                if q.overflowed:
+                    metrics.OUTBOUND_CLOSED.inc()
+                    logger.warning("closing slow consumer %s: outbound queue full", self._player_label(session.player_uuid))
+                    await ws.close(code=1013, reason="slow_consumer")
+                    return
+                while q.items:
+                    codec = session.codec
+                    if session.batch and len(q.items) > 1:
+                        msgs = [m for m, _ in q.items]
+                        q.items.clear()
+                        frame = codec.encode({"type": "batch", "messages": msgs})
+                        metrics.BATCH_SIZE.observe(len(msgs))
+                    else:
+                        msg, shared = q.items.popleft()
+                        msgs = [msg]
+                        if shared is None:
+                            frame = codec.encode(msg)
+                        else:
+                            frame = shared.get(codec.name)
+                            if frame is None:
+                                frame = shared[codec.name] = codec.encode(msg)
+                    metrics.OUTBOUND_QUEUE_DEPTH.set(len(q), session.player_uuid or "unknown")
+                    try:
+                        await ws.send(frame)
+                    except websockets.ConnectionClosed:
+                        return
+                    except Exception as exc:
+                        logger.debug("send to %s failed: %s", self._player_label(session.player_uuid), exc)
+                        continue
+                    if self.recorder is not None:
+                        self.recorder.outbound(session.trace_id, frame)
+                    metrics.FRAMES_SENT.inc(codec.name)
+                    for m in msgs:
+                        metrics.MESSAGES_SENT.inc(metrics.message_type(m.get("type")))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("writer for %s stopped: %s", self._player_label(session.player_uuid), exc)
 
     async def _eval_command_as_target(self, target_player_uuid: str, command_text: str) -> None:
         """Evaluate a '!' command as if issued by the target agent.
@@ -570,13 +1125,10 @@ class BackendServer:
         """
         # Build a fake message as if from the target and route through command handler pieces
         # Find the session websocket for the target so responses route to that client
-        target_ws: Optional[WebSocketServerProtocol] = None
-        for s in self.sessions.values():
-            if (s.player_uuid or "unknown") == target_player_uuid:
-                target_ws = s.websocket
-                break
-        if target_ws is None:
+        peers = self.sessions.for_uuid(target_player_uuid)
+        if not peers:
             return
+        target_ws: WebSocketServerProtocol = peers[0].websocket
         # Parse and handle like _on_command would, but scoped to the target
         intent = parse_command_text(command_text)
         if not intent:
@@ -600,9 +1152,14 @@ class BackendServer:
                 self.player_uuid = pid
         await self._on_command(_Sess(target_ws, target_player_uuid), msg)
 
-    async def _cancel_all_tasks_and_broadcast_stop(self) -> None:
+    async def _cancel_all_tasks_and_broadcast_stop(self, *, relay: bool = True) -> None:
+        if relay and self.link is not None:
+            # Other shards cancel their own dispatchers and stop their own agents
+            self.link.relay({"kind": "stop"})
+        # Everything stops, so cancelled helpers must not report their split plans as failed
+        self._plan_groups.clear()
         # Cancel all tracked dispatcher tasks for every session
-        for s in list(self.sessions.values()):
+        for s in self.sessions:
             try:
                 for t in list(s.dispatch_tasks):
                     t.cancel()
@@ -616,7 +1173,7 @@ class BackendServer:
             "mode": "mod_native",
             "op": "cancel",
         }
-        await self._multicast([], cancel_msg)
+        await self._multicast([], cancel_msg, relay=False)
         # Then broadcast Baritone stop to all agents
         stop_msg = {
             "type": "action_request",
@@ -625,13 +1182,62 @@ class BackendServer:
             "op": "chat",
             "chat_text": "#stop",
         }
-        await self._multicast([], stop_msg)
+        await self._multicast([], stop_msg, relay=False)
 
+    async def _eval_all(self, command_text: str) -> None:
+        for s in list(self.sessions):
+            await self._eval_command_as_target(s.player_uuid or "unknown", command_text)
 
+    # --- sharding (backend/coordinator.py) ------------------------------------
 
-def main() -> None:
-    server = BackendServer()
+    @staticmethod
+    async def _query(value):
+        """Result of a storage/plan-journal query; coordinator-backed ones are coroutines."""
+        return await value if inspect.isawaitable(value) else value
 
+    def _announce(self, session: Session, online: bool = True) -> None:
+        if self.link is not None and session.player_uuid:
+            self.link.notify("presence", player=session.player_uuid, username=session.username, online=online)
+
+    async def _on_shard_message(self, peer: Peer, method: str, params: dict) -> None:
+        if method == "mirror":
+            self.state.mirror(str(params["player"]), params["entry"])
+            return
+        if method != "relay":
+            raise ValueError(f"unknown method {method}")
+        msg = params.get("msg") or {}
+        kind = msg.get("kind")
+        if kind == "fanout":
+            await self._multicast(list(msg.get("targets") or []), msg.get("msg") or {}, relay=False)
+        elif kind == "stop":
+            await self._cancel_all_tasks_and_broadcast_stop(relay=False)
+        # These may query the coordinator, whose reply this read loop must stay free to receive
+        elif kind == "eval":
+            self._spawn(self._eval_command_as_target(str(msg.get("player")), str(msg.get("text", ""))))
+        elif kind == "eval_all":
+            self._spawn(self._eval_all(str(msg.get("text", ""))))
+        elif kind == "start_plan":
+            pid = str(msg.get("player"))
+            peers = self.sessions.for_uuid(pid)
+            group = (str(msg["group"]), str(msg["crafter"])) if msg.get("group") else None
+            if peers:
+                self._spawn(self._start_plan(
+                    peers[0], str(msg.get("request_id", "")), list(msg.get("steps") or []), str(msg.get("goal", "")), group=group,
+                ))
+            elif group is not None and self.link is not None:
+                # Left since the split was made: it will never deliver
+                self.link.relay({"kind": "helper_failed", "group": group[0], "helper": pid, "status": "disconnected"}, player=group[1])
+        elif kind == "helper_failed":
+            self._helper_failed(str(msg.get("group")), str(msg.get("helper")), str(msg.get("status")))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._relay_tasks.add(task)
+        task.add_done_callback(self._relay_tasks.discard)
+
+
+
+def _run(server: BackendServer) -> None:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
@@ -653,5 +1259,20 @@ def main() -> None:
         loop.close()
 
 
+def main() -> None:
+    settings = load_settings()
+    if settings.shard_workers > 1:
+        if run_sharded(settings):
+            return
+        configure_logging(settings.log_level)
+        logger.warning("shard_workers=%d needs SO_REUSEPORT, which this platform lacks; running one process", settings.shard_workers)
+    _run(BackendServer())
+
+
+def worker_main(index: int, coordinator_port: int) -> None:
+    """Entry point of one shard worker process (spawned by backend.coordinator.run_sharded)."""
+    _run(BackendServer(ShardLink(index, coordinator_port)))
+
+
 if __name__ == "__main__":
     main()
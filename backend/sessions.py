@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+"""Connected client sessions and their lookup indexes.
+
+Purpose: One place that knows which sessions are connected and how to find
+them by socket, player uuid or username, so fan-out and targeted commands never
+scan telemetry or every session.
+
+How: `SessionRegistry` keeps the socket map plus uuid -> sessions and
+username -> uuid indexes. The server calls `bind` when a session learns its
+uuid (handshake, `auto` adoption) and `set_username` when a handshake or
+telemetry names the player; `remove` on disconnect drops every index entry.
+
+Outbound: each session owns a bounded `OutboundQueue` drained by one writer
+task, so handlers never await a client's socket. Superseded kinds
+(`settings_update`, `telemetry_resync`, ...) replace any queued copy; on
+overflow the configured policy drops the oldest message, drops the new one, or
+closes the connection. The drop policies never drop control messages
+(`action_request`, `plan`, `settings_update`, `telemetry_resync`). A lost
+action_request would stall an ack-mode plan until its timeout, and a lost
+resync would leave telemetry deltas ignored. They evict the oldest other
+message instead. If nothing else is queued, a control message goes over the
+cap. `put` returns False when the message was not queued.
+
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from websockets.server import WebSocketServerProtocol
+
+from . import metrics
+from .codec import JSON, Codec, Frame
+from .progress import ProgressTracker
+
+
+# Only the newest queued copy of these matters
+SUPERSEDED_TYPES = frozenset({"settings_update", "settings_broadcast", "telemetry_resync"})
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "close")
+# Never dropped on overflow: plans depend on every one of these arriving
+CONTROL_TYPES = frozenset({"action_request", "plan", "settings_update", "telemetry_resync"})
+
+# Queued message plus an encode cache shared by every recipient of a fan-out (codec name -> frame)
+Outgoing = Tuple[dict, Optional[Dict[str, Frame]]]
+
+
+class OutboundQueue:
+    """Bounded send queue for one session; `put` never blocks."""
+
+    def __init__(self, maxlen: int, policy: str) -> None:
+        self.maxlen = max(int(maxlen), 1)
+        self.policy = policy if policy in OVERFLOW_POLICIES else "drop_oldest"
+        self.items: Deque[Outgoing] = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.overflowed = False  # set once under the "close" policy; the writer closes the socket
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, msg: dict, shared: Optional[Dict[str, Frame]] = None) -> bool:
+        """Queue a message; False if it (or, under "close", the session) was dropped."""
+        if self.overflowed:
+            return False
+        mtype = msg.get("type")
+        if mtype in SUPERSEDED_TYPES:
+            for i, (queued, _) in enumerate(self.items):
+                if queued.get("type") == mtype:
+                    del self.items[i]
+                    self.dropped += 1
+                    metrics.OUTBOUND_DROPPED.inc("superseded")
+                    break
+        if len(self.items) >= self.maxlen:
+            if self.policy == "close":
+                metrics.OUTBOUND_DROPPED.inc("overflow")
+                self.dropped += 1
+                self.overflowed = True
+                self.items.clear()
+                self.ready.set()
+                return False
+            control = mtype in CONTROL_TYPES
+            victim = self._oldest_droppable() if control or self.policy == "drop_oldest" else None
+            if victim is None and not control:
+                metrics.OUTBOUND_DROPPED.inc("overflow")
+                self.dropped += 1
+                return False
+            if victim is not None:
+                del self.items[victim]
+                metrics.OUTBOUND_DROPPED.inc("overflow")
+                self.dropped += 1
+        self.items.append((msg, shared))
+        self.ready.set()
+        return True
+
+    def _oldest_droppable(self) -> Optional[int]:
+        for i, (queued, _) in enumerate(self.items):
+            if queued.get("type") not in CONTROL_TYPES:
+                return i
+        return None
+
+
+@dataclass(eq=False)
+class Session:
+    player_uuid: Optional[str]
+    websocket: WebSocketServerProtocol
+    last_eta_ms: Optional[int] = None
+    dispatch_tasks: list[asyncio.Task] = field(default_factory=list)
+    # action_id -> future for ack-mode dispatchers, resolved by progress_update
+    progress: ProgressTracker = field(default_factory=ProgressTracker)
+    # Negotiated at handshake: agent sends telemetry_delta after a full telemetry_update
+    telemetry_delta: bool = False
+    resync_pending: bool = False
+    # monotonic time of the last telemetry_resync; a gap past RESYNC_RETRY_S asks again
+    resync_requested_at: float = 0.0
+    # Outbound frame codec; switched from JSON right after the handshake settings_update
+    codec: Codec = JSON
+    # Negotiated at handshake: outbound messages queued within batch_window_ms go out as one batch frame
+    batch: bool = False
+    outbound: Optional[OutboundQueue] = None
+    writer_task: Optional[asyncio.Task] = None
+    username: Optional[str] = None
+    # Session number in the traffic recording (backend/traffic.py), when recording
+    trace_id: int = 0
+    # Client settings set with !settings; a config reload does not override them
+    settings_overrides: Dict[str, Any] = field(default_factory=dict)
+
+
+class SessionRegistry:
+    def __init__(self) -> None:
+        self._by_socket: Dict[WebSocketServerProtocol, Session] = {}
+        self._by_uuid: Dict[str, Set[Session]] = {}
+        self._uuid_by_name: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_socket)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self._by_socket.values()))
+
+    def add(self, session: Session) -> None:
+        self._by_socket[session.websocket] = session
+        if session.player_uuid:
+            self._by_uuid.setdefault(session.player_uuid, set()).add(session)
+
+    def get(self, websocket: WebSocketServerProtocol) -> Optional[Session]:
+        return self._by_socket.get(websocket)
+
+    def remove(self, websocket: WebSocketServerProtocol) -> Optional[Session]:
+        session = self._by_socket.pop(websocket, None)
+        if session is None:
+            return None
+        self._unbind(session)
+        return session
+
+    def bind(self, session: Session, player_uuid: Optional[str]) -> None:
+        """Set (or change) the session's uuid and keep the uuid/username indexes in step."""
+        self._unbind(session)
+        session.player_uuid = player_uuid
+        if player_uuid:
+            self._by_uuid.setdefault(player_uuid, set()).add(session)
+            if session.username:
+                self._uuid_by_name[session.username] = player_uuid
+
+    def set_username(self, session: Session, username: str) -> None:
+        if not username or username == session.username:
+            return
+        if session.username and self._uuid_by_name.get(session.username) == session.player_uuid:
+            self._uuid_by_name.pop(session.username, None)
+        session.username = username
+        if session.player_uuid:
+            self._uuid_by_name[username] = session.player_uuid
+
+    def _unbind(self, session: Session) -> None:
+        pid = session.player_uuid
+        if not pid:
+            return
+        peers = self._by_uuid.get(pid)
+        if peers is not None:
+            peers.discard(session)
+            if not peers:
+                self._by_uuid.pop(pid, None)
+        if session.username and self._uuid_by_name.get(session.username) == pid and pid not in self._by_uuid:
+            self._uuid_by_name.pop(session.username, None)
+
+    def for_uuid(self, player_uuid: str) -> List[Session]:
+        return list(self._by_uuid.get(player_uuid, ()))
+
+    def resolve(self, targets: Iterable[str]) -> List[Session]:
+        """Connected sessions for uuids or usernames; an empty target list means everyone."""
+        targets = list(targets)
+        if not targets:
+            return list(self._by_socket.values())
+        out: Dict[int, Session] = {}
+        for t in targets:
+            pid = self._uuid_by_name.get(t, t)
+            for s in self._by_uuid.get(pid, ()):
+                out[id(s)] = s
+        return list(out.values())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+"""Worker-side view of the shard coordinator.
+
+Purpose: Let a `BackendServer` worker use coordinator-owned services with the
+same method names as the local ones (`StorageCatalog`, `PlanJournal`), so the
+server code stays the same in both modes.
+
+How: `ShardLink` holds the IPC peer (`backend/ipc.py`). Updates are sent as
+notifications and never wait. Queries are calls, and their proxy methods are
+coroutines. The server awaits a query's result only when it is awaitable
+(`BackendServer._query`), so the local objects need no async wrappers.
+
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .ipc import Peer
+from .plan_journal import PlanRecord
+
+
+logger = logging.getLogger("automc.shard")
+
+
+class ShardLink:
+    def __init__(self, index: int, port: int) -> None:
+        self.index = index
+        self.port = port
+        self.peer: Optional[Peer] = None
+        self._serve_task: Optional[asyncio.Task] = None
+
+    async def connect(self, handler: Callable[[Peer, str, Dict[str, Any]], Awaitable[Any]]) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.peer = Peer(reader, writer, handler)
+        self._serve_task = asyncio.create_task(self.peer.serve())
+
+    async def close(self) -> None:
+        if self.peer is not None:
+            await self.peer.close()
+        if self._serve_task is not None:
+            self._serve_task.cancel()
+
+    def notify(self, method: str, **params: Any) -> None:
+        if self.peer is not None:
+            self.peer.notify(method, **params)
+
+    async def call(self, method: str, **params: Any) -> Any:
+        assert self.peer is not None
+        return await self.peer.call(method, **params)
+
+    async def push_telemetry(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        """StateService sink: the coordinator persists the worker's dirty entries."""
+        self.notify("telemetry", batch=batch)
+
+    def relay(self, msg: Dict[str, Any], player: Optional[str] = None) -> None:
+        self.notify("relay", msg=msg, player=player)
+
+
+class RemoteStorage:
+    """StorageCatalog stand-in: updates are forwarded, queries are coroutines."""
+
+    def __init__(self, link: ShardLink) -> None:
+        self._link = link
+
+    def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def handle_snapshot(self, player_id: str, container: Dict[str, Any]) -> None:
+        self._link.notify("storage_snapshot", player=player_id, container=container)
+
+    def handle_diff(self, player_id: str, diff: Dict[str, Any]) -> None:
+        self._link.notify("storage_diff", player=player_id, diff=diff)
+
+    async def _query(self, query: str, *args: Any) -> Any:
+        return await self._link.call("storage", query=query, args=list(args))
+
+    async def count_item(self, item_id: str) -> int:
+        return int(await self._query("count_item", item_id))
+
+    async def nearest_with_item(self, item_id: str, dim: str, pos: Tuple[float, float, float], k: int = 5) -> List[Any]:
+        return await self._query("nearest_with_item", item_id, dim, list(pos), k)
+
+    async def top_containers(self, item_id: str, n: int) -> List[Any]:
+        return await self._query("top_containers", item_id, n)
+
+    async def nearest_container(self, kind: str, dim: str, pos: Tuple[float, float, float]) -> Optional[Any]:
+        return await self._query("nearest_container", kind, dim, list(pos))
+
+
+class RemotePlans:
+    """PlanJournal stand-in: lifecycle events are forwarded, `resumable` is a coroutine."""
+
+    def __init__(self, link: ShardLink) -> None:
+        self._link = link
+
+    def load(self) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _event(self, event: str, *args: Any) -> None:
+        self._link.notify("plan", event=event, args=list(args))
+
+    def begin(self, plan_id: str, player_id: str, request_id: str, steps: List[Dict[str, Any]], goal: str = "") -> None:
+        self._event("begin", plan_id, player_id, request_id, steps, goal)
+
+    def step_done(self, plan_id: str, index: int) -> None:
+        self._event("step_done", plan_id, index)
+
+    def stopped(self, plan_id: str, status: str) -> None:
+        self._event("stopped", plan_id, status)
+
+    def end(self, plan_id: str) -> None:
+        self._event("end", plan_id)
+
+    async def resumable(self, player_id: str) -> Optional[PlanRecord]:
+        data = await self._link.call("plan_resumable", player=player_id)
+        if not data:
+            return None
+        return PlanRecord(**{**data, "done": set(data.get("done") or [])})
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+"""Compiled, immutable skill graph for the planner.
+
+Purpose: Turn the validated `skill_graph.json` mapping into a frozen structure
+built once per data version: interned integer item ids, per-item recipe tables
+with pre-resolved consume/require/obtain, a topological order (inputs before
+outputs), and cycle detection at load time. On top of it, a bill of materials
+holds each craftable item's closure down to world-acquired leaves so raw needs
+and "max craftable now" are a single pass over that closure.
+
+"""
+
+from dataclasses import dataclass
+from fractions import Fraction
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Recipe:
+    item: int
+    op: str  # "craft" | "smelt"
+    consume: Tuple[Tuple[int, int], ...]  # (item id, qty per craft)
+    require: Tuple[Tuple[str, int], ...]  # (context name, qty); names go straight into steps
+    obtain: int  # units of `item` produced per craft
+
+
+@dataclass(frozen=True)
+class SkillGraph:
+    names: Tuple[str, ...]
+    ids: Mapping[str, int]
+    recipes: Tuple[Optional[Recipe], ...]  # indexed by item id; None for leaves
+    topo: Tuple[int, ...]  # every item after all of its consume inputs
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self.ids.get(name)
+
+    def recipe_for(self, name: str) -> Optional[Recipe]:
+        i = self.ids.get(name)
+        return None if i is None else self.recipes[i]
+
+    def has_recipe(self, name: str) -> bool:
+        return self.recipe_for(name) is not None
+
+
+def compile_skill_graph(skills: Dict[str, Dict[str, Any]]) -> SkillGraph:
+    """Compile validated skills (see `data_files.load_skill_graph`) into a SkillGraph.
+
+    Raises ValueError if the consume edges contain a cycle.
+    """
+    names: List[str] = []
+    ids: Dict[str, int] = {}
+
+    def intern(name: str) -> int:
+        i = ids.get(name)
+        if i is None:
+            i = len(names)
+            ids[name] = i
+            names.append(name)
+        return i
+
+    # Intern recipe outputs first so their ids are stable across inventories
+    for rid in skills:
+        intern(rid)
+    for skill in skills.values():
+        for dep in skill["consume"]:
+            intern(dep)
+
+    recipes: List[Optional[Recipe]] = [None] * len(names)
+    for rid, skill in skills.items():
+        i = ids[rid]
+        recipes[i] = Recipe(
+            item=i,
+            op="craft" if skill["op"] == "craft" else "smelt",
+            consume=tuple((ids[dep], int(qty)) for dep, qty in skill["consume"].items()),
+            require=tuple((str(req), int(qty)) for req, qty in skill["require"].items()),
+            obtain=int(skill["obtain"].get(rid, 1)),
+        )
+
+    # Iterative DFS: post-order gives the topological order; grey nodes on the stack expose cycles
+    WHITE, GREY, BLACK = 0, 1, 2
+    color = [WHITE] * len(names)
+    topo: List[int] = []
+    for root in range(len(names)):
+        if color[root] != WHITE:
+            continue
+        stack: List[Tuple[int, int]] = [(root, 0)]
+        color[root] = GREY
+        while stack:
+            node, edge = stack[-1]
+            rec = recipes[node]
+            deps = rec.consume if rec is not None else ()
+            if edge < len(deps):
+                stack[-1] = (node, edge + 1)
+                dep = deps[edge][0]
+                if color[dep] == GREY:
+                    path = [names[n] for n, _ in stack]
+                    cycle = path[path.index(names[dep]):] + [names[dep]]
+                    raise ValueError(f"skill_graph.json has a consume cycle: {' -> '.join(cycle)}")
+                if color[dep] == WHITE:
+                    color[dep] = GREY
+                    stack.append((dep, 0))
+                continue
+            color[node] = BLACK
+            topo.append(node)
+            stack.pop()
+
+    return SkillGraph(
+        names=tuple(names),
+        ids=MappingProxyType(ids),
+        recipes=tuple(recipes),
+        topo=tuple(topo),
+    )
+
+
+@dataclass(frozen=True)
+class Closure:
+    """Everything one unit of an item transitively needs, outputs before inputs.
+
+    Local index 0 is the item itself; `inputs[j]` lists (local index, qty per
+    craft) for node j, and leaves (world-acquired or recipe-less) have none.
+    """
+
+    nodes: Tuple[int, ...]
+    obtain: Tuple[int, ...]  # per-craft yield; 0 for leaves
+    inputs: Tuple[Tuple[Tuple[int, int], ...], ...]
+    leaves: Tuple[int, ...]  # local indices of leaves
+    contexts: Tuple[str, ...]  # require placeholders needed anywhere in the closure
+    unit: Tuple[Fraction, ...]  # per local node: amount per unit of the root, ignoring batch rounding
+    one_cost: Tuple[Tuple[Tuple[int, int], ...], ...]  # per local node: (leaf index, amount) to make one of it
+
+
+@dataclass(frozen=True)
+class BillOfMaterials:
+    graph: SkillGraph
+    closures: Mapping[int, Closure]  # craftable item id -> closure
+
+    def closure_for(self, name: str) -> Optional[Closure]:
+        i = self.graph.ids.get(name)
+        return None if i is None else self.closures.get(i)
+
+
+def _demand(closure: Closure, count: int, have: Optional[List[int]] = None) -> Optional[List[int]]:
+    """Propagate demand for `count` units through the closure; None if `have` can't cover a leaf."""
+    demand = [0] * len(closure.nodes)
+    demand[0] = count
+    obtain = closure.obtain
+    inputs = closure.inputs
+    for j in range(len(demand)):
+        need = demand[j]
+        if have is not None and j > 0:
+            need = need - have[j] if need > have[j] else 0
+            demand[j] = need
+        if need <= 0:
+            continue
+        per = obtain[j]
+        if per == 0:
+            if have is not None:
+                return None
+            continue
+        crafts = (need + per - 1) // per
+        for k, qty in inputs[j]:
+            demand[k] += crafts * qty
+    return demand
+
+
+def compile_bill_of_materials(graph: SkillGraph, world_items: List[str]) -> BillOfMaterials:
+    """Precompute the per-unit closure of every craftable item down to world leaves."""
+    world = {graph.ids[name] for name in world_items if name in graph.ids}
+    rank = {node: pos for pos, node in enumerate(graph.topo)}
+
+    def is_leaf(i: int) -> bool:
+        return graph.recipes[i] is None or i in world
+
+    closures: Dict[int, Closure] = {}
+    # Topological order: every sub-closure exists before the closures that contain it
+    for root in graph.topo:
+        if is_leaf(root):
+            continue
+        reach = {root}
+        frontier = [root]
+        contexts: Dict[str, None] = {}
+        while frontier:
+            node = frontier.pop()
+            rec = graph.recipes[node]
+            if is_leaf(node) or rec is None:
+                continue
+            for req, _qty in rec.require:
+                contexts[req] = None
+            for dep, _qty in rec.consume:
+                if dep not in reach:
+                    reach.add(dep)
+                    frontier.append(dep)
+        # Reverse topological order puts every output ahead of its inputs (root first)
+        nodes = tuple(sorted(reach, key=lambda n: -rank[n]))
+        local = {node: j for j, node in enumerate(nodes)}
+        obtain: List[int] = []
+        inputs: List[Tuple[Tuple[int, int], ...]] = []
+        for node in nodes:
+            rec = graph.recipes[node]
+            if is_leaf(node) or rec is None:
+                obtain.append(0)
+                inputs.append(())
+            else:
+                obtain.append(rec.obtain)
+                inputs.append(tuple((local[dep], qty) for dep, qty in rec.consume))
+        leaves = tuple(j for j, node in enumerate(nodes) if is_leaf(node))
+        unit = [Fraction(0)] * len(nodes)
+        unit[0] = Fraction(1)
+        for j in range(len(nodes)):
+            if obtain[j]:
+                for k, qty in inputs[j]:
+                    unit[k] += unit[j] * qty / obtain[j]
+        closure = Closure(
+            nodes=nodes,
+            obtain=tuple(obtain),
+            inputs=tuple(inputs),
+            leaves=leaves,
+            contexts=tuple(contexts),
+            unit=tuple(unit),
+            one_cost=(),
+        )
+        one = _demand(closure, 1) or []
+        one_cost: List[Tuple[Tuple[int, int], ...]] = []
+        for j, node in enumerate(nodes):
+            if j == 0:
+                one_cost.append(tuple((l, one[l]) for l in leaves if one[l] > 0))
+            elif is_leaf(node):
+                one_cost.append(((j, 1),))
+            else:
+                sub = closures[node]
+                one_cost.append(tuple((local[sub.nodes[l]], amt) for l, amt in sub.one_cost[0]))
+        closures[root] = Closure(
+            nodes=nodes,
+            obtain=closure.obtain,
+            inputs=closure.inputs,
+            leaves=leaves,
+            contexts=closure.contexts,
+            unit=closure.unit,
+            one_cost=tuple(one_cost),
+        )
+    return BillOfMaterials(graph=graph, closures=MappingProxyType(closures))
+
+
+def raw_requirements(bom: BillOfMaterials, item: str, count: int) -> Dict[str, int]:
+    """World leaves (and context placeholders, count 1) needed to make `count` of `item` from scratch."""
+    closure = bom.closure_for(item)
+    if closure is None:
+        return {item: int(count)} if count > 0 else {}
+    if count <= 0:
+        return {}
+    demand = _demand(closure, int(count)) or []
+    names = bom.graph.names
+    out = {names[closure.nodes[j]]: demand[j] for j in closure.leaves if demand[j] > 0}
+    for ctx in closure.contexts:
+        out[ctx] = 1
+    return out
+
+
+def max_craftable(bom: BillOfMaterials, item: str, inventory_counts: Mapping[str, int]) -> int:
+    """Largest number of `item` that can be crafted from the inventory alone (contexts assumed available).
+
+    Intermediates already in the inventory are used before their inputs.
+    """
+    closure = bom.closure_for(item)
+    if closure is None:
+        return 0
+    names = bom.graph.names
+    have = [max(int(inventory_counts.get(names[node], 0)), 0) for node in closure.nodes]
+    # Sound upper bound: a held unit of a node saves at most the leaves needed to make one of it
+    usable = [0] * len(have)
+    for j in range(1, len(have)):
+        if have[j]:
+            for leaf, amt in closure.one_cost[j]:
+                usable[leaf] += have[j] * amt
+    hi = min((int(usable[l] / closure.unit[l]) for l in closure.leaves if closure.unit[l] > 0), default=0)
+    lo = 0
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _demand(closure, mid, have) is not None:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
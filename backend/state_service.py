@@ -2,54 +2,330 @@ from __future__ import annotations
 
 """Persist and serve lightweight per-player state (telemetry snapshots).
 
-Purpose: Keep the latest telemetry per agent in memory and a small JSON file,
-and provide selection utilities for state responses.
+Purpose: Keep the latest telemetry per agent in memory and provide selection
+utilities for state responses.
+
+How: Write-behind persistence. Telemetry updates only touch memory and mark the
+player dirty; a background flusher appends the latest entry of each dirty player
+to a per-player journal (`<state>.journal/<player>.jsonl`) on a fixed cadence
+and periodically compacts everything into the snapshot file (`state.json`).
+Startup recovery replays snapshot + journals.
+
+Inventory index: a per-player item_id -> count map is rebuilt once per
+telemetry update and exposed read-only via `get_inventory_counts`.
+
+Delta telemetry: agents that negotiated `telemetry_delta` send a full
+`telemetry_update` carrying `seq`, then `telemetry_delta` messages with only the
+changed top-level fields and inventory slots, keyed to `base_seq`. Merging
+builds a new entry (entries are never mutated in place) and reuses the
+inventory counts when no slot changed; a `base_seq` that does not match the
+last applied `seq` is a gap and the caller asks the agent for a full resync.
+
+Sharded mode (`backend/coordinator.py`): a worker's StateService is given a
+`sink` instead of files. Its flusher hands each batch of dirty entries to the
+coordinator, which owns persistence. `mirror` installs another shard's entry
+(watched players) without marking it dirty.
+
+Waiters: `wait_for(player, predicate, timeout)` parks a future per player that
+`update_telemetry` resolves directly, so consumers react on the same update that
+satisfies them and cost nothing while idle.
 
 """
 
 import asyncio
 import json
 import logging
+import re
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from . import metrics
 
 
 logger = logging.getLogger("automc.state")
 
+# Receives the player's latest entry ({"ts", "state"}) and decides whether the waiter is done
+StatePredicate = Callable[[Dict[str, Any]], bool]
+
+
+_EMPTY_COUNTS: Mapping[str, int] = MappingProxyType({})
+
+
+def _count_inventory(state: Dict[str, Any]) -> Mapping[str, int]:
+    inv = state.get("inventory") if isinstance(state, dict) else None
+    if not isinstance(inv, list):
+        return _EMPTY_COUNTS
+    counts: Dict[str, int] = {}
+    for slot in inv:
+        try:
+            iid = str(slot.get("id"))
+            c = int(slot.get("count", 0))
+            if iid:
+                counts[iid] = counts.get(iid, 0) + c
+        except Exception:
+            continue
+    return MappingProxyType(counts)
+
+
+def _merge_inventory(base: Any, changed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Slots are keyed by index; a changed slot with no id or count <= 0 was emptied
+    slots: Dict[int, Dict[str, Any]] = {}
+    for slot in base if isinstance(base, list) else ():
+        try:
+            slots[int(slot["slot"])] = slot
+        except Exception:
+            continue
+    for slot in changed:
+        try:
+            idx = int(slot["slot"])
+        except Exception:
+            continue
+        if slot.get("id") and int(slot.get("count", 0)) > 0:
+            slots[idx] = slot
+        else:
+            slots.pop(idx, None)
+    return [slots[i] for i in sorted(slots)]
+
+
+def _journal_name(player_id: str) -> str:
+    # Player ids are UUIDs in practice; keep file names safe for anything else
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", player_id) + ".jsonl"
+
 
 class StateService:
-    def __init__(self, path: Path) -> None:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_interval_ms: int = 1000,
+        compact_interval_ms: int = 60000,
+        sink: Optional[Callable[[Dict[str, Dict[str, Any]]], Awaitable[None]]] = None,
+    ) -> None:
         self._path = path
+        self._sink = sink
+        self._journal_dir = path.with_name(path.name + ".journal")
+        self._flush_interval_s = max(int(flush_interval_ms), 1) / 1000.0
+        self._compact_interval_s = max(int(compact_interval_ms), 0) / 1000.0
         self._save_lock = asyncio.Lock()
         self._last_telemetry: Dict[str, Dict[str, Any]] = {}
+        self._inv_counts: Dict[str, Mapping[str, int]] = {}
+        self._seq: Dict[str, int] = {}  # last applied telemetry seq per player (delta agents only)
+        self._dirty: Set[str] = set()
+        self._waiters: Dict[str, List[Tuple[StatePredicate, asyncio.Future]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_compact = time.monotonic()
 
     def load(self) -> None:
+        """Recover state from the snapshot, then replay per-player journals on top."""
         try:
             if self._path.exists():
                 data = json.loads(self._path.read_text(encoding="utf-8"))
                 self._last_telemetry = data.get("telemetry", {})
         except Exception as exc:
             logger.warning("failed to load state: %s", exc)
+        if self._journal_dir.exists():
+            self._replay_journals()
+        self._inv_counts = {pid: _count_inventory(e.get("state", {})) for pid, e in self._last_telemetry.items()}
 
-    async def update_telemetry(self, player_id: str, ts: str, state: Dict[str, Any]) -> None:
-        self._last_telemetry[player_id] = {"ts": ts, "state": state}
-        await self._save()
+    def _replay_journals(self) -> None:
+        replayed = 0
+        for jpath in sorted(self._journal_dir.glob("*.jsonl")):
+            try:
+                lines = jpath.read_text(encoding="utf-8").splitlines()
+            except Exception as exc:
+                logger.warning("failed to read journal %s: %s", jpath.name, exc)
+                continue
+            for line in lines:
+                try:
+                    rec = json.loads(line)
+                    pid = str(rec["player"])
+                    self._last_telemetry[pid] = {"ts": rec.get("ts", ""), "state": rec.get("state", {})}
+                    replayed += 1
+                except Exception:
+                    # a torn final line from a crash mid-append; keep what we have
+                    continue
+        if replayed:
+            logger.info("replayed %d state journal entries", replayed)
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher and compact everything into the snapshot."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self._flush()
+        await self._compact()
+
+    async def update_telemetry(self, player_id: str, ts: str, state: Dict[str, Any], seq: Optional[int] = None) -> None:
+        # Memory only; persistence happens on the flusher's cadence
+        if seq is None:
+            self._seq.pop(player_id, None)
+        else:
+            self._seq[player_id] = int(seq)
+        self._commit(player_id, {"ts": ts, "state": state}, _count_inventory(state))
+
+    async def apply_telemetry_delta(
+        self,
+        player_id: str,
+        ts: str,
+        seq: int,
+        base_seq: int,
+        changed: Dict[str, Any],
+        removed: Optional[List[str]] = None,
+        inventory: Optional[List[Dict[str, Any]]] = None,
+    ) -> bool:
+        """Merge a `telemetry_delta` onto the player's entry; False on a sequence gap (nothing applied)."""
+        current = self._last_telemetry.get(player_id)
+        if current is None or self._seq.get(player_id) != int(base_seq):
+            self._seq.pop(player_id, None)
+            return False
+        state = dict(current.get("state", {}))
+        state.update(changed)
+        for key in removed or ():
+            state.pop(key, None)
+        if inventory:
+            state["inventory"] = _merge_inventory(state.get("inventory"), inventory)
+            counts = _count_inventory(state)
+        else:
+            counts = self._inv_counts.get(player_id, _EMPTY_COUNTS)
+        self._seq[player_id] = int(seq)
+        self._commit(player_id, {"ts": ts, "state": state}, counts)
+        return True
+
+    def _commit(self, player_id: str, entry: Dict[str, Any], counts: Mapping[str, int]) -> None:
+        self._last_telemetry[player_id] = entry
+        self._inv_counts[player_id] = counts
+        self._dirty.add(player_id)
+        if player_id in self._waiters:
+            self._wake(player_id, entry)
+
+    def mirror(self, player_id: str, entry: Dict[str, Any]) -> None:
+        """Install an entry owned by another shard; read-only here, so never flushed."""
+        self._last_telemetry[player_id] = entry
+        self._inv_counts[player_id] = _count_inventory(entry.get("state", {}))
+        if player_id in self._waiters:
+            self._wake(player_id, entry)
+
+    async def wait_for(self, player_id: str, predicate: StatePredicate, timeout: Optional[float] = None) -> bool:
+        """Wait until `predicate(latest entry)` holds for the player; False on timeout.
+
+        Checked once immediately, then only when that player's telemetry changes.
+        """
+        current = self._last_telemetry.get(player_id)
+        if current is not None and self._check(predicate, current):
+            return True
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, fut)
+        self._waiters.setdefault(player_id, []).append(waiter)
+        try:
+            if timeout is None:
+                return await fut
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters.get(player_id)
+            if waiters is not None:
+                try:
+                    waiters.remove(waiter)
+                except ValueError:
+                    pass
+                if not waiters:
+                    self._waiters.pop(player_id, None)
+
+    def _wake(self, player_id: str, entry: Dict[str, Any]) -> None:
+        for predicate, fut in list(self._waiters.get(player_id, ())):
+            if not fut.done() and self._check(predicate, entry):
+                fut.set_result(True)
+
+    @staticmethod
+    def _check(predicate: StatePredicate, entry: Dict[str, Any]) -> bool:
+        try:
+            return bool(predicate(entry))
+        except Exception:
+            return False
 
     def get_player_state(self, player_id: str) -> Optional[Dict[str, Any]]:
         return self._last_telemetry.get(player_id)
 
+    def get_inventory_counts(self, player_id: str) -> Mapping[str, int]:
+        """Read-only item_id -> count for the player's last telemetry inventory."""
+        return self._inv_counts.get(player_id, _EMPTY_COUNTS)
+
     def select_state(self, player_state: Dict[str, Any], selector: Optional[List[str]]) -> Dict[str, Any]:
         if not selector:
             return player_state.get("state", {})
         full = player_state.get("state", {})
         return {k: full.get(k) for k in selector if k in full}
 
-    async def _save(self) -> None:
-        self._path.parent.mkdir(parents=True, exist_ok=True)
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            await self._flush()
+            if self._compact_interval_s > 0 and (time.monotonic() - self._last_compact) >= self._compact_interval_s:
+                await self._compact()
+
+    async def _flush(self) -> None:
+        """Append the latest entry of each dirty player to its journal."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        # Entries are replaced (never mutated) on update, so references are stable off-loop
+        batch = {pid: self._last_telemetry[pid] for pid in dirty if pid in self._last_telemetry}
+        async with self._save_lock:
+            t0 = metrics.now()
+            try:
+                if self._sink is not None:
+                    await self._sink(batch)
+                else:
+                    await asyncio.to_thread(self._append_journals, batch)
+                metrics.STATE_FLUSH_SECONDS.observe_since(t0)
+            except Exception as exc:
+                # keep them dirty so the next flush retries
+                self._dirty |= dirty
+                logger.warning("failed to flush state journal: %s", exc)
+
+    def _append_journals(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        self._journal_dir.mkdir(parents=True, exist_ok=True)
+        for pid, entry in batch.items():
+            line = json.dumps({"player": pid, "ts": entry.get("ts", ""), "state": entry.get("state", {})}, separators=(",", ":"))
+            with (self._journal_dir / _journal_name(pid)).open("a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+    async def _compact(self) -> None:
+        """Rewrite the snapshot from memory and truncate the journals it covers."""
+        self._last_compact = time.monotonic()
+        if self._sink is not None:
+            # The coordinator owns the snapshot
+            return
+        snapshot = dict(self._last_telemetry)
         async with self._save_lock:
+            t0 = metrics.now()
             try:
-                data = {"telemetry": self._last_telemetry}
-                # offload writing to avoid blocking the event loop; pretty-print for readability
-                await asyncio.to_thread(self._path.write_text, json.dumps(data, indent=2), "utf-8")
+                await asyncio.to_thread(self._save, snapshot)
+                metrics.STATE_SAVE_SECONDS.observe_since(t0)
             except Exception as exc:
                 logger.warning("failed to save state: %s", exc)
+
+    def _save(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        # pretty-print for readability; write-then-rename so a crash never leaves a torn snapshot
+        tmp.write_text(json.dumps({"telemetry": snapshot}, indent=2), encoding="utf-8")
+        tmp.replace(self._path)
+        if self._journal_dir.exists():
+            for jpath in self._journal_dir.glob("*.jsonl"):
+                try:
+                    jpath.unlink()
+                except Exception:
+                    continue
@@ -3,13 +3,32 @@ from __future__ import annotations
 """Shared storage catalog for container inventories across agents.
 
 Purpose: Track latest inventory snapshots by container key and provide simple
-item count queries for planner/dispatcher decisions.
+item count queries for planner/dispatcher decisions. An inverted index
+(item_id -> {container_key: count}) plus running totals is maintained
+incrementally per container, so queries never scan the catalog. A per-dimension
+uniform grid over container positions answers nearest-k and within-radius
+lookups for an item around an agent position.
+
+How: Containers live in memory; changed keys are marked dirty and a background
+flusher upserts only those rows into a SQLite database (WAL mode) off the event
+loop, one transaction per flush. The legacy JSON file is kept as an
+import/export format: it seeds an empty database and is rewritten on close.
 """
 
 from dataclasses import dataclass
+import asyncio
+import heapq
 import json
+import logging
+import math
+import sqlite3
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import metrics
+
+
+logger = logging.getLogger("automc.storage")
 
 
 ContainerKey = Tuple[str, Tuple[int, int, int]]  # (dim, pos)
@@ -23,10 +42,127 @@ class ContainerState:
     slots: Dict[int, Dict[str, Any]]  # slot index -> {id, count, nbt?}
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    dim TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    z INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    container_type TEXT NOT NULL,
+    ts_iso TEXT NOT NULL,
+    slots TEXT NOT NULL,
+    PRIMARY KEY (dim, x, y, z)
+)
+"""
+
+
+class _SpatialGrid:
+    """Uniform grid over (x, z) columns per dimension; distances are full 3D.
+
+    Cells are chunk-sized columns, so a storage hall spreads over a handful of
+    cells and nearest queries only visit rings of cells around the agent.
+    """
+
+    CELL = 16
+
+    def __init__(self) -> None:
+        self._cells: Dict[str, Dict[Tuple[int, int], Set[ContainerKey]]] = {}
+        # dim -> (min_cx, min_cz, max_cx, max_cz) to bound ring expansion
+        self._extent: Dict[str, Tuple[int, int, int, int]] = {}
+
+    def _cell(self, x: float, z: float) -> Tuple[int, int]:
+        return (int(math.floor(x)) // self.CELL, int(math.floor(z)) // self.CELL)
+
+    def add(self, key: ContainerKey) -> None:
+        dim, (x, _y, z) = key
+        cell = self._cell(x, z)
+        self._cells.setdefault(dim, {}).setdefault(cell, set()).add(key)
+        ext = self._extent.get(dim)
+        if ext is None:
+            self._extent[dim] = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            self._extent[dim] = (min(ext[0], cell[0]), min(ext[1], cell[1]), max(ext[2], cell[0]), max(ext[3], cell[1]))
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._extent = {}
+
+    def ring(self, dim: str, center: Tuple[int, int], r: int) -> Iterable[Set[ContainerKey]]:
+        """Non-empty cells at Chebyshev distance `r` from `center`, clipped to the dim's extent."""
+        cells = self._cells.get(dim)
+        ext = self._extent.get(dim)
+        if not cells or ext is None:
+            return
+        cx, cz = center
+        if r == 0:
+            hit = cells.get(center)
+            if hit:
+                yield hit
+            return
+        x_lo, x_hi = max(cx - r, ext[0]), min(cx + r, ext[2])
+        z_lo, z_hi = max(cz - r, ext[1]), min(cz + r, ext[3])
+        for z in (cz - r, cz + r):
+            if ext[1] <= z <= ext[3]:
+                for x in range(x_lo, x_hi + 1):
+                    hit = cells.get((x, z))
+                    if hit:
+                        yield hit
+        for x in (cx - r, cx + r):
+            if ext[0] <= x <= ext[2]:
+                for z in range(max(z_lo, cz - r + 1), min(z_hi, cz + r - 1) + 1):
+                    hit = cells.get((x, z))
+                    if hit:
+                        yield hit
+
+    def ring_bounds(self, dim: str, center: Tuple[int, int]) -> Tuple[int, int]:
+        """First and last ring around `center` that intersect the dim's extent ((0, -1) if empty)."""
+        ext = self._extent.get(dim)
+        if ext is None:
+            return (0, -1)
+        cx, cz = center
+        first = max(ext[0] - cx, cx - ext[2], ext[1] - cz, cz - ext[3], 0)
+        last = max(abs(cx - ext[0]), abs(cx - ext[2]), abs(cz - ext[1]), abs(cz - ext[3]))
+        return (first, last)
+
+    def margin(self, x: float, z: float) -> float:
+        """Horizontal distance from (x, z) to the nearest border of its own cell."""
+        fx = x - math.floor(x / self.CELL) * self.CELL
+        fz = z - math.floor(z / self.CELL) * self.CELL
+        return min(fx, self.CELL - fx, fz, self.CELL - fz)
+
+
+def _dist(pos: Tuple[float, float, float], key: ContainerKey) -> float:
+    x, y, z = key[1]
+    # Measure to the block centre
+    return math.sqrt((x + 0.5 - pos[0]) ** 2 + (y + 0.5 - pos[1]) ** 2 + (z + 0.5 - pos[2]) ** 2)
+
+
 class StorageCatalog:
-    def __init__(self, path: Path | str = Path("data/storage_catalog.json")) -> None:
+    # Below this many holders a direct scan beats walking grid rings
+    _SCAN_THRESHOLD = 256
+
+    def __init__(
+        self,
+        path: Path | str = Path("data/storage_catalog.json"),
+        *,
+        db_path: Optional[Path | str] = None,
+        flush_interval_ms: int = 1000,
+    ) -> None:
         self._by_key: Dict[ContainerKey, ContainerState] = {}
+        # Inverted index: item_id -> {container_key: count}; totals overall and per dimension
+        self._item_index: Dict[str, Dict[ContainerKey, int]] = {}
+        self._item_totals: Dict[str, int] = {}
+        self._dim_totals: Dict[str, Dict[str, int]] = {}
+        self._grid = _SpatialGrid()
         self._path: Path = Path(path)
+        self._db_path: Path = Path(db_path) if db_path is not None else self._path.with_suffix(".sqlite3")
+        self._flush_interval_s = max(int(flush_interval_ms), 1) / 1000.0
+        self._dirty: Set[ContainerKey] = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._open_db()
         self._load()
 
     @staticmethod
@@ -54,8 +190,14 @@ class StorageCatalog:
                 slots[idx] = {"id": iid, "count": cnt}
             except Exception:
                 continue
+        old = self._by_key.get(key)
         self._by_key[key] = ContainerState(version=version, container_type=ctype, ts_iso=ts_iso, slots=slots)
-        self._save()
+        if old is None:
+            self._grid.add(key)
+            metrics.STORAGE_CONTAINERS.set(len(self._by_key))
+        metrics.STORAGE_UPDATES.inc("snapshot")
+        self._reindex(key, self._container_counts(old.slots) if old else {}, self._container_counts(slots))
+        self._dirty.add(key)
 
     def handle_diff(self, player_id: str, diff: Dict[str, Any]) -> None:
         ck = diff.get("container_key", {})
@@ -68,6 +210,7 @@ class StorageCatalog:
         if state is None:
             # ignore diffs with no baseline
             return
+        before = self._container_counts(state.slots)
         # Apply removes
         for r in diff.get("removes", []) or []:
             try:
@@ -97,19 +240,269 @@ class StorageCatalog:
         to_ver = diff.get("to_version")
         if isinstance(to_ver, int):
             state.version = to_ver
-        self._save()
+        self._reindex(key, before, self._container_counts(state.slots))
+        self._dirty.add(key)
+        metrics.STORAGE_UPDATES.inc("diff")
 
     def count_item(self, item_id: str) -> int:
-        total = 0
-        for state in self._by_key.values():
-            for slot in state.slots.values():
-                if slot.get("id") == item_id:
-                    total += int(slot.get("count", 0))
-        return total
-
-    def _save(self) -> None:
+        return self._item_totals.get(item_id, 0)
+
+    def count_items(self, item_ids: Iterable[str]) -> Dict[str, int]:
+        """Bulk totals for a set of items (one call per plan)."""
+        totals = self._item_totals
+        return {iid: totals.get(iid, 0) for iid in item_ids}
+
+    def count_item_in_dim(self, item_id: str, dim: str) -> int:
+        return self._dim_totals.get(item_id, {}).get(dim, 0)
+
+    def totals_by_dim(self, item_id: str) -> Dict[str, int]:
+        return dict(self._dim_totals.get(item_id, {}))
+
+    def containers_with(self, item_id: str) -> Dict[ContainerKey, int]:
+        """Snapshot of container_key -> count for one item; later diffs do not change it."""
+        return dict(self._item_index.get(item_id, {}))
+
+    def top_containers(self, item_id: str, n: int) -> List[Tuple[ContainerKey, int]]:
+        """The `n` containers holding the most of `item_id`, largest first."""
+        holders = self._item_index.get(item_id)
+        if not holders or n <= 0:
+            return []
+        return heapq.nlargest(n, holders.items(), key=lambda kv: kv[1])
+
+    def nearest_with_item(
+        self, item_id: str, dim: str, pos: Tuple[float, float, float], k: int = 5
+    ) -> List[Tuple[ContainerKey, int, float]]:
+        """Up to `k` containers in `dim` holding `item_id`, nearest to `pos` first.
+
+        Returns (container_key, count, distance) tuples.
+        """
+        holders = self._item_index.get(item_id)
+        if not holders or k <= 0:
+            return []
+        if len(holders) <= self._SCAN_THRESHOLD:
+            found = [(_dist(pos, key), key) for key in holders if key[0] == dim]
+            return [(key, holders[key], d) for d, key in heapq.nsmallest(k, found)]
+        grid = self._grid
+        center = grid._cell(pos[0], pos[2])
+        r, last_ring = grid.ring_bounds(dim, center)
+        margin = grid.margin(pos[0], pos[2])
+        # max-heap of the k best via negated distances
+        best: List[Tuple[float, ContainerKey]] = []
+        while r <= last_ring:
+            for cell in grid.ring(dim, center, r):
+                for key in cell:
+                    if key not in holders:
+                        continue
+                    d = _dist(pos, key)
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, key))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, key))
+            # Anything in ring r+1 or beyond is at least r full cells (plus margin) away horizontally
+            if len(best) >= k and -best[0][0] <= r * grid.CELL + margin:
+                break
+            r += 1
+        ranked = sorted((-nd, key) for nd, key in best)
+        return [(key, holders[key], d) for d, key in ranked]
+
+    def nearest_container(self, kind: str, dim: str, pos: Tuple[float, float, float]) -> Optional[Tuple[ContainerKey, float]]:
+        """Nearest container in `dim` whose type name contains `kind` (case-insensitive), e.g. "furnace"."""
+        kind = kind.lower()
+        best: Optional[Tuple[float, ContainerKey]] = None
+        # Container types are few and rarely queried (route planning); a scan is fine
+        for key, st in self._by_key.items():
+            if key[0] != dim or kind not in st.container_type.lower():
+                continue
+            d = _dist(pos, key)
+            if best is None or d < best[0]:
+                best = (d, key)
+        return None if best is None else (best[1], best[0])
+
+    def within_radius(
+        self, item_id: str, dim: str, pos: Tuple[float, float, float], radius: float
+    ) -> List[Tuple[ContainerKey, int, float]]:
+        """All containers in `dim` holding `item_id` within `radius` of `pos`, nearest first."""
+        holders = self._item_index.get(item_id)
+        if not holders or radius < 0:
+            return []
+        found: List[Tuple[float, ContainerKey]] = []
+        grid = self._grid
+        center = grid._cell(pos[0], pos[2])
+        rings = int(math.ceil(radius / grid.CELL)) + 1
+        first, last = grid.ring_bounds(dim, center)
+        if len(holders) <= self._SCAN_THRESHOLD or (2 * rings + 1) ** 2 > len(holders):
+            candidates: Iterable[ContainerKey] = (key for key in holders if key[0] == dim)
+        else:
+            candidates = (
+                key
+                for r in range(first, min(rings, last) + 1)
+                for cell in grid.ring(dim, center, r)
+                for key in cell
+                if key in holders
+            )
+        for key in candidates:
+            d = _dist(pos, key)
+            if d <= radius:
+                found.append((d, key))
+        found.sort()
+        return [(key, holders[key], d) for d, key in found]
+
+    @staticmethod
+    def _container_counts(slots: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for slot in slots.values():
+            try:
+                iid = str(slot.get("id"))
+                c = int(slot.get("count", 0))
+            except Exception:
+                continue
+            if c > 0:
+                counts[iid] = counts.get(iid, 0) + c
+        return counts
+
+    def _reindex(self, key: ContainerKey, before: Dict[str, int], after: Dict[str, int]) -> None:
+        """Apply one container's per-item delta to the index and totals."""
+        dim = key[0]
+        for iid in set(before) | set(after):
+            delta = after.get(iid, 0) - before.get(iid, 0)
+            if delta == 0:
+                continue
+            holders = self._item_index.setdefault(iid, {})
+            if after.get(iid, 0) > 0:
+                holders[key] = after[iid]
+            else:
+                holders.pop(key, None)
+                if not holders:
+                    self._item_index.pop(iid, None)
+            total = self._item_totals.get(iid, 0) + delta
+            if total > 0:
+                self._item_totals[iid] = total
+            else:
+                self._item_totals.pop(iid, None)
+            per_dim = self._dim_totals.setdefault(iid, {})
+            dim_total = per_dim.get(dim, 0) + delta
+            if dim_total > 0:
+                per_dim[dim] = dim_total
+            else:
+                per_dim.pop(dim, None)
+                if not per_dim:
+                    self._dim_totals.pop(iid, None)
+
+    def _rebuild_index(self) -> None:
+        self._item_index = {}
+        self._item_totals = {}
+        self._dim_totals = {}
+        self._grid.clear()
+        for key, st in self._by_key.items():
+            self._grid.add(key)
+            self._reindex(key, {}, self._container_counts(st.slots))
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        metrics.STORAGE_CONTAINERS.set(len(self._by_key))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher, write remaining rows, and refresh the JSON export."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await asyncio.to_thread(self.export_json, self._path)
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Upsert the containers changed since the last flush in one transaction."""
+        if not self._dirty or self._db is None:
+            return
+        dirty, self._dirty = self._dirty, set()
+        # Serialize on the loop: diffs mutate slot dicts in place
+        rows = [self._row(key, self._by_key[key]) for key in dirty if key in self._by_key]
+        async with self._db_lock:
+            t0 = metrics.now()
+            try:
+                await asyncio.to_thread(self._write_rows, rows)
+                metrics.STORAGE_FLUSH_SECONDS.observe_since(t0)
+                metrics.STORAGE_FLUSH_ROWS.inc(amount=len(rows))
+            except Exception as exc:
+                self._dirty |= dirty
+                logger.warning("failed to flush storage catalog: %s", exc)
+
+    @staticmethod
+    def _row(key: ContainerKey, st: ContainerState) -> Tuple[Any, ...]:
+        dim, pos = key
+        return (dim, pos[0], pos[1], pos[2], st.version, st.container_type, st.ts_iso, json.dumps(st.slots, separators=(",", ":")))
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        if self._db is None:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO containers (dim, x, y, z, version, container_type, ts_iso, slots) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _open_db(self) -> None:
         try:
-            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Writes are serialized by _db_lock but run on worker threads
+            db = sqlite3.connect(str(self._db_path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(_SCHEMA)
+            db.commit()
+            self._db = db
+        except Exception as exc:
+            logger.warning("storage database unavailable, catalog is memory-only: %s", exc)
+            self._db = None
+
+    def _load(self) -> None:
+        if self._db is not None:
+            try:
+                out: Dict[ContainerKey, ContainerState] = {}
+                for dim, x, y, z, version, ctype, ts_iso, slots_s in self._db.execute(
+                    "SELECT dim, x, y, z, version, container_type, ts_iso, slots FROM containers"
+                ):
+                    try:
+                        slots_in = json.loads(slots_s) or {}
+                        slots = {int(k): v for k, v in slots_in.items()} if isinstance(slots_in, dict) else {}
+                        out[(str(dim), (int(x), int(y), int(z)))] = ContainerState(
+                            version=int(version), container_type=str(ctype), ts_iso=str(ts_iso), slots=slots
+                        )
+                    except Exception:
+                        continue
+                if out:
+                    self._by_key = out
+                    self._rebuild_index()
+                    return
+            except Exception as exc:
+                logger.warning("failed to load storage database: %s", exc)
+        # Empty or unavailable database: seed from the JSON export
+        self.import_json(self._path)
+        if self._by_key and self._db is not None:
+            try:
+                self._write_rows([self._row(k, st) for k, st in self._by_key.items()])
+                self._dirty.clear()
+            except Exception as exc:
+                logger.warning("failed to seed storage database: %s", exc)
+
+    def export_json(self, path: Path | str) -> None:
+        """Write the full catalog in the legacy `{dim@x,y,z: {...}}` JSON format."""
+        try:
+            out_path = Path(path)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
             serial: Dict[str, Any] = {}
             for (dim, pos), st in self._by_key.items():
                 key = f"{dim}@{pos[0]},{pos[1]},{pos[2]}"
@@ -119,16 +512,18 @@ class StorageCatalog:
                     "ts_iso": st.ts_iso,
                     "slots": st.slots,
                 }
-            self._path.write_text(json.dumps(serial, indent=2), encoding="utf-8")
+            out_path.write_text(json.dumps(serial, indent=2), encoding="utf-8")
         except Exception:
-            # best-effort persistence
+            # best-effort export
             pass
 
-    def _load(self) -> None:
+    def import_json(self, path: Path | str) -> None:
+        """Replace the in-memory catalog with the contents of a legacy JSON export."""
+        src = Path(path)
         try:
-            if not self._path.exists():
+            if not src.exists():
                 return
-            raw = json.loads(self._path.read_text(encoding="utf-8"))
+            raw = json.loads(src.read_text(encoding="utf-8"))
             out: Dict[ContainerKey, ContainerState] = {}
             for key, data in raw.items():
                 try:
@@ -143,6 +538,8 @@ class StorageCatalog:
                 except Exception:
                     continue
             self._by_key = out
+            self._rebuild_index()
+            self._dirty |= set(out.keys())
         except Exception:
-            # ignore load errors
-            self._by_key = {}
+            # ignore import errors
+            pass
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+"""Traffic recording: every WebSocket frame in both directions, with timing.
+
+Purpose: Capture real sessions so a workload can be replayed against the
+backend (`python -m backend.bench.replay`), e.g. to compare StateService,
+StorageCatalog or dispatcher changes on identical traffic.
+
+How: Enabled by `record_traffic`. The hot path only appends
+`(perf_counter, session, event, frame)` to a pending list. Frames are stored as
+received or sent: already encoded, whatever the codec. A background flusher
+packs the pending records and appends them to a gzip file off the event loop,
+on the `state_flush_interval_ms` cadence.
+
+File layout (`data/traffic/<start>[-shard<i>].amcrec.gz`):
+
+- the magic line `AMCREC1`;
+- one JSON header line: format version, start time, backend version;
+- records. Each record is a `>dIBI` header followed by the payload: seconds
+  since start, session number, event, payload length. Events are `OPEN`,
+  `CLOSE`, and inbound/outbound text or binary frames. Text is stored as UTF-8.
+
+Sessions are numbered per connection from 1. Replay matches the backend's
+outbound frames of a session against the live ones in order.
+
+"""
+
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from . import __version__
+
+
+logger = logging.getLogger("automc.traffic")
+
+MAGIC = b"AMCREC1\n"
+FORMAT_VERSION = 1
+RECORD = struct.Struct(">dIBI")
+
+OPEN, CLOSE, IN_TEXT, IN_BINARY, OUT_TEXT, OUT_BINARY = range(6)
+INBOUND = frozenset({IN_TEXT, IN_BINARY})
+OUTBOUND = frozenset({OUT_TEXT, OUT_BINARY})
+
+# (seconds since start, session, event, frame)
+Record = Tuple[float, int, int, Union[str, bytes]]
+
+
+class TrafficRecorder:
+    def __init__(self, path: Path, *, flush_interval_ms: int = 1000) -> None:
+        self.path = path
+        self._flush_interval_s = max(int(flush_interval_ms), 1) / 1000.0
+        self._t0 = time.perf_counter()
+        self._sessions = itertools.count(1)
+        self._pending: List[Record] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._fh: Optional[gzip.GzipFile] = None
+        self.frames = 0
+
+    # --- hot path ----------------------------------------------------------
+
+    def open(self) -> int:
+        """Number a new connection; returns the session id for its records."""
+        sid = next(self._sessions)
+        self._pending.append((time.perf_counter(), sid, OPEN, b""))
+        return sid
+
+    def inbound(self, sid: int, frame: Union[str, bytes]) -> None:
+        self._pending.append((time.perf_counter(), sid, IN_TEXT if isinstance(frame, str) else IN_BINARY, frame))
+
+    def outbound(self, sid: int, frame: Union[str, bytes]) -> None:
+        self._pending.append((time.perf_counter(), sid, OUT_TEXT if isinstance(frame, str) else OUT_BINARY, frame))
+
+    def close_session(self, sid: int) -> None:
+        self._pending.append((time.perf_counter(), sid, CLOSE, b""))
+
+    # --- persistence -------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher, write pending records and finish the gzip stream."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        async with self._lock:
+            if self._fh is not None:
+                fh, self._fh = self._fh, None
+                await asyncio.to_thread(fh.close)
+        logger.info("recorded %d frames to %s", self.frames, self.path)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as exc:
+                # Recording is best-effort: losing a batch must not affect serving
+                logger.warning("failed to write traffic recording: %s", exc)
+
+    def _write(self, batch: List[Record]) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = gzip.open(self.path, "wb")
+            header = {"format": FORMAT_VERSION, "start": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "version": __version__}
+            self._fh.write(MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+        parts: List[bytes] = []
+        t0 = self._t0
+        for t, sid, event, frame in batch:
+            payload = frame.encode("utf-8") if isinstance(frame, str) else frame
+            parts.append(RECORD.pack(t - t0, sid, event, len(payload)))
+            parts.append(payload)
+        self._fh.write(b"".join(parts))
+        self._fh.flush()
+        self.frames += sum(1 for _, _, event, _ in batch if event in INBOUND or event in OUTBOUND)
+
+
+def read_recording(path: Path) -> Tuple[dict, Iterator[Record]]:
+    """Open a recording; returns its header and an iterator over its records.
+
+    A recording cut short by a crash ends at its last complete record.
+    """
+    fh = gzip.open(path, "rb")
+    if fh.readline() != MAGIC:
+        fh.close()
+        raise ValueError(f"{path}: not a traffic recording")
+    header = json.loads(fh.readline())
+
+    def records() -> Iterator[Record]:
+        with fh:
+            while True:
+                try:
+                    head = fh.read(RECORD.size)
+                    if len(head) < RECORD.size:
+                        return
+                    t, sid, event, size = RECORD.unpack(head)
+                    payload = fh.read(size)
+                except EOFError:
+                    return
+                if len(payload) < size:
+                    return
+                if event in (IN_TEXT, OUT_TEXT):
+                    yield t, sid, event, payload.decode("utf-8")
+                else:
+                    yield t, sid, event, payload
+
+    return header, records()
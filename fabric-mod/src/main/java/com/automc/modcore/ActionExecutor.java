@@ -2,7 +2,7 @@
  * AutoMinecraft mod-native action executor.
  *
  * Purpose: Execute non-chat-bridge actions requested by the backend (e.g., craft,
- * ensure contexts), and report progress updates.
+ * drop, ensure contexts), and report progress updates.
  *
  * How: Dispatches by 'op' and delegates to specific helpers like Crafting2x2.
  * Emits structured progress_update messages via the WebSocket manager.
@@ -28,6 +28,12 @@ public final class ActionExecutor {
             com.automc.modcore.actions.gui.GuiCrafting.craftByRecipeId(actionId, recipe, count, context);
             return;
         }
+        if ("drop".equals(op)) {
+            String item = obj.has("item") ? obj.get("item").getAsString() : "";
+            int count = obj.has("count") ? obj.get("count").getAsInt() : 0;
+            com.automc.modcore.actions.gui.DropItems.drop(actionId, item, count);
+            return;
+        }
         if ("ensure".equals(op)) {
             // fail loudly: ensure-context is handled via Baritone (#set + #find + #goto) from backend
             sendProgress(actionId, "fail", "ensure handled via Baritone; no client fallback");
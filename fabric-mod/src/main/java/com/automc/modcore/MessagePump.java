@@ -5,13 +5,17 @@
  * thread by queuing and draining a bounded batch each tick.
  *
  * How: Registers an END_CLIENT_TICK callback, polls a concurrent queue up to
- * a fixed limit, and routes each message through the MessageRouter.
+ * a fixed limit, and routes each message through the MessageRouter. Messages are
+ * queued already decoded (JSON or MessagePack frames) so they are parsed once. A
+ * batch frame is one queue entry: it counts once against the per-tick budget and
+ * the queue cap, and its messages are routed in order.
  *
  * Engineering notes: Apply backpressure via per-tick and queue-size caps to
  * avoid stalls and runaway memory.
  */
 package com.automc.modcore;
 
+import com.google.gson.JsonObject;
 import net.fabricmc.fabric.api.client.event.lifecycle.v1.ClientTickEvents;
 import org.apache.logging.log4j.LogManager;
 import org.apache.logging.log4j.Logger;
@@ -22,7 +26,7 @@ import java.util.concurrent.ConcurrentLinkedQueue;
 
 final class MessagePump {
     private static final Logger LOGGER = LogManager.getLogger("AutoMinecraft.Pump");
-    private static final ConcurrentLinkedQueue<String> QUEUE = new ConcurrentLinkedQueue<>();
+    private static final ConcurrentLinkedQueue<JsonObject> QUEUE = new ConcurrentLinkedQueue<>();
     private static volatile boolean registered = false;
 
     private MessagePump() {}
@@ -35,23 +39,33 @@ final class MessagePump {
             if (!WebSocketClientManager.getInstance().areSettingsApplied()) { return; }
             // Drain up to configured number per tick to avoid stalls
             int maxPerTick = WebSocketClientManager.getInstance().getMessagePumpMaxPerTick();
-            List<String> batch = new ArrayList<>(Math.min(64, Math.max(1, maxPerTick)));
+            List<JsonObject> batch = new ArrayList<>(Math.min(64, Math.max(1, maxPerTick)));
             for (int i = 0; i < maxPerTick; i++) {
-                String msg = QUEUE.poll();
+                JsonObject msg = QUEUE.poll();
                 if (msg == null) break;
                 batch.add(msg);
             }
-            for (String raw : batch) {
-                try {
-                    MessageRouter.onMessage(raw);
-                } catch (Throwable t) {
-                    LOGGER.warn("message handling error: {}", t.toString());
+            for (JsonObject msg : batch) {
+                if (msg.has("type") && Protocol.TYPE_BATCH.equals(msg.get("type").getAsString())) {
+                    for (com.google.gson.JsonElement el : msg.getAsJsonArray("messages")) {
+                        if (el.isJsonObject()) route(el.getAsJsonObject());
+                    }
+                } else {
+                    route(msg);
                 }
             }
         });
     }
 
-    static void enqueue(String raw) {
+    private static void route(JsonObject msg) {
+        try {
+            MessageRouter.onMessage(msg);
+        } catch (Throwable t) {
+            LOGGER.warn("message handling error: {}", t.toString());
+        }
+    }
+
+    static void enqueue(JsonObject msg) {
         // Before settings are applied, accept messages unbounded to allow settings to arrive
         if (WebSocketClientManager.getInstance().areSettingsApplied()) {
             // Drop if queue is too large to avoid runaway memory usage (configurable)
@@ -60,6 +74,6 @@ final class MessagePump {
                 return;
             }
         }
-        QUEUE.offer(raw);
+        QUEUE.offer(msg);
     }
 }
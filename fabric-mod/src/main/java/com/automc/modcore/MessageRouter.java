@@ -1,11 +1,11 @@
 /**
  * AutoMinecraft message router.
  *
- * Purpose: Parse inbound JSON from the backend and dispatch to either the chat
+ * Purpose: Route decoded inbound messages from the backend and dispatch to either the chat
  * bridge (rate-limited) or the mod-native action executor. Logs plans for
  * observability.
  *
- * How: Decodes with Gson on the client thread, switches by 'type' and 'mode',
+ * How: Receives messages already decoded on the IO thread, switches by 'type' and 'mode',
  * and emits progress updates for chat-bridge actions immediately.
  *
  * Engineering notes: Keep parsing tolerant; prefer structured logging with ids;
@@ -13,20 +13,17 @@
  */
 package com.automc.modcore;
 
-import com.google.gson.Gson;
 import com.google.gson.JsonObject;
 import org.apache.logging.log4j.LogManager;
 import org.apache.logging.log4j.Logger;
 
 public final class MessageRouter {
     private static final Logger LOGGER = LogManager.getLogger("AutoMinecraft.Router");
-    private static final Gson GSON = new Gson();
 
     private MessageRouter() {}
 
-    public static void onMessage(String raw) {
+    public static void onMessage(JsonObject obj) {
         try {
-            JsonObject obj = GSON.fromJson(raw, JsonObject.class);
             if (obj == null || !obj.has("type")) return;
             String type = obj.get("type").getAsString();
             if (Protocol.TYPE_CHAT_SEND.equals(type)) {
@@ -14,6 +14,8 @@ public final class Protocol {
 	public static final String TYPE_ACTION_REQUEST = "action_request";
 	public static final String TYPE_PROGRESS_UPDATE = "progress_update";
 	public static final String TYPE_TELEMETRY_UPDATE = "telemetry_update";
+	public static final String TYPE_TELEMETRY_DELTA = "telemetry_delta";
+	public static final String TYPE_TELEMETRY_RESYNC = "telemetry_resync";
 	public static final String TYPE_STATE_REQUEST = "state_request";
 	public static final String TYPE_STATE_RESPONSE = "state_response";
 	public static final String TYPE_INVENTORY_SNAPSHOT = "inventory_snapshot";
@@ -21,6 +23,7 @@ public final class Protocol {
 	public static final String TYPE_PLAN = "plan";
 	public static final String TYPE_SETTINGS_UPDATE = "settings_update";
 	public static final String TYPE_SETTINGS_BROADCAST = "settings_broadcast";
+	public static final String TYPE_BATCH = "batch";
 
 	// Modes
 	public static final String MODE_CHAT_BRIDGE = "chat_bridge";
@@ -8,6 +8,11 @@
  * WebSocket callbacks to enqueue inbound messages into the game-thread MessagePump, and
  * applies safe Baritone defaults after connect. Exposes an accessor for the active
  * player id and a rate-limited chat send that executes on the MC thread.
+ * When the backend accepts the telemetry_delta capability, telemetry after the first
+ * full update only carries changed fields and inventory slots, chained by seq.
+ * Frames after the handshake use the codec the backend picked (MessagePack or JSON).
+ * With batching negotiated, messages queued while a send is in flight leave as one
+ * batch frame, and inbound batches reach the pump as a single queue entry.
  *
  * Engineering notes: Keep IO off the MC thread; centralize rate-limiting and settings;
  * prefer explicit reconnection/backoff in future; avoid hardcoded secrets; structured logs.
@@ -58,6 +63,14 @@ public final class WebSocketClientManager {
     private volatile String feedbackPrefixOverride = null;
     private volatile String feedbackBracketColorOverride = null;
     private volatile String feedbackInnerColorOverride = null;
+    private volatile boolean telemetryDeltaAccepted = false;
+    private volatile String wireCodec = WireCodec.JSON;
+    private volatile boolean batchAccepted = false;
+    private final java.util.concurrent.ConcurrentLinkedQueue<JsonObject> outbox = new java.util.concurrent.ConcurrentLinkedQueue<>();
+    // Delta telemetry baseline; guarded by sendTelemetryOnce's monitor
+    private long telemetrySeq = 0L;
+    private JsonObject lastTelemetryState = null;
+    private volatile boolean telemetryResyncRequested = true;
 
     private WebSocketClientManager() {}
 
@@ -126,8 +139,19 @@ public final class WebSocketClientManager {
                     JsonObject caps = new JsonObject();
                     caps.addProperty("chat_bridge", true);
                     caps.addProperty("mod_native_ensure", true);
+                    caps.addProperty("telemetry_delta", true);
+                    com.google.gson.JsonArray codecs = new com.google.gson.JsonArray();
+                    codecs.add(WireCodec.MSGPACK);
+                    codecs.add(WireCodec.JSON);
+                    caps.add("codecs", codecs);
+                    caps.addProperty("batch", true);
+                    wireCodec = WireCodec.JSON;
+                    batchAccepted = false;
                     handshake.add("capabilities", caps);
                     enqueueSend(GSON.toJson(handshake));
+                    // New connection: deltas must chain from a fresh full update
+                    telemetryDeltaAccepted = false;
+                    telemetryResyncRequested = true;
                     // Send one immediate telemetry snapshot for early username adoption
                     try {
                         sendTelemetryOnce();
@@ -136,20 +160,17 @@ public final class WebSocketClientManager {
                 }
                 @Override public void onMessage(String message) {
                     try {
-                        com.google.gson.JsonObject obj = GSON.fromJson(message, com.google.gson.JsonObject.class);
-                        if (obj != null && obj.has("type")) {
-                            String t = obj.get("type").getAsString();
-                            if (Protocol.TYPE_SETTINGS_UPDATE.equals(t) || Protocol.TYPE_SETTINGS_BROADCAST.equals(t)) {
-                                if (obj.has("settings") && obj.get("settings").isJsonObject()) {
-                                    applySettings(obj.getAsJsonObject("settings"));
-                                }
-                                // Confirmation is provided by backend via chat_send; avoid duplicate local HUD
-                                return; // settings applied; no need to enqueue this
-                            }
-                        }
-                    } catch (Throwable ignored) {}
-                    // Pump non-settings messages into a queue to be processed on the client tick
-                    MessagePump.enqueue(message);
+                        onInbound(GSON.fromJson(message, JsonObject.class));
+                    } catch (Throwable t) {
+                        LOGGER.warn("invalid text frame: {}", t.toString());
+                    }
+                }
+                @Override public void onMessage(java.nio.ByteBuffer bytes) {
+                    try {
+                        onInbound(WireCodec.decodeMsgpack(bytes));
+                    } catch (Throwable t) {
+                        LOGGER.warn("invalid binary frame: {}", t.toString());
+                    }
                 }
                 @Override public void onClose(int code, String reason, boolean remote) {
                     LOGGER.info("WS closed: {} {} remote={} ", code, reason, remote);
@@ -165,6 +186,49 @@ public final class WebSocketClientManager {
         }
     }
 
+    private void onInbound(JsonObject obj) {
+        if (obj == null || !obj.has("type")) return;
+        String t = obj.get("type").getAsString();
+        if (Protocol.TYPE_BATCH.equals(t)) {
+            if (!obj.has("messages") || !obj.get("messages").isJsonArray()) return;
+            // Control messages apply immediately in order; the rest stay together as one pump entry
+            com.google.gson.JsonArray rest = new com.google.gson.JsonArray();
+            for (com.google.gson.JsonElement el : obj.getAsJsonArray("messages")) {
+                if (!el.isJsonObject()) continue;
+                JsonObject m = el.getAsJsonObject();
+                if (!handleControl(m)) rest.add(m);
+            }
+            if (rest.size() == 0) return;
+            JsonObject batch = new JsonObject();
+            batch.addProperty("type", Protocol.TYPE_BATCH);
+            batch.add("messages", rest);
+            MessagePump.enqueue(batch);
+            return;
+        }
+        if (handleControl(obj)) return;
+        // Pump non-settings messages into a queue to be processed on the client tick
+        MessagePump.enqueue(obj);
+    }
+
+    private boolean handleControl(JsonObject obj) {
+        String t = obj.has("type") ? obj.get("type").getAsString() : "";
+        if (Protocol.TYPE_SETTINGS_UPDATE.equals(t) || Protocol.TYPE_SETTINGS_BROADCAST.equals(t)) {
+            if (obj.has("settings") && obj.get("settings").isJsonObject()) {
+                applySettings(obj.getAsJsonObject("settings"));
+            }
+            // Confirmation is provided by backend via chat_send; avoid duplicate local HUD
+            return true; // settings applied; no need to enqueue this
+        }
+        if (Protocol.TYPE_TELEMETRY_RESYNC.equals(t)) {
+            telemetryResyncRequested = true;
+            auxExec.submit(() -> {
+                try { sendTelemetryOnce(); } catch (Throwable ignored) {}
+            });
+            return true;
+        }
+        return false;
+    }
+
     public synchronized void disconnect() {
         try {
             telemetryRunning = false;
@@ -177,7 +241,46 @@ public final class WebSocketClientManager {
 
     public boolean isConnected() { return connected && client != null && client.isOpen(); }
 
-    public void sendJson(JsonObject obj) { enqueueSend(GSON.toJson(obj)); }
+    public void sendJson(JsonObject obj) {
+        if (client == null) return;
+        // Name predates codecs: encodes off the caller's thread with the negotiated codec
+        if (!batchAccepted) {
+            sendExec.submit(() -> sendFrame(obj));
+            return;
+        }
+        outbox.offer(obj);
+        sendExec.submit(this::drainOutbox);
+    }
+
+    private void drainOutbox() {
+        // Whatever queued up while earlier sends ran leaves as one frame; later drains find it empty
+        java.util.List<JsonObject> msgs = new java.util.ArrayList<>();
+        for (JsonObject m = outbox.poll(); m != null; m = outbox.poll()) msgs.add(m);
+        if (msgs.isEmpty()) return;
+        if (msgs.size() == 1) {
+            sendFrame(msgs.get(0));
+            return;
+        }
+        com.google.gson.JsonArray arr = new com.google.gson.JsonArray(msgs.size());
+        for (JsonObject m : msgs) arr.add(m);
+        JsonObject batch = new JsonObject();
+        batch.addProperty("type", Protocol.TYPE_BATCH);
+        batch.add("messages", arr);
+        sendFrame(batch);
+    }
+
+    private void sendFrame(JsonObject obj) {
+        try {
+            if (!client.isOpen()) return;
+            if (WireCodec.MSGPACK.equals(wireCodec)) {
+                client.send(WireCodec.encodeMsgpack(obj));
+            } else {
+                client.send(GSON.toJson(obj));
+            }
+        } catch (Exception e) {
+            LOGGER.warn("WS send failed: {}", e.toString());
+        }
+    }
 
     private void enqueueSend(String text) {
         if (client == null) return;
@@ -211,19 +314,73 @@ public final class WebSocketClientManager {
         });
     }
 
-    private void sendTelemetryOnce() {
+    private synchronized void sendTelemetryOnce() {
         net.minecraft.client.MinecraftClient mc = net.minecraft.client.MinecraftClient.getInstance();
         if (mc == null || mc.player == null || mc.world == null) return;
         JsonObject st = buildStateSnapshot();
-
-                    JsonObject msg = new JsonObject();
-                    msg.addProperty("type", Protocol.TYPE_TELEMETRY_UPDATE);
-        msg.addProperty("player_uuid", getPlayerId());
-        msg.addProperty("ts", java.time.Instant.now().toString());
-        msg.add("state", st);
+        long seq = ++telemetrySeq;
+        JsonObject msg = new JsonObject();
+        if (telemetryDeltaAccepted && !telemetryResyncRequested && lastTelemetryState != null) {
+            msg.addProperty("type", Protocol.TYPE_TELEMETRY_DELTA);
+            msg.addProperty("player_uuid", getPlayerId());
+            msg.addProperty("ts", java.time.Instant.now().toString());
+            msg.addProperty("seq", seq);
+            msg.addProperty("base_seq", seq - 1);
+            addTelemetryDelta(msg, lastTelemetryState, st);
+        } else {
+            telemetryResyncRequested = false;
+            msg.addProperty("type", Protocol.TYPE_TELEMETRY_UPDATE);
+            msg.addProperty("player_uuid", getPlayerId());
+            msg.addProperty("ts", java.time.Instant.now().toString());
+            msg.addProperty("seq", seq);
+            msg.add("state", st);
+        }
+        lastTelemetryState = st;
         sendJson(msg);
     }
 
+    private static void addTelemetryDelta(JsonObject msg, JsonObject prev, JsonObject cur) {
+        JsonObject changed = new JsonObject();
+        com.google.gson.JsonArray removed = new com.google.gson.JsonArray();
+        for (java.util.Map.Entry<String, com.google.gson.JsonElement> e : cur.entrySet()) {
+            if ("inventory".equals(e.getKey())) continue;
+            if (!e.getValue().equals(prev.get(e.getKey()))) changed.add(e.getKey(), e.getValue());
+        }
+        for (String key : prev.keySet()) {
+            if (!cur.has(key)) removed.add(key);
+        }
+        // Inventory slots are keyed by index; an emptied slot is sent as {slot, count: 0}
+        java.util.Map<Integer, com.google.gson.JsonElement> before = slotsByIndex(prev);
+        java.util.Map<Integer, com.google.gson.JsonElement> after = slotsByIndex(cur);
+        com.google.gson.JsonArray inv = new com.google.gson.JsonArray();
+        for (java.util.Map.Entry<Integer, com.google.gson.JsonElement> e : after.entrySet()) {
+            if (!e.getValue().equals(before.get(e.getKey()))) inv.add(e.getValue());
+        }
+        for (Integer idx : before.keySet()) {
+            if (!after.containsKey(idx)) {
+                JsonObject empty = new JsonObject();
+                empty.addProperty("slot", idx);
+                empty.addProperty("count", 0);
+                inv.add(empty);
+            }
+        }
+        msg.add("changed", changed);
+        if (removed.size() > 0) msg.add("removed", removed);
+        if (inv.size() > 0) msg.add("inventory", inv);
+    }
+
+    private static java.util.Map<Integer, com.google.gson.JsonElement> slotsByIndex(JsonObject st) {
+        java.util.Map<Integer, com.google.gson.JsonElement> out = new java.util.HashMap<>();
+        if (st.has("inventory") && st.get("inventory").isJsonArray()) {
+            for (com.google.gson.JsonElement el : st.getAsJsonArray("inventory")) {
+                if (el.isJsonObject() && el.getAsJsonObject().has("slot")) {
+                    out.put(el.getAsJsonObject().get("slot").getAsInt(), el);
+                }
+            }
+        }
+        return out;
+    }
+
     public JsonObject buildStateSnapshot() {
         net.minecraft.client.MinecraftClient mc = net.minecraft.client.MinecraftClient.getInstance();
         JsonObject st = new JsonObject();
@@ -292,6 +449,9 @@ public final class WebSocketClientManager {
             if (settings.has("inventory_diff_debounce_ms")) this.inventoryDiffDebounceMsOverride = settings.get("inventory_diff_debounce_ms").getAsInt();
             if (settings.has("chat_max_length")) this.chatMaxLengthOverride = settings.get("chat_max_length").getAsInt();
             if (settings.has("crafting_click_delay_ms")) { /* reserved */ }
+            if (settings.has("telemetry_delta")) this.telemetryDeltaAccepted = settings.get("telemetry_delta").getAsBoolean();
+            if (settings.has("batch")) this.batchAccepted = settings.get("batch").getAsBoolean();
+            if (settings.has("codec")) this.wireCodec = WireCodec.MSGPACK.equals(settings.get("codec").getAsString()) ? WireCodec.MSGPACK : WireCodec.JSON;
             if (settings.has("feedback_prefix")) this.feedbackPrefixOverride = settings.get("feedback_prefix").getAsString();
             if (settings.has("feedback_prefix_bracket_color")) this.feedbackBracketColorOverride = settings.get("feedback_prefix_bracket_color").getAsString();
             if (settings.has("feedback_prefix_inner_color")) this.feedbackInnerColorOverride = settings.get("feedback_prefix_inner_color").getAsString();
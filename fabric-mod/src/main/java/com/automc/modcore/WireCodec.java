@@ -0,0 +1,127 @@
+/**
+ * AutoMinecraft wire codec.
+ *
+ * Purpose: Encode/decode frames in the codec negotiated at handshake so telemetry and
+ * inventory traffic can use MessagePack instead of JSON text.
+ *
+ * How: Converts between Gson trees and MessagePack directly (no intermediate JSON
+ * string). Integral numbers are packed as integers and everything else as doubles,
+ * matching how the backend's msgpack decoder maps them back to Python int/float.
+ *
+ * Engineering notes: The handshake is always JSON text; the backend names the codec
+ * in its first settings_update, and text frames remain valid JSON in either mode.
+ */
+package com.automc.modcore;
+
+import com.google.gson.JsonArray;
+import com.google.gson.JsonElement;
+import com.google.gson.JsonNull;
+import com.google.gson.JsonObject;
+import com.google.gson.JsonPrimitive;
+import org.msgpack.core.MessageBufferPacker;
+import org.msgpack.core.MessagePack;
+import org.msgpack.core.MessagePacker;
+import org.msgpack.core.MessageUnpacker;
+import org.msgpack.value.ValueType;
+
+import java.io.IOException;
+import java.math.BigInteger;
+import java.nio.ByteBuffer;
+import java.util.Map;
+
+final class WireCodec {
+    static final String JSON = "json";
+    static final String MSGPACK = "msgpack";
+
+    private WireCodec() {}
+
+    static byte[] encodeMsgpack(JsonObject obj) throws IOException {
+        try (MessageBufferPacker packer = MessagePack.newDefaultBufferPacker()) {
+            pack(packer, obj);
+            return packer.toByteArray();
+        }
+    }
+
+    static JsonObject decodeMsgpack(ByteBuffer buf) throws IOException {
+        try (MessageUnpacker unpacker = MessagePack.newDefaultUnpacker(buf)) {
+            JsonElement el = unpack(unpacker);
+            return el.isJsonObject() ? el.getAsJsonObject() : null;
+        }
+    }
+
+    private static void pack(MessagePacker p, JsonElement el) throws IOException {
+        if (el == null || el.isJsonNull()) {
+            p.packNil();
+        } else if (el.isJsonObject()) {
+            JsonObject o = el.getAsJsonObject();
+            p.packMapHeader(o.size());
+            for (Map.Entry<String, JsonElement> e : o.entrySet()) {
+                p.packString(e.getKey());
+                pack(p, e.getValue());
+            }
+        } else if (el.isJsonArray()) {
+            JsonArray a = el.getAsJsonArray();
+            p.packArrayHeader(a.size());
+            for (JsonElement item : a) pack(p, item);
+        } else {
+            JsonPrimitive prim = el.getAsJsonPrimitive();
+            if (prim.isBoolean()) {
+                p.packBoolean(prim.getAsBoolean());
+            } else if (prim.isString()) {
+                p.packString(prim.getAsString());
+            } else {
+                Number n = prim.getAsNumber();
+                if (n instanceof Integer || n instanceof Long || n instanceof Short || n instanceof Byte) {
+                    p.packLong(n.longValue());
+                } else if (n instanceof BigInteger) {
+                    p.packBigInteger((BigInteger) n);
+                } else if (!(n instanceof Double || n instanceof Float) && isIntegral(n.toString())) {
+                    // Gson's lazily parsed numbers: keep integers integral on the wire
+                    p.packLong(n.longValue());
+                } else {
+                    p.packDouble(n.doubleValue());
+                }
+            }
+        }
+    }
+
+    private static boolean isIntegral(String s) {
+        return !s.isEmpty() && s.chars().allMatch(c -> c == '-' || (c >= '0' && c <= '9'));
+    }
+
+    private static JsonElement unpack(MessageUnpacker u) throws IOException {
+        ValueType t = u.getNextFormat().getValueType();
+        switch (t) {
+            case NIL:
+                u.unpackNil();
+                return JsonNull.INSTANCE;
+            case BOOLEAN:
+                return new JsonPrimitive(u.unpackBoolean());
+            case INTEGER:
+                return new JsonPrimitive(u.unpackLong());
+            case FLOAT:
+                return new JsonPrimitive(u.unpackDouble());
+            case STRING:
+                return new JsonPrimitive(u.unpackString());
+            case ARRAY: {
+                int n = u.unpackArrayHeader();
+                JsonArray a = new JsonArray(n);
+                for (int i = 0; i < n; i++) a.add(unpack(u));
+                return a;
+            }
+            case MAP: {
+                int n = u.unpackMapHeader();
+                JsonObject o = new JsonObject();
+                for (int i = 0; i < n; i++) {
+                    String key = u.unpackString();
+                    o.add(key, unpack(u));
+                }
+                return o;
+            }
+            default:
+                // binary/extension values are not part of the protocol
+                u.skipValue();
+                return JsonNull.INSTANCE;
+        }
+    }
+}
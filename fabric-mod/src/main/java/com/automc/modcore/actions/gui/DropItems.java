@@ -0,0 +1,63 @@
+package com.automc.modcore.actions.gui;
+
+import net.minecraft.client.MinecraftClient;
+import net.minecraft.entity.player.PlayerInventory;
+import net.minecraft.item.ItemStack;
+import net.minecraft.registry.Registries;
+import net.minecraft.screen.slot.SlotActionType;
+
+/**
+ * Mod-native "drop": throw a number of items from the player inventory.
+ *
+ * Used to hand gathered materials to another agent standing nearby (multi-agent
+ * !get); the receiving player picks the item entities up on contact. Whole
+ * stacks are thrown with one click, the remainder one item at a time.
+ */
+public final class DropItems {
+	private DropItems() {}
+
+	public static void drop(String actionId, String itemId, int count) {
+		MinecraftClient mc = MinecraftClient.getInstance();
+		if (mc == null || mc.player == null || mc.interactionManager == null) {
+			com.automc.modcore.ActionExecutor.sendProgress(actionId, "fail", "no player");
+			return;
+		}
+		if (itemId == null || itemId.isEmpty() || count <= 0) {
+			com.automc.modcore.ActionExecutor.sendProgress(actionId, "fail", "invalid item/count");
+			return;
+		}
+		mc.execute(() -> dropNow(actionId, itemId, count));
+	}
+
+	private static void dropNow(String actionId, String itemId, int count) {
+		MinecraftClient mc = MinecraftClient.getInstance();
+		if (mc == null || mc.player == null || mc.interactionManager == null) return;
+		PlayerInventory inv = mc.player.getInventory();
+		int remaining = count;
+		// Main inventory and hotbar only (0..35); armor and offhand are never handed over
+		for (int i = 0; i < 36 && remaining > 0; i++) {
+			if (com.automc.modcore.actions.gui.GuiCrafting.shouldAbort()) break;
+			ItemStack s = inv.getStack(i);
+			if (s == null || s.isEmpty()) continue;
+			if (!itemId.equals(Registries.ITEM.getId(s.getItem()).toString())) continue;
+			int slot = com.automc.modcore.UiSlots.toHandlerSlotIndex(i);
+			if (s.getCount() <= remaining) {
+				remaining -= s.getCount();
+				// button 1 = throw the whole stack
+				com.automc.modcore.UiSlots.click(slot, 1, SlotActionType.THROW);
+			} else {
+				for (; remaining > 0; remaining--) {
+					com.automc.modcore.UiSlots.click(slot, 0, SlotActionType.THROW);
+				}
+			}
+		}
+		int dropped = count - remaining;
+		if (remaining == 0) {
+			com.automc.modcore.ActionExecutor.sendProgress(actionId, "ok", "dropped " + itemId + " x" + dropped);
+		} else if (dropped > 0) {
+			com.automc.modcore.ActionExecutor.sendProgress(actionId, "ok", "dropped " + itemId + " x" + dropped + " (short " + remaining + ")");
+		} else {
+			com.automc.modcore.ActionExecutor.sendProgress(actionId, "fail", "missing item: " + itemId);
+		}
+	}
+}